@@ -0,0 +1,391 @@
+# backend/article_fetcher.py
+# Optional enrichment stage (`--fetch-articles`): downloads the HTML of each
+# claimed article so the model sees more than Serper's one-line snippet.
+#
+# Downloads run in parallel on a bounded pool with at most
+# ARTICLE_FETCH_PER_HOST connections per host; robots.txt is honored, bodies are
+# capped in size and wall time, and pages are revalidated with conditional GETs
+# (ETag / Last-Modified). The main text is pulled out with a small html.parser
+# extractor, stored in the "articles" disk cache keyed by URL, and reduced to an
+# extractive summary that fits the category's token budget.
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib import robotparser
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import DiskCache, make_cache_key
+from prompt_builder import EXTRACT_MAX_TOKENS, count_tokens
+from telemetry import bind_category, current_category, get_logger, metrics
+
+logger = get_logger("article_fetcher")
+
+# --- Configuration ---
+ARTICLE_FETCH_ENABLED = os.getenv("ARTICLE_FETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+ARTICLE_FETCH_MAX_WORKERS = int(os.getenv("ARTICLE_FETCH_MAX_WORKERS", "8"))
+ARTICLE_FETCH_PER_HOST = int(os.getenv("ARTICLE_FETCH_PER_HOST", "2"))
+ARTICLE_FETCH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("ARTICLE_FETCH_CONNECT_TIMEOUT_SECONDS", "4"))
+ARTICLE_FETCH_TIMEOUT_SECONDS = float(os.getenv("ARTICLE_FETCH_TIMEOUT_SECONDS", "10"))  # Whole download
+ARTICLE_FETCH_MAX_BYTES = int(os.getenv("ARTICLE_FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+ARTICLE_FETCH_USER_AGENT = os.getenv("ARTICLE_FETCH_USER_AGENT", "JustTheFactsBot/1.0 (+news summary fetcher)")
+ARTICLE_CACHE_TTL = int(os.getenv("ARTICLE_CACHE_TTL", str(7 * 24 * 60 * 60)))
+# Cached pages younger than this are used without contacting the site at all
+ARTICLE_REVALIDATE_SECONDS = int(os.getenv("ARTICLE_REVALIDATE_SECONDS", str(6 * 60 * 60)))
+ROBOTS_CACHE_SECONDS = int(os.getenv("ROBOTS_CACHE_SECONDS", str(24 * 60 * 60)))
+ROBOTS_MAX_BYTES = 512 * 1024
+MIN_ARTICLE_CHARS = 200        # Less than this after extraction is treated as a paywall/consent page
+MIN_PARAGRAPH_CHARS = 40       # Shorter blocks are usually bylines, captions or buttons
+PROMPT_ENTRY_OVERHEAD_TOKENS = 40  # Title/link/source lines around each excerpt in the prompt
+
+_SENTENCE_SPLIT = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[A-Z0-9\"'(\[])")
+_WORD = re.compile(r"[a-z][a-z'-]+")
+_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([\w-]+)", re.IGNORECASE)
+_STOPWORDS = frozenset(
+    "a about after also an and are as at be been but by can could for from had has have he her his i if in "
+    "into is it its more not of on or our said says she than that the their there they this to was we were "
+    "what when which who will with would you".split()
+)
+
+
+# --- Extraction ---
+class _ParagraphExtractor(HTMLParser):
+    """Collects text blocks from <p>/<li>/<blockquote>/<h2-3>, skipping page chrome."""
+
+    SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "figure",
+                 "figcaption", "svg", "button", "iframe", "template", "select"}
+    BLOCK_TAGS = {"p", "li", "blockquote", "h2", "h3"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: list[tuple[str, bool]] = []  # (text, inside <article>/<main>)
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._buffer: list[str] | None = None
+
+    def _flush(self):
+        if self._buffer is not None:
+            text = " ".join("".join(self._buffer).split())
+            if text:
+                self.blocks.append((text, self._article_depth > 0))
+        self._buffer = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in ("article", "main"):
+            self._article_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._flush()  # <p> may be left unclosed
+            if not self._skip_depth:
+                self._buffer = []
+        elif tag == "br" and self._buffer is not None:
+            self._buffer.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in ("article", "main"):
+            self._flush()
+            self._article_depth = max(0, self._article_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._buffer is not None and not self._skip_depth:
+            self._buffer.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_main_text(html: str) -> str:
+    """
+    Returns the article body as newline-separated paragraphs.
+
+    Paragraphs inside <article>/<main> are preferred when they hold enough text;
+    otherwise every paragraph outside page chrome is used.
+    """
+    parser = _ParagraphExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:  # html.parser is lenient, but never let one page break the run
+        pass
+    blocks = [(text, in_article) for text, in_article in parser.blocks if len(text) >= MIN_PARAGRAPH_CHARS]
+    article_blocks = [text for text, in_article in blocks if in_article]
+    if sum(map(len, article_blocks)) >= MIN_ARTICLE_CHARS:
+        chosen = article_blocks
+    else:
+        chosen = [text for text, _ in blocks]
+    # Drop repeated blocks (share bars, newsletter prompts rendered twice)
+    seen = set()
+    unique = [text for text in chosen if not (text in seen or seen.add(text))]
+    return "\n".join(unique)
+
+
+def extractive_summary(text: str, title: str, max_tokens: int) -> str:
+    """
+    Picks the most informative sentences of `text` (in original order) within `max_tokens`.
+
+    Sentences score by the document frequency of their content words, overlap
+    with the title and a lead bonus for the opening sentences.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    sentences = [sentence.strip() for sentence in _SENTENCE_SPLIT.split(text.replace("\n", " ")) if sentence.strip()]
+    words_per_sentence = [[word for word in _WORD.findall(sentence.lower()) if word not in _STOPWORDS]
+                          for sentence in sentences]
+    frequencies = Counter(word for words in words_per_sentence for word in set(words))
+    title_words = {word for word in _WORD.findall(title.lower()) if word not in _STOPWORDS}
+
+    scored = []
+    for position, (sentence, words) in enumerate(zip(sentences, words_per_sentence)):
+        if not words:
+            continue
+        content = sum(frequencies[word] for word in set(words)) / math.sqrt(len(words))
+        title_overlap = len(title_words & set(words))
+        lead = max(0.0, 1.0 - position / 5)
+        scored.append((content + 2 * title_overlap + 3 * lead, position, sentence))
+
+    chosen, used = [], 0
+    for _score, position, sentence in sorted(scored, reverse=True):
+        tokens = count_tokens(sentence) + 1
+        if used + tokens > max_tokens:
+            continue
+        chosen.append((position, sentence))
+        used += tokens
+    return " ".join(sentence for _position, sentence in sorted(chosen))
+
+
+# --- Fetcher ---
+class ArticleFetcher:
+    """
+    Parallel, polite article downloader with a per-URL content cache.
+
+    Thread-safe: categories processed concurrently share one fetcher, so the
+    per-host limits hold across the whole run.
+    """
+
+    def __init__(self, max_workers: int = ARTICLE_FETCH_MAX_WORKERS, per_host: int = ARTICLE_FETCH_PER_HOST,
+                 timeout: float = ARTICLE_FETCH_TIMEOUT_SECONDS, max_bytes: int = ARTICLE_FETCH_MAX_BYTES,
+                 user_agent: str = ARTICLE_FETCH_USER_AGENT, cache: DiskCache | None = None,
+                 offline: bool = False):
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.user_agent = user_agent
+        self.offline = offline
+        self.cache = cache or DiskCache("articles", ttl_seconds=ARTICLE_CACHE_TTL)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="article")
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=self.per_host, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update({"User-Agent": user_agent,
+                                      "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.1"})
+        self._lock = threading.Lock()
+        self._host_limits: dict[str, threading.BoundedSemaphore] = {}
+        self._robots: dict[str, tuple[float, robotparser.RobotFileParser | None]] = {}
+        self._robots_locks: dict[str, threading.Lock] = {}
+        self._stats = Counter()
+
+    def _bump(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+        metrics.inc("article_fetches_total", result=stat, category=current_category())
+
+    def _host_limit(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def _read_capped(self, response: requests.Response, limit: int, deadline: float) -> bytes | None:
+        """Reads a streamed body; returns None if it runs past `deadline`, truncating at `limit` bytes."""
+        chunks, size = [], 0
+        for chunk in response.iter_content(chunk_size=16384):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= limit:
+                self._bump("truncated")
+                break
+            if time.monotonic() > deadline:
+                self._bump("timeouts")
+                return None
+        return b"".join(chunks)[:limit]
+
+    # --- robots.txt ---
+    def _robots_parser(self, scheme: str, host: str) -> robotparser.RobotFileParser | None:
+        """Returns the parsed robots.txt for a host (None means everything is allowed)."""
+        key = f"{scheme}://{host}"
+        with self._lock:
+            host_lock = self._robots_locks.setdefault(key, threading.Lock())
+        with host_lock:  # One robots.txt request per host, even when its pages are fetched concurrently
+            with self._lock:
+                cached = self._robots.get(key)
+            if cached and time.monotonic() - cached[0] < ROBOTS_CACHE_SECONDS:
+                return cached[1]
+            parser = self._download_robots(key, host)
+            with self._lock:
+                self._robots[key] = (time.monotonic(), parser)
+            return parser
+
+    def _download_robots(self, key: str, host: str) -> robotparser.RobotFileParser | None:
+        parser = robotparser.RobotFileParser(f"{key}/robots.txt")
+        try:
+            with self._host_limit(host):
+                response = self._session.get(f"{key}/robots.txt", stream=True,
+                                             timeout=(ARTICLE_FETCH_CONNECT_TIMEOUT_SECONDS, self.timeout))
+                with response:
+                    body = self._read_capped(response, ROBOTS_MAX_BYTES, time.monotonic() + self.timeout)
+            if response.status_code in (401, 403):
+                parser.disallow_all = True
+            elif response.status_code >= 500 or body is None:
+                parser.disallow_all = True  # RFC 9309: treat an unreachable robots.txt as full disallow
+            elif response.status_code >= 400:
+                parser = None  # No robots.txt: everything allowed
+            else:
+                parser.parse(body.decode("utf-8", errors="replace").splitlines())
+        except requests.exceptions.RequestException:
+            parser.disallow_all = True
+        return parser
+
+    def allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        parser = self._robots_parser(parts.scheme, parts.netloc)
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+    # --- Download ---
+    def fetch_text(self, url: str) -> str | None:
+        """
+        Returns the extracted main text of `url` ('' if the page had none), or None
+        if it could not be fetched. Uses the cache, then a conditional GET.
+        """
+        cache_key = make_cache_key("article", url)
+        entry = self.cache.get(cache_key, ignore_ttl=self.offline)
+        if entry is not None and (self.offline or time.time() - entry.get("fetched_at", 0) < ARTICLE_REVALIDATE_SECONDS):
+            self._bump("cache_hits")
+            return entry.get("text", "")
+        if self.offline:
+            self._bump("offline_misses")
+            return None
+
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return None
+        if not self.allowed(url):
+            self._bump("robots_blocked")
+            return None
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            with self._host_limit(parts.netloc):
+                deadline = time.monotonic() + self.timeout
+                response = self._session.get(url, headers=headers, stream=True,
+                                             timeout=(ARTICLE_FETCH_CONNECT_TIMEOUT_SECONDS, self.timeout))
+                with response:
+                    if response.status_code == 304 and entry is not None:
+                        self._bump("not_modified")
+                        self.cache.set(cache_key, dict(entry, fetched_at=time.time()))
+                        return entry.get("text", "")
+                    content_type = response.headers.get("Content-Type", "")
+                    if response.status_code != 200 or ("html" not in content_type and content_type):
+                        self._bump("http_errors")
+                        return None
+                    body = self._read_capped(response, self.max_bytes, deadline)
+                    metrics.inc("http_bytes_received_total", len(body or b""), service="articles",
+                                category=current_category())
+        except requests.exceptions.RequestException:
+            self._bump("http_errors")
+            return None
+        if body is None:
+            return None
+
+        charset = response.encoding if "charset" in content_type.lower() else None
+        if charset is None:
+            match = _CHARSET.search(body[:4096])
+            charset = match.group(1).decode("ascii", errors="ignore") if match else "utf-8"
+        try:
+            html = body.decode(charset, errors="replace")
+        except LookupError:
+            html = body.decode("utf-8", errors="replace")
+        text = extract_main_text(html)
+        if len(text) < MIN_ARTICLE_CHARS:
+            text = ""  # Paywall, consent wall or script-rendered page
+            self._bump("no_text")
+        self._bump("downloads")
+        self.cache.set(cache_key, {
+            "url": url,
+            "text": text,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        })
+        return text
+
+    def enrich(self, category: str, articles: list[dict], token_budget: int) -> list[dict]:
+        """
+        Adds an 'extract' (extractive summary of the full text) to each article that
+        could be fetched; other articles keep just their snippet.
+
+        Args:
+            category (str): Category name (for logging).
+            articles (list[dict]): The category's claimed articles.
+            token_budget (int): The category's context token budget, shared by all articles.
+
+        Returns:
+            list[dict]: Copies of the articles, in the same order.
+        """
+        if not articles:
+            return articles
+        per_article = max(0, min(EXTRACT_MAX_TOKENS, token_budget // len(articles) - PROMPT_ENTRY_OVERHEAD_TOKENS))
+        started = time.perf_counter()
+        futures = [self._executor.submit(self._fetch_for_category, category, article["url"])
+                   if article.get("url") else None for article in articles]
+        enriched = []
+        for article, future in zip(articles, futures):
+            try:
+                text = future.result() if future else None
+            except Exception as e:
+                logger.error(f"  [Articles] Unexpected error fetching {article.get('url')}: {e}")
+                text = None
+            if text and per_article:
+                enriched.append(dict(article, extract=extractive_summary(text, article.get("title") or "", per_article)))
+            else:
+                enriched.append(article)
+        count = sum(1 for article in enriched if article.get("extract"))
+        logger.info(f"  [{category}] Enriched {count}/{len(articles)} articles with full-text excerpts "
+                    f"in {time.perf_counter() - started:.2f}s.")
+        return enriched
+
+    def _fetch_for_category(self, category: str, url: str) -> str | None:
+        with bind_category(category):  # Pool threads do not inherit the caller's context
+            return self.fetch_text(url)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def print_stats(self):
+        stats = self.get_stats()
+        logger.info("  [Articles] " + (" ".join(f"{key}={value}" for key, value in sorted(stats.items()))
+                                 or "No article fetches."))
+        self.cache.print_stats()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._session.close()
@@ -0,0 +1,190 @@
+# backend/batch_mode.py
+# OpenAI Batch API execution for the nightly run. All category prompts are written
+# to one JSONL file, submitted as a single batch job and polled until it finishes;
+# the results are then handed back to main.py's normal save path. Batch jobs cost
+# roughly half as much per token and do not compete with synchronous rate limits.
+
+import json
+import os
+import time
+from datetime import datetime
+
+from openai import OpenAI
+from prompt_builder import record_token_usage, usage_from_response
+from telemetry import get_logger, record_completion
+
+logger = get_logger("batch_mode")
+
+# --- Configuration ---
+BATCH_DIR = os.getenv("OPENAI_BATCH_DIR", os.path.join(os.path.dirname(__file__), ".batches"))
+BATCH_COMPLETION_WINDOW = os.getenv("OPENAI_BATCH_COMPLETION_WINDOW", "24h")
+BATCH_POLL_INTERVAL_SECONDS = float(os.getenv("OPENAI_BATCH_POLL_INTERVAL_SECONDS", "30"))
+BATCH_TIMEOUT_SECONDS = float(os.getenv("OPENAI_BATCH_TIMEOUT_SECONDS", str(24 * 60 * 60)))
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def build_batch_requests(prompts: dict[str, dict], model: str, temperature: float, max_tokens: int) -> list[dict]:
+    """
+    Converts prepared category prompts into Batch API request lines.
+
+    Args:
+        prompts (dict[str, dict]): Category -> {'system_prompt', 'user_message'}
+                                   as returned by main.build_summary_prompt.
+        model (str): Model name, unless a prompt has its own 'model'.
+        temperature (float): Sampling temperature.
+        max_tokens (int): Completion token limit.
+
+    Returns:
+        list[dict]: One request per category, with the category as custom_id.
+    """
+    return [
+        {
+            "custom_id": category,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": prompt.get("model", model),
+                "messages": [
+                    {"role": "system", "content": prompt["system_prompt"]},
+                    {"role": "user", "content": prompt["user_message"]},
+                ],
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+        }
+        for category, prompt in prompts.items()
+    ]
+
+
+def write_batch_file(batch_requests: list[dict], batch_dir: str = BATCH_DIR) -> str:
+    """Writes the request lines to a timestamped JSONL file and returns its path."""
+    os.makedirs(batch_dir, exist_ok=True)
+    path = os.path.join(batch_dir, f"daily-summaries-{datetime.now().strftime('%Y%m%dT%H%M%S')}.jsonl")
+    with open(path, "w", encoding="utf-8") as batch_file:
+        for request in batch_requests:
+            batch_file.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+def submit_batch(client: OpenAI, batch_path: str):
+    """Uploads the JSONL file and creates the batch job."""
+    with open(batch_path, "rb") as batch_file:
+        uploaded = client.files.create(file=batch_file, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW,
+        metadata={"job": "daily-summaries"},
+    )
+    logger.info(f"  [Batch] Submitted batch {batch.id} ({os.path.basename(batch_path)}, input file {uploaded.id})")
+    return batch
+
+
+def wait_for_batch(client: OpenAI, batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL_SECONDS,
+                   timeout: float = BATCH_TIMEOUT_SECONDS):
+    """
+    Polls the batch until it reaches a terminal status or `timeout` elapses.
+
+    Returns:
+        The final batch object (its status may be non-terminal on timeout).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        progress = f"{counts.completed}/{counts.total}" if counts else "?"
+        logger.info(f"  [Batch] {batch_id}: status={batch.status} completed={progress}")
+        if batch.status in TERMINAL_BATCH_STATUSES or time.monotonic() >= deadline:
+            return batch
+        time.sleep(poll_interval)
+
+
+def cancel_batch(client: OpenAI, batch):
+    """Cancels a batch that has not finished, so it is not billed for results nobody reads."""
+    try:
+        batch = client.batches.cancel(batch.id)
+        logger.warning(f"  [Batch] Cancelled batch {batch.id} (status: {batch.status}).")
+    except Exception as e:
+        logger.error(f"  [Batch] Error cancelling batch {batch.id}: {e}")
+    return batch
+
+
+def parse_batch_output(output_text: str, max_tokens: int) -> dict[str, str]:
+    """
+    Maps each custom_id in a batch output/error file to its summary or an error message.
+
+    Completions cut off at `max_tokens` are reported as errors, as in the
+    synchronous path. Token usage is recorded per category.
+    """
+    results = {}
+    for line in output_text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        category = record.get("custom_id")
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or (response.get("body") or {}).get("error") or response.get("status_code")
+            results[category] = f"Error: Batch request failed: {error}"
+            continue
+        body = response.get("body") or {}
+        usage = usage_from_response(body.get("usage"))
+        record_token_usage(category, source="batch", **usage)
+        record_completion(category, body.get("model") or "", batch=True, **usage)
+        choices = body.get("choices") or []
+        if not choices:
+            results[category] = "Error: No response choices received from API."
+            continue
+        if choices[0].get("finish_reason") == "length":
+            results[category] = f"Error: Summary truncated at max_tokens={max_tokens}."
+            continue
+        results[category] = (choices[0].get("message", {}).get("content") or "").strip()
+    return results
+
+
+def run_batch_summaries(client: OpenAI, prompts: dict[str, dict], model: str, temperature: float,
+                        max_tokens: int, poll_interval: float = BATCH_POLL_INTERVAL_SECONDS,
+                        timeout: float = BATCH_TIMEOUT_SECONDS) -> dict[str, str]:
+    """
+    Runs every prepared prompt through one Batch API job.
+
+    Returns:
+        dict[str, str]: Category -> summary text, or an "Error: ..." message for
+                        categories whose request failed or never completed.
+    """
+    if not prompts:
+        return {}
+    batch_requests = build_batch_requests(prompts, model, temperature, max_tokens)
+    batch_path = write_batch_file(batch_requests)
+    logger.info(f"  [Batch] Wrote {len(batch_requests)} requests to {batch_path}")
+
+    batch = None
+    try:
+        batch = submit_batch(client, batch_path)
+        batch = wait_for_batch(client, batch.id, poll_interval, timeout)
+    except Exception as e:
+        logger.error(f"  [Batch] Error submitting or polling batch: {e}")
+        if batch is not None:
+            cancel_batch(client, batch)
+        return {category: f"Error: Batch job failed: {e}" for category in prompts}
+    if batch.status not in TERMINAL_BATCH_STATUSES:
+        logger.warning(f"  [Batch] Batch {batch.id} did not finish within {timeout:g}s "
+                       f"(status: {batch.status}); cancelling it.")
+        batch = cancel_batch(client, batch)
+
+    results = {}
+    try:
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                results.update(parse_batch_output(client.files.content(file_id).text, max_tokens))
+    except Exception as e:
+        logger.error(f"  [Batch] Error downloading results for batch {batch.id}: {e}")
+
+    missing = [category for category in prompts if category not in results]
+    if missing:
+        logger.info(f"  [Batch] {len(missing)} categories have no result (batch status: {batch.status}).")
+    for category in missing:
+        results[category] = f"Error: No batch result (batch status: {batch.status})."
+    return results
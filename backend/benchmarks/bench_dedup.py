@@ -0,0 +1,120 @@
+# backend/benchmarks/bench_dedup.py
+# Benchmark for backend/dedup.py on a synthetic news corpus: a set of base
+# stories, each syndicated a few times with a different outlet suffix, reworded
+# words and a trimmed snippet, mixed with unrelated stories. Reports clustering
+# time and pairwise precision/recall against the known story labels.
+#
+# Usage:
+#    python backend/benchmarks/bench_dedup.py --articles 5000
+#    python backend/benchmarks/bench_dedup.py --articles 1000 --compare-naive
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import DEDUP_JACCARD_THRESHOLD, StoryClaims, article_text, cluster_articles, jaccard, shingles
+
+OUTLETS = ["Reuters", "AP News", "BBC", "CNN", "NPR", "Bloomberg", "The Guardian", "Axios"]
+
+
+def make_corpus(num_articles: int, copies: int, reword: float, seed: int) -> tuple[list[dict], list[int]]:
+    """Returns (articles, story label per article) in shuffled order."""
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(20000)]
+    articles, labels = [], []
+    story = 0
+    while len(articles) < num_articles:
+        title = rng.sample(vocabulary, rng.randint(8, 12))
+        snippet = rng.sample(vocabulary, rng.randint(25, 40))
+        syndicated = rng.random() < 0.5
+        for copy in range(copies if syndicated else 1):
+            copy_title = [rng.choice(vocabulary) if copy and rng.random() < reword else w for w in title]
+            copy_snippet = [rng.choice(vocabulary) if copy and rng.random() < reword else w for w in snippet]
+            if copy:
+                copy_snippet = copy_snippet[:len(copy_snippet) - rng.randint(0, 6)]
+            outlet = rng.choice(OUTLETS)
+            articles.append({
+                "title": f"{' '.join(copy_title)} - {outlet}",
+                "url": f"https://example.com/{story}/{copy}",
+                "description": " ".join(copy_snippet),
+                "source": {"name": outlet},
+            })
+            labels.append(story)
+        story += 1
+    order = list(range(len(articles)))[:num_articles]
+    rng.shuffle(order)
+    return [articles[i] for i in order], [labels[i] for i in order]
+
+
+def pair_scores(clusters: list[list[int]], labels: list[int]) -> tuple[float, float]:
+    """Pairwise precision/recall of predicted clusters against story labels."""
+    predicted = {pair for cluster in clusters for pair in itertools.combinations(sorted(cluster), 2)}
+    by_label: dict[int, list[int]] = {}
+    for item, label in enumerate(labels):
+        by_label.setdefault(label, []).append(item)
+    actual = {pair for items in by_label.values() for pair in itertools.combinations(items, 2)}
+    true_positives = len(predicted & actual)
+    precision = true_positives / len(predicted) if predicted else 1.0
+    recall = true_positives / len(actual) if actual else 1.0
+    return precision, recall
+
+
+def naive_pairs(articles: list[dict], threshold: float) -> int:
+    """All-pairs Jaccard, for comparison. Returns the number of matching pairs."""
+    sets = [shingles(article_text(article)) for article in articles]
+    return sum(1 for a, b in itertools.combinations(sets, 2) if jaccard(a, b) >= threshold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate story clustering.")
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--copies", type=int, default=3, help="Copies per syndicated story.")
+    parser.add_argument("--reword", type=float, default=0.1, help="Fraction of words changed per copy.")
+    parser.add_argument("--threshold", type=float, default=DEDUP_JACCARD_THRESHOLD)
+    parser.add_argument("--categories", type=int, default=9, help="Categories for the StoryClaims pass.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--compare-naive", action="store_true", help="Also time all-pairs Jaccard.")
+    args = parser.parse_args()
+
+    articles, labels = make_corpus(args.articles, args.copies, args.reword, args.seed)
+    print(f"Corpus: {len(articles)} articles, {len(set(labels))} stories "
+          f"(copies={args.copies}, reword={args.reword:.0%}, threshold={args.threshold})")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        clusters = cluster_articles(articles, args.threshold)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    precision, recall = pair_scores(clusters, labels)
+    print(f"cluster_articles: {best * 1000:.1f} ms (best of {args.repeat}), "
+          f"{len(articles) / best:,.0f} articles/s, {len(clusters)} clusters, "
+          f"precision={precision:.3f} recall={recall:.3f}")
+
+    # Same corpus split across categories, claimed in order as in a pipeline run
+    per_category = -(-len(articles) // args.categories)
+    started = time.perf_counter()
+    story_claims = StoryClaims(args.threshold)
+    kept = 0
+    for number in range(args.categories):
+        chunk = articles[number * per_category:(number + 1) * per_category]
+        kept += len(story_claims.claim(f"category-{number}", chunk)[0])
+    elapsed = time.perf_counter() - started
+    print(f"StoryClaims over {args.categories} categories: {elapsed * 1000:.1f} ms, "
+          f"kept {kept}/{len(articles)} articles")
+
+    if args.compare_naive:
+        started = time.perf_counter()
+        pairs = naive_pairs(articles, args.threshold)
+        elapsed = time.perf_counter() - started
+        print(f"naive all-pairs Jaccard: {elapsed * 1000:.1f} ms ({pairs} matching pairs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# backend/benchmarks/bench_pipeline.py
+# End-to-end benchmark of the summary pipeline (backend/main.py) with no network
+# access. Serper, OpenAI and Supabase are replaced by local stand-ins
+# (backend/mock_serper.py, backend/mock_openai.py, backend/mock_supabase.py) with
+# configurable latency and error rates; responses are replayed from recorded
+# fixtures where available and generated deterministically otherwise.
+#
+# For each category count (9 = the real prompts; larger counts add synthetic
+# categories with their own queries) and pipeline mode it reports end-to-end wall
+# time, throughput and p50/p95 per stage, so concurrency, caching and batching
+# changes can be compared in CI.
+#
+# Usage:
+#    python backend/benchmarks/bench_pipeline.py
+#    python backend/benchmarks/bench_pipeline.py --sizes 9,50 --modes serial,concurrent,batch,stream
+#    python backend/benchmarks/bench_pipeline.py --openai-latency 0.8 --error-rate 0.05 --json results.json
+#    python backend/benchmarks/bench_pipeline.py --warm            # second run, served from the caches
+#    # Record real Serper/OpenAI responses once (needs SERPER_API_KEY and OPENAI_API_KEY):
+#    python backend/benchmarks/bench_pipeline.py --record backend/benchmarks/fixtures/pipeline.json
+#    python backend/benchmarks/bench_pipeline.py --fixtures backend/benchmarks/fixtures/pipeline.json
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv
+
+from fixtures import FaultInjector, FixtureStore
+from mock_openai import start_mock_server
+from mock_serper import start_mock_serper
+from mock_supabase import InMemorySupabase
+
+REPORTED_STAGES = ("serper_fetch", "prompt_build", "openai_call", "openai_batch", "supabase_write")
+MODES = ("serial", "concurrent", "batch", "stream")
+
+
+def scaled_prompts(templates: list, size: int) -> dict:
+    """The real category templates, extended with numbered copies up to `size` categories."""
+    prompts = {}
+    for index in range(size):
+        base = templates[index % len(templates)]
+        copy = index // len(templates)
+        if copy == 0:
+            template = base
+        else:
+            queries = [f"{query} {copy}" for query in base.metadata_list("queries")]
+            template = dataclasses.replace(
+                base, slug=f"{base.slug}-{copy}", display_name=f"{base.display_name} {copy}",
+                query=f"{base.query} {copy}", order=base.order + copy * 1000,
+                metadata=dict(base.metadata, queries=", ".join(queries)))
+        prompts[template.display_name] = template
+    return prompts
+
+
+def configure_environment(args: argparse.Namespace, serper_url: str, openai_url: str, workdir: str):
+    """Points main.py at the stand-ins; must run before main is imported."""
+    os.environ["SERPER_BASE_URL"] = serper_url
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    if not args.record:
+        os.environ["SERPER_API_KEY"] = "bench"
+        os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["OPENAI_BATCH_DIR"] = os.path.join(workdir, "batches")
+    os.environ["OPENAI_BATCH_POLL_INTERVAL_SECONDS"] = str(args.batch_poll)
+    os.environ["SUPABASE_JOURNAL_PATH"] = os.path.join(workdir, "journal.jsonl")
+    os.environ.setdefault("HTTP_BACKOFF_BASE_SECONDS", "0.05")
+    os.environ.setdefault("HTTP_BACKOFF_MAX_SECONDS", "1")
+
+
+def run_scenario(main, telemetry, http_session, prompts: dict, mode: str, args: argparse.Namespace,
+                 workdir: str, supabase: InMemorySupabase) -> dict:
+    """Runs the pipeline once for `prompts` in `mode`; returns wall time, throughput and stage percentiles."""
+    from cache import DiskCache
+
+    cache_dir = tempfile.mkdtemp(dir=workdir)
+    main.serper_cache = DiskCache("serper", ttl_seconds=main.SERPER_CACHE_TTL, cache_dir=cache_dir)
+    main.openai_cache = DiskCache("openai", ttl_seconds=main.OPENAI_CACHE_TTL, cache_dir=cache_dir)
+    openai_client = main.OpenAI(api_key=os.environ["OPENAI_API_KEY"], base_url=main.OPENAI_BASE_URL)
+    limits = main.ServiceLimits(args.serper_concurrency, args.openai_concurrency, args.supabase_concurrency)
+
+    def run_once():
+        writer = main.SummaryWriteBuffer()
+        if mode == "serial":
+            results = main.run_serial(openai_client, writer, prompts, limits)
+        elif mode == "batch":
+            results = main.run_batch(openai_client, writer, prompts, limits, args.max_workers)
+        else:
+            streaming = main.StreamingOutput() if mode == "stream" else None
+            results = main.run_concurrent(openai_client, writer, prompts, limits, args.max_workers, streaming)
+        with limits.supabase, telemetry.metrics.stage("supabase_write", ""):
+            writer.flush(supabase)
+        return results
+
+    if args.warm:
+        run_once()  # Fill the caches; only the second run is measured
+    telemetry.metrics.reset()
+    http_session.reset_sessions()
+    started = time.perf_counter()
+    results = run_once()
+    wall = time.perf_counter() - started
+
+    stages = telemetry.metrics.quantiles("stage_seconds", by="stage")
+    errors = sum(1 for summary in results.values() if summary.startswith("Error"))
+    return {
+        "categories": len(prompts),
+        "mode": mode,
+        "warm": args.warm,
+        "wall_seconds": round(wall, 3),
+        "categories_per_second": round(len(prompts) / wall, 2) if wall else None,
+        "errors": errors,
+        "http_retries": int(telemetry.metrics.counter_value("http_retries_total")),
+        "cache_hits": int(telemetry.metrics.counter_value("cache_lookups_total", result="hit")),
+        "stages": {stage: stages[stage] for stage in REPORTED_STAGES if stage in stages},
+    }
+
+
+def format_row(result: dict) -> str:
+    def percentiles(stage: str) -> str:
+        entry = result["stages"].get(stage)
+        if not entry or entry["p50"] is None:
+            return f"{'-':>15}"
+        return f"{entry['p50'] * 1000:7.0f}/{entry['p95'] * 1000:<7.0f}"
+
+    openai_stage = "openai_batch" if result["mode"] == "batch" else "openai_call"
+    return (f"{result['categories']:>6} {result['mode']:<11} {result['wall_seconds']:>8.2f} "
+            f"{result['categories_per_second']:>8.1f} {percentiles('serper_fetch')} {percentiles('prompt_build')} "
+            f"{percentiles(openai_stage)} {percentiles('supabase_write')} {result['http_retries']:>7} "
+            f"{result['errors']:>6}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the summary pipeline.")
+    parser.add_argument("--sizes", default="9,50,500", help="Comma-separated category counts (default: %(default)s).")
+    parser.add_argument("--modes", default="concurrent,batch",
+                        help=f"Comma-separated pipeline modes from {', '.join(MODES)} (default: %(default)s).")
+    parser.add_argument("--serper-latency", type=float, default=0.03, help="Mean Serper latency in seconds.")
+    parser.add_argument("--openai-latency", type=float, default=0.25, help="Mean completion latency in seconds.")
+    parser.add_argument("--supabase-latency", type=float, default=0.05, help="Mean Supabase write latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of Serper/OpenAI requests that fail.")
+    parser.add_argument("--batch-delay", type=float, default=1.0, help="Seconds before a mock batch completes.")
+    parser.add_argument("--batch-poll", type=float, default=0.2, help="Batch polling interval in seconds.")
+    parser.add_argument("--max-workers", type=int, default=9)
+    parser.add_argument("--serper-concurrency", type=int, default=8)
+    parser.add_argument("--openai-concurrency", type=int, default=4)
+    parser.add_argument("--supabase-concurrency", type=int, default=2)
+    parser.add_argument("--warm", action="store_true", help="Measure a rerun served from the local caches.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fixtures", default=None, help="Replay recorded responses from this fixture file.")
+    parser.add_argument("--record", default=None,
+                        help="Record real Serper/OpenAI responses for the 9 real categories into this file.")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file.")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own log output.")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = sorted(set(modes) - set(MODES))
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    load_dotenv(os.path.join(BACKEND_DIR, ".env"))  # Real keys, only used with --record
+    if args.record and not (os.getenv("SERPER_API_KEY") and os.getenv("OPENAI_API_KEY")):
+        parser.error("--record needs SERPER_API_KEY and OPENAI_API_KEY")
+    store = FixtureStore(args.record or args.fixtures)
+    serper = start_mock_serper(fixtures=store, faults=FaultInjector(
+        0 if args.record else args.serper_latency, error_rate=0 if args.record else args.error_rate, seed=args.seed),
+        upstream=os.getenv("SERPER_UPSTREAM_URL", "https://google.serper.dev") if args.record else None)
+    openai_mock = start_mock_server(batch_delay=args.batch_delay, fixtures=store, faults=FaultInjector(
+        0 if args.record else args.openai_latency, error_rate=0 if args.record else args.error_rate,
+        seed=args.seed + 1),
+        upstream=os.getenv("OPENAI_UPSTREAM_URL", "https://api.openai.com/v1") if args.record else None)
+    supabase = InMemorySupabase(FaultInjector(args.supabase_latency, seed=args.seed + 2))
+
+    workdir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    configure_environment(args, f"http://127.0.0.1:{serper.server_port}",
+                          f"http://127.0.0.1:{openai_mock.server_port}/v1", workdir)
+    import http_session
+    import main
+    import telemetry
+    telemetry.configure_logging(level="INFO" if args.verbose else "ERROR")
+
+    templates = main.load_prompt_registry(main.PROMPTS_DIR).templates()
+    if args.record:
+        sizes, modes = [len(templates)], ["concurrent"]
+
+    print(f"Stand-ins: serper latency={args.serper_latency}s, openai latency={args.openai_latency}s, "
+          f"supabase latency={args.supabase_latency}s, error rate={args.error_rate:.0%}, "
+          f"fixtures={store.count('serper')} serper/{store.count('openai')} openai")
+    print(f"{'cats':>6} {'mode':<11} {'wall_s':>8} {'cats/s':>8} {'serper p50/p95':>15} "
+          f"{'build p50/p95':>15} {'openai p50/p95':>15} {'db p50/p95':>15} {'retries':>7} {'errors':>6}")
+    print(f"{'':>6} {'':<11} {'':>8} {'':>8} {'(ms)':>15} {'(ms)':>15} {'(ms)':>15} {'(ms)':>15}")
+    results = []
+    for size in sizes:
+        prompts = scaled_prompts(templates, size)
+        for mode in modes:
+            result = run_scenario(main, telemetry, http_session, prompts, mode, args, workdir, supabase)
+            results.append(result)
+            print(format_row(result), flush=True)
+
+    if args.record:
+        store.save()
+        print(f"Recorded {store.count('serper')} Serper and {store.count('openai')} OpenAI responses "
+              f"to {args.record}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"settings": vars(args), "results": results}, file, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,190 @@
+# backend/cache.py
+# Content-addressed on-disk cache used for Serper results and OpenAI completions.
+# Entries are JSON files named by the SHA-256 of their key parts, expire after a
+# TTL and are evicted least-recently-used once the namespace exceeds its size cap.
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from telemetry import current_category, get_logger, metrics
+
+logger = get_logger("cache")
+
+# --- Configuration ---
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache"))
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # per namespace
+
+
+def make_cache_key(*parts) -> str:
+    """
+    Builds a content address from arbitrary JSON-serializable key parts.
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON encoding of `parts`.
+    """
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def time_bucket(bucket_seconds: int, now: float | None = None) -> int:
+    """Returns the index of the fixed-width time window containing `now`."""
+    now = time.time() if now is None else now
+    return int(now // max(1, bucket_seconds))
+
+
+class DiskCache:
+    """
+    A size-bounded LRU cache of JSON values stored under `<cache_dir>/<namespace>/`.
+
+    The in-memory LRU index is rebuilt lazily from file mtimes, and every hit
+    touches its file, so recency survives across runs. Safe for use from the
+    pipeline's worker threads.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float, cache_dir: str = CACHE_DIR,
+                 max_bytes: int = CACHE_MAX_BYTES, enabled: bool = CACHE_ENABLED):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.directory = os.path.join(cache_dir, namespace)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._index: OrderedDict[str, int] | None = None  # key -> file size, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+
+    # --- Index ---
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        """Scans the namespace directory once, ordering entries by last use."""
+        if self._index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _dirs, files in os.walk(self.directory):
+                for filename in files:
+                    if not filename.endswith(".json"):
+                        continue
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, filename[:-5], stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _mtime, key, size in entries)
+        self._total_bytes = sum(self._index.values())
+
+    def _remove(self, key: str):
+        size = self._index.pop(key, 0)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            oldest = next(iter(self._index))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    # --- Public API ---
+    def get(self, key: str, ignore_ttl: bool = False):
+        """
+        Looks up a cached value.
+
+        Args:
+            key (str): Key from `make_cache_key`.
+            ignore_ttl (bool): Return expired entries too (used for offline replay).
+
+        Returns:
+            The cached value, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        outcome, value = self._lookup(key, ignore_ttl)
+        metrics.inc("cache_lookups_total", cache=self.namespace, result=outcome, category=current_category())
+        return value
+
+    def _lookup(self, key: str, ignore_ttl: bool) -> tuple[str, object]:
+        """Returns ('hit', value) or ('miss' | 'expired', None)."""
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self._stats["misses"] += 1
+                return "miss", None
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    entry = json.load(file)
+            except (OSError, ValueError):
+                self._remove(key)
+                self._stats["misses"] += 1
+                return "miss", None
+
+            if not ignore_ttl and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+                self._remove(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return "expired", None
+
+            self._index.move_to_end(key)
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self._stats["hits"] += 1
+            return "hit", entry.get("value")
+
+    def set(self, key: str, value):
+        """Stores a JSON-serializable value under `key`, evicting LRU entries if needed."""
+        if not self.enabled:
+            return
+        payload = json.dumps({"created_at": time.time(), "value": value}, ensure_ascii=False)
+        path = self._path(key)
+        with self._lock:
+            self._load_index()
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write atomically so a crash never leaves a half-written entry behind
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as file:
+                    file.write(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"  [Cache:{self.namespace}] Error writing cache entry: {e}")
+                return
+            self._total_bytes -= self._index.pop(key, 0)
+            size = len(payload.encode("utf-8"))
+            self._index[key] = size
+            self._total_bytes += size
+            self._stats["writes"] += 1
+            self._evict()
+
+    def get_stats(self) -> dict:
+        """Returns hit/miss/eviction counters and the current size of the namespace."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._index) if self._index is not None else None
+            stats["bytes"] = self._total_bytes if self._index is not None else None
+        stats["namespace"] = self.namespace
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups) if lookups else 0.0
+        return stats
+
+    def print_stats(self):
+        stats = self.get_stats()
+        logger.info(
+            f"  [Cache:{self.namespace}] hits={stats['hits']} misses={stats['misses']} "
+            f"expired={stats['expired']} writes={stats['writes']} evictions={stats['evictions']} "
+            f"hit_rate={stats['hit_rate']:.0%}"
+        )
@@ -0,0 +1,206 @@
+# backend/dedup.py
+# Near-duplicate story detection across categories. The same wire story is often
+# syndicated under different URLs, so exact URL deduplication lets it be
+# summarized (and paid for) in several categories. Articles are reduced to word
+# shingles of their title + snippet, sketched with one-permutation MinHash and
+# bucketed with banded LSH; candidate pairs from shared buckets are confirmed with
+# the exact Jaccard similarity of their shingle sets. Sketching hashes each
+# shingle once (zlib.crc32) and only bucket-mates are compared, so cost grows
+# linearly with the corpus (see backend/benchmarks/bench_dedup.py).
+
+import os
+import re
+import zlib
+
+# --- Configuration ---
+# Jaccard similarity of word shingles above which two articles are the same story
+DEDUP_JACCARD_THRESHOLD = float(os.getenv("DEDUP_JACCARD_THRESHOLD", "0.5"))
+DEDUP_NUM_BINS = 48    # MinHash sketch length
+DEDUP_NUM_BANDS = 12   # LSH bands (4 rows each); candidate threshold ~ (1/12)^(1/4) = 0.54
+DEDUP_SHINGLE_SIZE = 1  # Words; rewording one word then changes one shingle, not `size` of them
+
+_TOKEN_PATTERN = re.compile(rb"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    b"a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+_EMPTY_BIN = 1 << 32
+
+
+def article_text(article: dict) -> str:
+    """Returns the text an article is compared on (title + snippet)."""
+    return f"{article.get('title') or ''} {article.get('description') or ''}"
+
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_SIZE) -> frozenset[int]:
+    """Hashes the word n-grams of `text` (lowercased, stopwords removed) to 32-bit ints."""
+    tokens = _TOKEN_PATTERN.findall(text.lower().encode("utf-8"))
+    if size <= 1:
+        return frozenset(map(zlib.crc32, set(tokens) - _STOPWORDS))
+    tokens = [token for token in tokens if token not in _STOPWORDS]
+    if len(tokens) < size:
+        return frozenset(map(zlib.crc32, tokens))
+    return frozenset(zlib.crc32(b" ".join(tokens[i:i + size])) for i in range(len(tokens) - size + 1))
+
+
+def jaccard(left: frozenset, right: frozenset) -> float:
+    if not left or not right:
+        return 0.0
+    intersection = len(left & right)
+    return intersection / (len(left) + len(right) - intersection)
+
+
+def minhash_signature(shingle_set: frozenset[int], num_bins: int = DEDUP_NUM_BINS) -> tuple[int, ...]:
+    """
+    One-permutation MinHash: each shingle hash falls into one of `num_bins` bins
+    and every bin keeps its minimum; empty bins hold `_EMPTY_BIN`.
+    """
+    # Spread crc32 values, then let the smallest value per bin win (assigned last)
+    mixed = sorted([(value * 0x9E3779B1) & 0xFFFFFFFF for value in shingle_set], reverse=True)
+    filled = {value % num_bins: value // num_bins for value in mixed}
+    return tuple([filled.get(index, _EMPTY_BIN) for index in range(num_bins)])
+
+
+class StoryIndex:
+    """
+    Incremental LSH index of articles grouped into story clusters.
+
+    Each added article joins the cluster of every indexed article it is a near
+    duplicate of (clusters are merged with union-find), or starts a new one.
+    """
+
+    def __init__(self, threshold: float = DEDUP_JACCARD_THRESHOLD, num_bins: int = DEDUP_NUM_BINS,
+                 num_bands: int = DEDUP_NUM_BANDS):
+        if num_bins % num_bands:
+            raise ValueError("num_bins must be a multiple of num_bands")
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.num_bands = num_bands
+        self.rows = num_bins // num_bands
+        self._empty_band = (_EMPTY_BIN,) * self.rows  # Never bucketed: would match every sparse text
+        self._buckets: list[dict[tuple, list[int]]] = [{} for _ in range(num_bands)]
+        self._shingles: list[frozenset[int]] = []
+        self._parent: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def _root(self, item: int) -> int:
+        while self._parent[item] != item:
+            self._parent[item] = self._parent[self._parent[item]]
+            item = self._parent[item]
+        return item
+
+    def prepare(self, text: str) -> tuple:
+        """
+        Sketches `text` and finds its near duplicates without indexing it.
+
+        Returns:
+            tuple: (shingles, LSH band keys, list of (item id, similarity)); pass it to `insert`.
+        """
+        shingle_set = shingles(text)
+        signature = minhash_signature(shingle_set, self.num_bins)
+        rows = self.rows
+        band_keys = [key if key != self._empty_band else None
+                     for key in (signature[start:start + rows] for start in range(0, self.num_bins, rows))]
+        candidates = set()
+        for buckets, key in zip(self._buckets, band_keys):
+            bucket = buckets.get(key)
+            if bucket:
+                candidates.update(bucket)
+        found = []
+        for candidate in sorted(candidates):
+            similarity = jaccard(shingle_set, self._shingles[candidate])
+            if similarity >= self.threshold:
+                found.append((candidate, similarity))
+        return shingle_set, band_keys, found
+
+    def insert(self, prepared: tuple) -> int:
+        """Indexes a prepared text, merging it into the clusters it matched. Returns its item id."""
+        shingle_set, band_keys, found = prepared
+        item = len(self._shingles)
+        self._shingles.append(shingle_set)
+        self._parent.append(item)
+        if shingle_set:  # Empty texts never match anything
+            for buckets, key in zip(self._buckets, band_keys):
+                if key is not None:
+                    buckets.setdefault(key, []).append(item)
+        roots = sorted({self._root(other) for other, _ in found})
+        if roots:
+            # The oldest cluster absorbs the new item and any clusters it bridges
+            for root in roots[1:]:
+                self._parent[root] = roots[0]
+            self._parent[item] = roots[0]
+        return item
+
+    def matches(self, text: str) -> list[tuple[int, float]]:
+        """Returns (item id, similarity) for indexed items that are near duplicates of `text`."""
+        return self.prepare(text)[2]
+
+    def add(self, text: str) -> int:
+        """Indexes `text` and returns its item id."""
+        return self.insert(self.prepare(text))
+
+    def cluster_of(self, item: int) -> int:
+        """Returns the cluster id (root item) of an indexed item."""
+        return self._root(item)
+
+
+def cluster_articles(articles: list[dict], threshold: float = DEDUP_JACCARD_THRESHOLD) -> list[list[int]]:
+    """Groups article indexes into story clusters (singletons included), in first-seen order."""
+    index = StoryIndex(threshold)
+    for article in articles:
+        index.add(article_text(article))
+    clusters: dict[int, list[int]] = {}
+    for item in range(len(articles)):
+        clusters.setdefault(index.cluster_of(item), []).append(item)
+    return list(clusters.values())
+
+
+def article_quality(article: dict) -> tuple:
+    """Ranks duplicate articles: named source first, then the more informative snippet."""
+    source = (article.get("source") or {}).get("name")
+    has_source = bool(source) and source != "N/A"
+    return (has_source, bool(article.get("publishedAt")), min(len(article.get("description") or ""), 400))
+
+
+class StoryClaims:
+    """
+    Assigns each story cluster to exactly one category.
+
+    Categories claim their articles in prompt order; a story already claimed by
+    an earlier category is dropped from later ones, and near duplicates within a
+    category are collapsed to the best source (`article_quality`).
+    """
+
+    def __init__(self, threshold: float = DEDUP_JACCARD_THRESHOLD):
+        self.index = StoryIndex(threshold)
+        self._owners: dict[int, str] = {}  # cluster root -> category that claimed the story
+
+    def claim(self, category: str, articles: list[dict]) -> tuple[list[dict], list[tuple[dict, str]]]:
+        """
+        Returns:
+            tuple: (kept articles in their original order,
+                    list of (dropped article, category that owns its story))
+        """
+        kept: dict[int, tuple[int, dict]] = {}  # cluster root -> (position, best article)
+        dropped = []
+        for position, article in enumerate(articles):
+            prepared = self.index.prepare(article_text(article))
+            roots = sorted({self.index.cluster_of(other) for other, _ in prepared[2]})
+            owners = [self._owners[root] for root in roots if root in self._owners]
+            item = self.index.insert(prepared)
+            root = self.index.cluster_of(item)
+            # Oldest root first, so the earliest claim wins when a text bridges stories
+            owner = next((name for name in owners if name != category), None)
+            self._owners[root] = owner or category
+            if owner:
+                dropped.append((article, owner))
+                continue
+
+            # Roots from before the insert identify this category's copies of the story
+            candidates = [kept.pop(old_root) for old_root in roots if old_root in kept] + [(position, article)]
+            best = candidates[0] if len(candidates) == 1 else max(candidates, key=lambda entry: article_quality(entry[1]))
+            first_position = min(entry[0] for entry in candidates)
+            kept[root] = (first_position, best[1])
+            dropped.extend((entry[1], category) for entry in candidates if entry is not best)
+        return [article for _, article in sorted(kept.values(), key=lambda entry: entry[0])], dropped
@@ -0,0 +1,306 @@
+# backend/edition.py
+# Publishes each run's summaries as one static "edition" for the frontend, so a
+# page view loads a single cacheable file instead of querying Supabase and
+# parsing Markdown in the browser:
+#
+# The files are served by the frontend's /editions route handler
+# (frontend/src/app/editions/[...path]/route.js), which reads the same directory:
+#
+#    <EDITION_DIR>/latest.json            small manifest: edition id, path, ETag (revalidated)
+#    <EDITION_DIR>/v/<id>.json            the edition (immutable; the id is its content hash)
+#    <EDITION_DIR>/v/<id>.json.gz / .br   precompressed copies, sent to clients that accept them
+#                                         (.br needs the optional `brotli` package)
+#
+# An edition holds every category in display (prompt) order with its Markdown,
+# pre-rendered HTML, parsed sources and content hash, plus the column layout
+# the page uses. A category whose latest result is an error keeps its entry from
+# the previous edition. Publishing unchanged content writes nothing.
+
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+from cache import make_cache_key
+from telemetry import get_logger, metrics
+from validator import SUPERSCRIPT_DIGITS, extract_sources, split_sources_section, superscript
+
+try:
+    import brotli  # Optional: .br copies
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+logger = get_logger("edition")
+
+# --- Configuration ---
+EDITION_FORMAT_VERSION = 1
+EDITION_ENABLED = os.getenv("EDITION_PUBLISH", "true").lower() in ("1", "true", "yes")
+# Must match the frontend's EDITION_DIR (both default to backend/.editions). Not
+# frontend/public: Next.js only serves files that were there at build time.
+EDITION_DIR = os.getenv("EDITION_DIR", os.path.join(os.path.dirname(__file__), ".editions"))
+EDITION_KEEP = int(os.getenv("EDITION_KEEP", "10"))  # Older edition files are pruned
+EDITION_MIDDLE_COLUMN = 4  # Longest summaries go to the middle column (as the page used to compute)
+
+_INLINE_PATTERN = re.compile(
+    r"\[(?P<text>[^\]]+)\]\((?P<url>[^)\s]+)\)"         # [text](url)
+    r"|\[(?P<note>\^?[0-9⁰¹²³⁴⁵⁶⁷⁸⁹]+\^?)\]"           # [¹] footnote citation
+    r"|\*\*(?P<strong>.+?)\*\*|__(?P<strong2>.+?)__"    # **bold**
+    r"|(?<![\w*])\*(?P<em>[^*\s][^*]*?)\*(?![\w*])"     # *italic*
+)
+_LIST_ITEM_PATTERN = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_FROM_SUPERSCRIPT = str.maketrans(SUPERSCRIPT_DIGITS, "0123456789")
+
+
+def category_id(category: str) -> str:
+    """Element id of a category section (matches the frontend's generateCategoryId)."""
+    return "category-" + re.sub(r"\s+", "-", category.lower())
+
+
+def _safe_url(url: str) -> str | None:
+    return url if url.lower().startswith(("http://", "https://")) else None
+
+
+def render_inline(text: str, anchor: str) -> str:
+    """Escapes a line of summary text and renders its links, footnotes and emphasis as HTML."""
+    parts = []
+    position = 0
+    for match in _INLINE_PATTERN.finditer(text):
+        parts.append(html.escape(text[position:match.start()]))
+        position = match.end()
+        if match.group("url") is not None:
+            url = _safe_url(match.group("url"))
+            label = html.escape(match.group("text"))
+            parts.append(f'<a href="{html.escape(url)}" target="_blank" rel="noopener noreferrer">{label}</a>'
+                         if url else label)
+        elif match.group("note") is not None:
+            note = match.group("note").strip("^")
+            parts.append(f'<sup><a href="#{anchor}-{note.translate(_FROM_SUPERSCRIPT)}">[{note}]</a></sup>')
+        elif match.group("strong") is not None or match.group("strong2") is not None:
+            parts.append(f"<strong>{render_inline(match.group('strong') or match.group('strong2'), anchor)}</strong>")
+        else:
+            parts.append(f"<em>{render_inline(match.group('em'), anchor)}</em>")
+    parts.append(html.escape(text[position:]))
+    return "".join(parts)
+
+
+def render_summary_html(summary: str, category: str) -> str:
+    """
+    Renders a summary's Markdown subset (paragraphs, bullet lists, emphasis,
+    links, footnotes and the Sources section) as HTML for the edition.
+
+    Returns:
+        str: HTML fragment; every link opens in a new tab and only http(s) URLs are linked.
+    """
+    anchor = f"{category_id(category)}-source"
+    body, heading, section = split_sources_section(summary)
+    blocks = []
+    paragraph: list[str] = []
+    items: list[str] = []
+
+    def close_blocks():
+        if paragraph:
+            blocks.append(f"<p>{'<br>'.join(paragraph)}</p>")
+            paragraph.clear()
+        if items:
+            blocks.append("<ul>" + "".join(f"<li>{item}</li>" for item in items) + "</ul>")
+            items.clear()
+
+    for line in body.strip().splitlines():
+        if not line.strip():
+            close_blocks()
+            continue
+        item = _LIST_ITEM_PATTERN.match(line)
+        if item:
+            if paragraph:
+                close_blocks()
+            items.append(render_inline(line[item.end():].strip(), anchor))
+        elif items and line.startswith((" ", "\t")):
+            items[-1] += " " + render_inline(line.strip(), anchor)  # Continuation of a list item
+        else:
+            if items:
+                close_blocks()
+            paragraph.append(render_inline(line.strip(), anchor))
+    close_blocks()
+
+    sources = extract_sources(summary) if section is not None else []
+    if sources:
+        blocks.append(f'<p class="sources-heading"><strong>{html.escape(heading.strip("*_ :"))}:</strong></p>')
+        lines = []
+        for source in sources:
+            note = source["footnote"]
+            url = _safe_url(source["url"])
+            name = html.escape(source["name"])
+            link = (f'<a href="{html.escape(url)}" target="_blank" rel="noopener noreferrer">{name}</a>'
+                    if url else name)
+            lines.append(f'<li id="{anchor}-{note}">[{superscript(note)}]: {link}</li>')
+        blocks.append('<ul class="sources">' + "".join(lines) + "</ul>")
+    return "\n".join(blocks)
+
+
+def layout_columns(entries: list[dict]) -> dict[str, list[str]]:
+    """Longest summaries in the middle column, the rest alternating left/right."""
+    by_length = sorted(entries, key=lambda entry: -len(entry["summary"]))
+    middle = [entry["category"] for entry in by_length[:EDITION_MIDDLE_COLUMN]]
+    rest = [entry["category"] for entry in by_length[EDITION_MIDDLE_COLUMN:]]
+    return {"left": rest[0::2], "middle": middle, "right": rest[1::2]}
+
+
+def _write_atomic(path: str, data: bytes):
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+class EditionPublisher:
+    """
+    Collects the latest summary of every category and writes editions.
+
+    Thread-safe: the scheduler daemon updates categories from several workers
+    and publishes after each refresh.
+
+    Args:
+        directory (str): Output directory (served as /editions by the frontend).
+        keep (int): Number of edition files to keep besides the current one.
+    """
+
+    def __init__(self, directory: str = EDITION_DIR, keep: int = EDITION_KEEP):
+        self.directory = os.path.abspath(directory)
+        self.keep = max(0, keep)
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()  # One writer of the files at a time
+        self.current: dict | None = None
+        self._load_previous()
+
+    def _load_previous(self):
+        """Seeds the entries from the current edition, so failed categories keep their last summary."""
+        try:
+            with open(os.path.join(self.directory, "latest.json"), encoding="utf-8") as file:
+                manifest = json.load(file)
+            with open(os.path.join(self.directory, "v", f"{manifest['edition']}.json"), encoding="utf-8") as file:
+                edition = json.load(file)
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        if edition.get("version") != EDITION_FORMAT_VERSION:
+            return
+        self.current = manifest
+        for entry in edition.get("categories", []):
+            self._entries[entry["category"]] = entry
+
+    def update(self, category: str, summary: str, updated_at: str | None = None) -> bool:
+        """
+        Sets a category's summary for the next edition. Errors are ignored (the
+        category keeps its previous entry).
+
+        Returns:
+            bool: True if the entry changed.
+        """
+        if not summary or summary.startswith("Error:"):
+            return False
+        content_hash = hashlib.sha256(summary.encode("utf-8")).hexdigest()
+        with self._lock:
+            previous = self._entries.get(category)
+            if previous and previous["content_hash"] == content_hash:
+                return False
+            self._entries[category] = {
+                "category": category,
+                "id": category_id(category),
+                "summary": summary,
+                "html": render_summary_html(summary, category),
+                "sources": extract_sources(summary),
+                "content_hash": content_hash,
+                "updated_at": updated_at or datetime.now(timezone.utc).isoformat(),
+            }
+            return True
+
+    def publish(self, categories: list[str], generation_date: str | None = None) -> dict | None:
+        """
+        Writes the edition (if its content changed) and points latest.json at it.
+
+        Args:
+            categories (list[str]): Categories to include, in display order (the prompts' order).
+            generation_date (str | None): Generation window of the run, for display.
+
+        Returns:
+            dict | None: The manifest written to latest.json, or None on error.
+        """
+        with self._publish_lock:
+            return self._publish(categories, generation_date)
+
+    def _publish(self, categories: list[str], generation_date: str | None) -> dict | None:
+        with self._lock:
+            entries = [dict(self._entries[category], order=order)
+                       for order, category in enumerate(categories) if category in self._entries]
+        if not entries:
+            logger.warning("  [Edition] No summaries to publish.")
+            return None
+        content_hash = make_cache_key("edition", EDITION_FORMAT_VERSION,
+                                      [(entry["category"], entry["order"], entry["content_hash"])
+                                       for entry in entries])
+        edition_id = content_hash[:16]
+        if self.current and self.current.get("edition") == edition_id:
+            logger.info(f"  [Edition] Unchanged ({edition_id}); nothing to publish.")
+            return self.current
+
+        now = datetime.now(timezone.utc).isoformat()
+        etag = f'"{content_hash}"'
+        edition = {
+            "version": EDITION_FORMAT_VERSION,
+            "edition": edition_id,
+            "etag": etag,
+            "generated_at": now,
+            "generation_date": generation_date,
+            "categories": entries,
+            "columns": layout_columns(entries),
+        }
+        data = json.dumps(edition, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        manifest = {
+            "version": EDITION_FORMAT_VERSION,
+            "edition": edition_id,
+            "path": f"/editions/v/{edition_id}.json",
+            "etag": etag,
+            "generated_at": now,
+            "generation_date": generation_date,
+            "bytes": len(data),
+        }
+        try:
+            with metrics.stage("edition_publish", ""):
+                versions_dir = os.path.join(self.directory, "v")
+                os.makedirs(versions_dir, exist_ok=True)
+                path = os.path.join(versions_dir, f"{edition_id}.json")
+                _write_atomic(path, data)
+                # mtime=0 keeps the .gz byte-identical for identical content
+                _write_atomic(f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    _write_atomic(f"{path}.br", brotli.compress(data, quality=11))
+                # The manifest goes last: readers never see an edition that is not fully written
+                _write_atomic(os.path.join(self.directory, "latest.json"),
+                              json.dumps(manifest, indent=2).encode("utf-8"))
+        except OSError as e:
+            logger.error(f"  [Edition] Error writing edition to {self.directory}: {e}")
+            return None
+        self.current = manifest
+        self._prune(versions_dir, edition_id)
+        logger.info(f"  [Edition] Published {edition_id}: {len(entries)} categories, {len(data)} bytes "
+                    f"({os.path.getsize(path + '.gz')} gzipped) -> {manifest['path']}")
+        return manifest
+
+    def _prune(self, versions_dir: str, current_id: str):
+        """Removes all but the `keep` most recent earlier editions (pages may still hold their paths)."""
+        editions = {}
+        for name in os.listdir(versions_dir):
+            edition_id = name.split(".", 1)[0]
+            if edition_id != current_id:
+                modified = os.path.getmtime(os.path.join(versions_dir, name))
+                editions[edition_id] = max(editions.get(edition_id, 0.0), modified)
+        for edition_id in sorted(editions, key=editions.get, reverse=True)[self.keep:]:
+            for suffix in (".json", ".json.gz", ".json.br"):
+                try:
+                    os.remove(os.path.join(versions_dir, edition_id + suffix))
+                except FileNotFoundError:
+                    pass
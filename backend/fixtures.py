@@ -0,0 +1,111 @@
+# backend/fixtures.py
+# Shared pieces of the local API stand-ins (backend/mock_serper.py,
+# backend/mock_openai.py, backend/mock_supabase.py):
+#
+# - FixtureStore: recorded API responses in one JSON file, keyed by a hash of the
+#   request. A stand-in in record mode forwards each request to the real API once
+#   and stores the answer; in replay mode it serves the stored answer offline.
+# - FaultInjector: configurable latency (with jitter) and error rate, so the
+#   pipeline's concurrency, retries and caching can be measured under realistic
+#   conditions (see backend/benchmarks/bench_pipeline.py).
+
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from cache import make_cache_key
+
+FIXTURE_VERSION = 1
+
+
+class FixtureStore:
+    """
+    Recorded responses grouped by namespace ('serper', 'openai'), persisted as JSON.
+
+    Thread-safe; `save()` writes atomically, so an interrupted recording never
+    leaves a truncated file behind.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._entries: dict[str, dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") != FIXTURE_VERSION:
+                raise ValueError(f"{path}: unsupported fixture version {data.get('version')!r}")
+            self._entries = data.get("entries", {})
+
+    @staticmethod
+    def key(*parts) -> str:
+        return make_cache_key(*parts)
+
+    def get(self, namespace: str, key: str):
+        with self._lock:
+            return self._entries.get(namespace, {}).get(key)
+
+    def put(self, namespace: str, key: str, value):
+        with self._lock:
+            self._entries.setdefault(namespace, {})[key] = value
+            self._dirty = True
+
+    def count(self, namespace: str) -> int:
+        with self._lock:
+            return len(self._entries.get(namespace, {}))
+
+    def save(self):
+        """Writes the store to `path` if anything was recorded."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({"version": FIXTURE_VERSION, "entries": self._entries}, ensure_ascii=False,
+                                 sort_keys=True)
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(payload)
+        os.replace(tmp_path, self.path)
+
+
+class FaultInjector:
+    """
+    Simulated network conditions for a stand-in server.
+
+    Args:
+        latency (float): Mean added latency in seconds.
+        jitter (float): Relative spread of the latency (0.5 -> +/-50%, uniform).
+        error_rate (float): Probability that a request fails with a retryable status.
+        seed (int | None): Seed for reproducible runs.
+    """
+
+    ERROR_STATUSES = (500, 503, 429)
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.5, error_rate: float = 0.0, seed: int | None = None):
+        self.latency = max(0.0, latency)
+        self.jitter = max(0.0, min(1.0, jitter))
+        self.error_rate = max(0.0, min(1.0, error_rate))
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0}
+
+    def apply(self) -> int | None:
+        """Sleeps for the simulated latency; returns an error status to send, or None."""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+            failed = self._random.random() < self.error_rate
+            status = self._random.choice(self.ERROR_STATUSES) if failed else None
+            if failed:
+                self.stats["errors"] += 1
+        if delay:
+            time.sleep(delay)
+        return status
@@ -0,0 +1,232 @@
+# backend/harvest.py
+# Article harvesting for one category: several Serper queries (the category query
+# plus the sub-topics/synonyms listed in its prompt front matter), optionally
+# several pages each, are sent concurrently and merged into one candidate pool.
+# Candidates are deduplicated by normalized URL and ranked with a score that
+# needs no network access (recency, how many queries found the article, search
+# rank, source diversity and story-cluster coverage), and the top-k are kept.
+#
+#    ---
+#    query: US news
+#    queries: congress, supreme court, white house, federal agencies
+#    pages: 1
+#    ---
+
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from dedup import cluster_articles
+from telemetry import bind_category, get_logger
+
+logger = get_logger("harvest")
+
+# --- Configuration ---
+HARVEST_MAX_FANOUT = int(os.getenv("HARVEST_MAX_FANOUT", "5"))            # Concurrent queries per category
+HARVEST_RESULTS_PER_QUERY = int(os.getenv("HARVEST_RESULTS_PER_QUERY", "10"))
+HARVEST_MAX_PAGES = int(os.getenv("HARVEST_MAX_PAGES", "3"))
+RECENCY_HALF_LIFE_HOURS = float(os.getenv("HARVEST_RECENCY_HALF_LIFE_HOURS", "12"))
+
+# Score weights (see score_candidates)
+RECENCY_WEIGHT = 1.0
+QUERY_HITS_WEIGHT = 0.5
+SEARCH_RANK_WEIGHT = 0.5
+CLUSTER_SIZE_WEIGHT = 0.3
+REPEAT_SOURCE_PENALTY = 0.6   # Score multiplier per already selected article from the same source
+UNKNOWN_AGE_HOURS = 18.0      # Assumed age when Serper gives no parseable date (results are from the last day)
+
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ocid|cmpid|smid|ref|taid)$", re.IGNORECASE)
+_RELATIVE_DATE = re.compile(r"^(\d+)\s*(second|sec|minute|min|hour|hr|day|week|month)s?\s+ago$", re.IGNORECASE)
+_UNIT_SECONDS = {"second": 1, "sec": 1, "minute": 60, "min": 60, "hour": 3600, "hr": 3600,
+                 "day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+_ABSOLUTE_DATE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%d %b %Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S%z")
+
+
+def harvest_queries(template) -> list[str]:
+    """Returns the category's search queries: its main query first, then `queries` metadata."""
+    queries = [template.query]
+    for query in template.metadata_list("queries"):
+        if query.lower() not in (existing.lower() for existing in queries):
+            queries.append(query)
+    return queries
+
+
+def harvest_pages(template) -> int:
+    """Returns how many result pages to request per query (`pages` metadata, capped)."""
+    try:
+        pages = int(template.metadata.get("pages", 1))
+    except ValueError:
+        pages = 1
+    return max(1, min(pages, HARVEST_MAX_PAGES))
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form for deduplication: lowercase scheme/host, no 'www.', fragment or tracking params."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                       if not _TRACKING_PARAMS.match(key)])
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", host, path, query, ""))
+
+
+def parse_published_age(published: str | None, now: float) -> float | None:
+    """
+    Converts a Serper date ('3 hours ago', 'Mar 5, 2025', ISO) to an age in hours.
+
+    Returns:
+        float | None: Age in hours (never negative), or None if unparseable.
+    """
+    if not published:
+        return None
+    text = published.strip()
+    match = _RELATIVE_DATE.match(text)
+    if match:
+        return int(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()] / 3600
+    for date_format in _ABSOLUTE_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return max(0.0, (now - parsed.timestamp()) / 3600)
+    return None
+
+
+def merge_results(results: list[tuple[str, int, list[dict]]]) -> list[dict]:
+    """
+    Merges per-query results into unique candidates keyed by normalized URL.
+
+    The normalized URL is only the merge key: articles keep the URL Serper
+    returned, since some sites need their `www.` host or query parameters.
+
+    Args:
+        results (list): (query, page, articles) per request, in request order.
+
+    Returns:
+        list[dict]: Candidates with 'article', 'queries' (set) and 'best_rank'.
+    """
+    candidates: dict[str, dict] = {}
+    for query, page, articles in results:
+        for position, article in enumerate(articles):
+            if not article.get("url"):
+                continue
+            key = normalize_url(article["url"])
+            rank = (page - 1) * HARVEST_RESULTS_PER_QUERY + position
+            candidate = candidates.get(key)
+            if candidate is None:
+                candidates[key] = {"article": dict(article), "queries": {query}, "best_rank": rank}
+                continue
+            candidate["queries"].add(query)
+            candidate["best_rank"] = min(candidate["best_rank"], rank)
+            # Keep whichever copy carries the longer snippet / a date
+            current = candidate["article"]
+            if len(article.get("description") or "") > len(current.get("description") or ""):
+                candidate["article"] = dict(article)
+            elif not current.get("publishedAt") and article.get("publishedAt"):
+                current["publishedAt"] = article["publishedAt"]
+    return list(candidates.values())
+
+
+def score_candidates(candidates: list[dict], num_queries: int, now: float | None = None) -> list[float]:
+    """
+    Base score per candidate, computable offline:
+      recency     exp(-age * ln2 / half-life), from publishedAt
+      query hits  share of the category's queries that returned the article
+      search rank 1 / (1 + best rank across queries)
+    """
+    now = time.time() if now is None else now
+    scores = []
+    for candidate in candidates:
+        age = parse_published_age(candidate["article"].get("publishedAt"), now)
+        age = UNKNOWN_AGE_HOURS if age is None else age
+        recency = math.exp(-age * math.log(2) / RECENCY_HALF_LIFE_HOURS)
+        hits = len(candidate["queries"]) / max(1, num_queries)
+        rank = 1 / (1 + candidate["best_rank"])
+        scores.append(RECENCY_WEIGHT * recency + QUERY_HITS_WEIGHT * hits + SEARCH_RANK_WEIGHT * rank)
+    return scores
+
+
+def select_top_k(candidates: list[dict], scores: list[float], top_k: int) -> list[dict]:
+    """
+    Greedy top-k: one article per story cluster (widely covered clusters score
+    higher), with a penalty for every article already taken from the same source.
+    """
+    clusters = cluster_articles([candidate["article"] for candidate in candidates])
+    cluster_of = {}
+    for cluster_id, members in enumerate(clusters):
+        for member in members:
+            cluster_of[member] = cluster_id
+    base = [score + CLUSTER_SIZE_WEIGHT * math.log1p(len(clusters[cluster_of[index]]) - 1)
+            for index, score in enumerate(scores)]
+
+    selected, used_clusters, source_counts = [], set(), {}
+    remaining = set(range(len(candidates)))
+    while remaining and len(selected) < top_k:
+        def adjusted(index: int) -> tuple:
+            source = ((candidates[index]["article"].get("source") or {}).get("name") or "").lower()
+            return (base[index] * REPEAT_SOURCE_PENALTY ** source_counts.get(source, 0), -index)
+
+        best = max(remaining, key=adjusted)
+        remaining.discard(best)
+        if cluster_of[best] in used_clusters:
+            continue
+        used_clusters.add(cluster_of[best])
+        source = ((candidates[best]["article"].get("source") or {}).get("name") or "").lower()
+        source_counts[source] = source_counts.get(source, 0) + 1
+        selected.append(candidates[best]["article"])
+    return selected
+
+
+def harvest_articles(category: str, queries: list[str], fetch, top_k: int, pages: int = 1,
+                     semaphore: threading.Semaphore | None = None,
+                     max_fanout: int = HARVEST_MAX_FANOUT, now: float | None = None) -> list[dict]:
+    """
+    Runs every (query, page) request concurrently and returns the top-k articles.
+
+    Args:
+        category (str): Category name (for logging).
+        queries (list[str]): Search queries, most important first.
+        fetch (callable): fetch(query, page) -> list of article dicts.
+        top_k (int): Number of articles to return.
+        pages (int): Result pages per query.
+        semaphore (Semaphore | None): Global cap on in-flight search requests.
+        max_fanout (int): Max concurrent requests for this category.
+        now (float | None): Reference time for recency scoring.
+
+    Returns:
+        list[dict]: The selected articles, best first, with the URLs Serper returned.
+    """
+    requests_to_send = [(query, page) for page in range(1, pages + 1) for query in queries]
+
+    def run(request):
+        query, page = request
+        with bind_category(category):  # Attribute the request's HTTP/cache metrics to the category
+            if semaphore is None:
+                return fetch(query, page)
+            with semaphore:
+                return fetch(query, page)
+
+    started = time.perf_counter()
+    if len(requests_to_send) == 1:
+        responses = [run(requests_to_send[0])]
+    else:
+        workers = max(1, min(max_fanout, len(requests_to_send)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="harvest") as executor:
+            responses = list(executor.map(run, requests_to_send))
+
+    candidates = merge_results([(query, page, articles or [])
+                                for (query, page), articles in zip(requests_to_send, responses)])
+    scores = score_candidates(candidates, len(queries), now)
+    selected = select_top_k(candidates, scores, top_k)
+    logger.info(f"  [{category}] Harvested {len(candidates)} unique candidates from {len(requests_to_send)} "
+                f"queries in {time.perf_counter() - started:.2f}s; selected {len(selected)}.")
+    return selected
@@ -0,0 +1,330 @@
+# backend/http_session.py
+# Shared, pooled HTTP sessions for outbound API calls (Serper and future fetchers).
+# Each named session keeps connections alive, applies a per-request timeout,
+# retries transient failures with jittered exponential backoff (honoring
+# 429/Retry-After) and trips a circuit breaker after repeated failures.
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from telemetry import current_category, get_logger, metrics
+
+logger = get_logger("http_session")
+
+# --- Configuration ---
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "15"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE_SECONDS = float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+HTTP_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "20"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Exceptions worth retrying; any other RequestException (e.g. TooManyRedirects, InvalidURL) fails at once
+RETRYABLE_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                        requests.exceptions.ChunkedEncodingError)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised when a request is refused because the session's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed/open/half-open circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are refused for `reset_seconds`. The first call after that is let through
+    as a probe (half-open); success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.open_count = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        """Returns True if a request may be sent right now."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or self.consecutive_failures >= self.failure_threshold:
+                if self.opened_at is None or was_probe:
+                    self.open_count += 1
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Lets another probe through when a probe ended without a recorded outcome."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses a Retry-After header (delta-seconds or HTTP-date).
+
+    Returns:
+        float | None: Seconds to wait, or None if the header is missing/invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class PooledSession:
+    """
+    A keep-alive `requests.Session` with timeouts, retries and a circuit breaker.
+
+    Thread-safe for concurrent use by the category pipeline. Counters are
+    available through `get_stats()`.
+    """
+
+    def __init__(self, name: str, timeout: float = HTTP_TIMEOUT_SECONDS,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT_SECONDS,
+                 max_retries: int = HTTP_MAX_RETRIES, backoff_base: float = HTTP_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = HTTP_BACKOFF_MAX_SECONDS, pool_size: int = HTTP_POOL_SIZE,
+                 breaker: CircuitBreaker | None = None):
+        self.name = name
+        self.timeout = (connect_timeout, timeout)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+        # Retries are handled here (not by urllib3) so they can be counted and
+        # can honor Retry-After consistently.
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,          # logical requests (one per call to request())
+            "attempts": 0,          # HTTP attempts including retries
+            "retries": 0,
+            "failures": 0,          # logical requests that ultimately failed
+            "circuit_rejections": 0,
+            "total_latency_seconds": 0.0,   # wall time of all attempts
+            "retry_wait_seconds": 0.0,      # time spent sleeping between attempts
+            "bytes_received": 0,
+        }
+
+    # --- Stats ---
+    def _bump(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def connections_opened(self) -> int:
+        """Number of TCP(+TLS) connections opened so far across this session's pools."""
+        total = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                total += getattr(pool, "num_connections", 0)
+        return total
+
+    def get_stats(self) -> dict:
+        """Returns a snapshot of this session's retry/latency counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["name"] = self.name
+        stats["connections_opened"] = self.connections_opened()
+        stats["circuit_state"] = self.breaker.state
+        stats["circuit_opens"] = self.breaker.open_count
+        return stats
+
+    # --- Requests ---
+    def _backoff_delay(self, attempt: int, response: requests.Response | None) -> float:
+        """Full-jitter exponential backoff, overridden by a server Retry-After."""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request, retrying transient failures.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Target URL.
+            **kwargs: Passed through to `requests.Session.request`. A `timeout`
+                      here overrides the session default.
+
+        Returns:
+            requests.Response: The final response. Non-retryable error statuses
+                               are returned as-is; callers use raise_for_status().
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            requests.exceptions.RequestException: If every attempt failed.
+        """
+        self._bump(requests=1)
+        category = current_category()
+        metrics.inc("http_requests_total", service=self.name, category=category)
+        if not self.breaker.allow_request():
+            self._bump(circuit_rejections=1, failures=1)
+            raise CircuitOpenError(f"Circuit open for '{self.name}' session; refusing request to {url}")
+
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            return self._send(method, url, category, **kwargs)
+        except BaseException:
+            # A half-open probe must never stay in flight, or the circuit would stay open for good
+            self.breaker.release_probe()
+            raise
+
+    def _send(self, method: str, url: str, category: str, **kwargs) -> requests.Response:
+        """The retry loop of request(); records the outcome on the circuit breaker."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            response = None
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except RETRYABLE_EXCEPTIONS as e:
+                last_error = e
+            except requests.exceptions.RequestException:
+                self._record_failure(category)
+                raise
+            finally:
+                self._bump(attempts=1, total_latency_seconds=time.perf_counter() - started)
+
+            if response is not None:
+                self._bump(bytes_received=len(response.content))
+                metrics.inc("http_bytes_received_total", len(response.content), service=self.name, category=category)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    # Client errors (other than 429) are the caller's problem, not the service's
+                    self.breaker.record_success()
+                    return response
+                last_error = requests.exceptions.HTTPError(
+                    f"{response.status_code} from {url}", response=response)
+
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff_delay(attempt, response)
+            logger.warning(f"  [HTTP:{self.name}] Attempt {attempt + 1} failed ({last_error}); retrying in {delay:.2f}s")
+            self._bump(retries=1, retry_wait_seconds=delay)
+            metrics.inc("http_retries_total", service=self.name, category=category)
+            time.sleep(delay)
+
+        self._record_failure(category)
+        if response is not None:
+            # Hand back the last retryable response so callers can inspect it
+            return response
+        raise last_error
+
+    def _record_failure(self, category: str):
+        self.breaker.record_failure()
+        self._bump(failures=1)
+        metrics.inc("http_failures_total", service=self.name, category=category)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+# --- Session Registry ---
+_sessions: dict[str, PooledSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name: str, **options) -> PooledSession:
+    """
+    Returns the shared session for `name`, creating it on first use.
+
+    Options are only applied when the session is first created.
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = PooledSession(name, **options)
+            _sessions[name] = session
+        return session
+
+
+def reset_sessions():
+    """Closes and forgets every shared session (fresh pools, counters and circuit breakers)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.session.close()
+
+
+def get_all_session_stats() -> list[dict]:
+    """Returns stats for every session created in this process."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    return [session.get_stats() for session in sessions]
+
+
+def print_session_stats():
+    """Logs a one-line summary per session (retries, latency, connections)."""
+    for stats in get_all_session_stats():
+        logger.info(
+            f"  [HTTP:{stats['name']}] requests={stats['requests']} attempts={stats['attempts']} "
+            f"retries={stats['retries']} failures={stats['failures']} "
+            f"connections_opened={stats['connections_opened']} "
+            f"latency={stats['total_latency_seconds']:.2f}s retry_wait={stats['retry_wait_seconds']:.2f}s "
+            f"circuit={stats['circuit_state']}"
+        )
@@ -0,0 +1,181 @@
+# backend/incremental.py
+# Incremental regeneration. Each saved summary carries a fingerprint of what it
+# was generated from: the category's chosen article URLs, its prompt
+# (PromptTemplate.content_hash plus the shared static prompt) and the model.
+# Before generating, the pipeline compares the current fingerprint with the one
+# stored in latest_summaries:
+#
+# - unchanged (or only a small share of the article set changed): the OpenAI
+#   call and the daily_summaries insert are skipped; only latest_summaries.checked_at
+#   is bumped so readers can see the summary is still current.
+# - materially changed: the category is regenerated, optionally as a delta that
+#   updates the previous summary instead of starting from scratch.
+#
+# Needs the columns from backend/migrations/003_summary_fingerprints.sql.
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+
+from cache import make_cache_key
+from prompt_builder import STATIC_SYSTEM_PREFIX, USER_MESSAGE
+from prompt_registry import PromptTemplate
+from telemetry import get_logger
+
+logger = get_logger("incremental")
+
+# --- Configuration ---
+INCREMENTAL_ENABLED = os.getenv("INCREMENTAL_REGENERATION", "false").lower() in ("1", "true", "yes")
+INCREMENTAL_DELTA = os.getenv("INCREMENTAL_DELTA", "false").lower() in ("1", "true", "yes")
+# Share of the article set (1 - Jaccard similarity of the URL sets) that must
+# change before a category is regenerated. The default 0 regenerates on any
+# change; note that one swapped article out of 7 is already a change of 0.25.
+INCREMENTAL_MIN_CHANGE = float(os.getenv("INCREMENTAL_MIN_CHANGE", "0"))
+FINGERPRINT_VERSION = 1
+# Stored results that must never be reused or built upon
+_NOT_REUSABLE_PREFIXES = ("Error",)
+
+DELTA_INSTRUCTION = (
+    "PREVIOUS SUMMARY (published earlier for this category; its footnote numbers refer to older context):\n"
+    "{previous}\n\n"
+    "Update the previous summary using the CONTEXT articles above: keep items the articles still support, "
+    "revise items with new developments, add newly reported stories and drop items no longer covered. "
+    "Footnotes and the Sources section must reference ONLY the numbered CONTEXT articles."
+)
+
+
+def article_urls(articles: list[dict]) -> list[str]:
+    """The sorted, de-duplicated URLs of an article set (titles stand in for missing URLs)."""
+    return sorted({article.get("url") or f"title:{article.get('title', '')}" for article in articles})
+
+
+def source_fingerprint(urls: list[str], prompt_hash: str, model: str) -> str:
+    """Fingerprint of a summary's inputs: article URLs, category prompt, shared prompt and model."""
+    return make_cache_key("sources", FINGERPRINT_VERSION, model, prompt_hash, STATIC_SYSTEM_PREFIX, USER_MESSAGE,
+                          sorted(urls))
+
+
+def change_ratio(previous_urls: list[str], current_urls: list[str]) -> float:
+    """Share of the combined article set that is not in both runs (0.0 = identical, 1.0 = disjoint)."""
+    previous, current = set(previous_urls), set(current_urls)
+    union = previous | current
+    if not union:
+        return 0.0
+    return 1.0 - len(previous & current) / len(union)
+
+
+def build_delta_message(user_message: str, previous_summary: str) -> str:
+    """Appends the previous summary and the update instructions to a category's user message."""
+    return f"{user_message}\n\n{DELTA_INSTRUCTION.format(previous=previous_summary.strip())}"
+
+
+@dataclass
+class StoredSummary:
+    """What latest_summaries holds for a category."""
+
+    fingerprint: str | None
+    source_urls: list[str] = field(default_factory=list)
+    summary: str = ""
+
+
+@dataclass
+class SourceCheck:
+    """
+    The incremental decision for one category.
+
+    `columns` are the extra daily_summaries/latest_summaries columns to write
+    with a regenerated summary; `previous_summary` is set when it should be
+    generated as a delta.
+    """
+
+    category: str
+    fingerprint: str
+    source_urls: list[str]
+    unchanged: bool
+    change: float | None = None           # None when there is no usable stored summary
+    previous_summary: str | None = None   # Stored summary to reuse (unchanged) or update (delta)
+    delta: bool = False
+
+    @property
+    def columns(self) -> dict:
+        return {"fingerprint": self.fingerprint, "source_urls": json.dumps(self.source_urls)}
+
+
+class SourceTracker:
+    """
+    Compares each category's current inputs with those of its stored summary.
+
+    Thread-safe. `record()` updates the in-memory state after a summary is
+    queued, so a long-running daemon compares against its own latest writes.
+    """
+
+    def __init__(self, stored: dict[str, StoredSummary] | None = None, model: str = "",
+                 min_change: float = INCREMENTAL_MIN_CHANGE, delta: bool = INCREMENTAL_DELTA):
+        self.model = model
+        self.min_change = max(0.0, min_change)
+        self.delta = delta
+        self._stored = dict(stored or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, client, model: str, table_name: str = "latest_summaries", **options) -> "SourceTracker | None":
+        """
+        Reads the stored fingerprints from latest_summaries.
+
+        Returns:
+            SourceTracker | None: None if the table cannot be read (e.g. migration 003
+                                  has not been applied), in which case every category
+                                  is regenerated as before.
+        """
+        if not client:
+            logger.warning("  [Incremental] Supabase client not initialized; regenerating every category.")
+            return None
+        try:
+            response = client.table(table_name).select("category, fingerprint, source_urls, summary").execute()
+        except Exception as e:
+            logger.error(f"  [Incremental] Error reading fingerprints from '{table_name}': {e}")
+            logger.error("    Please ensure backend/migrations/003_summary_fingerprints.sql has been applied.")
+            return None
+        stored = {}
+        for row in response.data or []:
+            try:
+                urls = json.loads(row.get("source_urls") or "[]")
+            except (TypeError, ValueError):
+                urls = []
+            stored[row["category"]] = StoredSummary(row.get("fingerprint"), urls, row.get("summary") or "")
+        logger.info(f"  [Incremental] Loaded fingerprints for {sum(1 for s in stored.values() if s.fingerprint)} "
+                    f"of {len(stored)} stored categories.")
+        return cls(stored, model, **options)
+
+    def check(self, template: PromptTemplate, articles: list[dict], model: str | None = None) -> SourceCheck:
+        """Decides whether a category's claimed `articles` warrant a new summary (with `model`, default self.model)."""
+        category = template.display_name
+        model = model or self.model
+        urls = article_urls(articles)
+        fingerprint = source_fingerprint(urls, template.content_hash, model)
+        with self._lock:
+            stored = self._stored.get(category)
+        if (stored is None or not stored.fingerprint or not stored.summary
+                or stored.summary.startswith(_NOT_REUSABLE_PREFIXES)):
+            return SourceCheck(category, fingerprint, urls, unchanged=False)
+        if stored.fingerprint == fingerprint:
+            return SourceCheck(category, stored.fingerprint, stored.source_urls, True, 0.0, stored.summary)
+        # Same prompt and model as the stored summary? Then only the articles differ.
+        if source_fingerprint(stored.source_urls, template.content_hash, model) != stored.fingerprint:
+            logger.info(f"  [{category}] [Incremental] Prompt or model changed; regenerating.")
+            return SourceCheck(category, fingerprint, urls, unchanged=False)
+        change = change_ratio(stored.source_urls, urls)
+        if urls and change < self.min_change:
+            # Keep the stored fingerprint: it still describes what the summary was built from
+            return SourceCheck(category, stored.fingerprint, stored.source_urls, True, change, stored.summary)
+        if self.delta and urls:
+            return SourceCheck(category, fingerprint, urls, False, change, stored.summary, delta=True)
+        return SourceCheck(category, fingerprint, urls, False, change)
+
+    def record(self, check: SourceCheck, summary: str):
+        """Remembers a queued summary; errors are not remembered, so they are retried next time."""
+        if summary.startswith(_NOT_REUSABLE_PREFIXES):
+            return
+        with self._lock:
+            self._stored[check.category] = StoredSummary(check.fingerprint, list(check.source_urls), summary)
@@ -18,20 +18,54 @@
 # 6. Update SUPABASE_URL in .env with your actual Supabase project URL.
 # 7. Run the script from the project root directory:
 #    python backend/main.py
+#    Optional: choose how categories are processed (default: concurrent):
+#    python backend/main.py --mode serial
+#    python backend/main.py --mode concurrent --max-workers 9
+#    python backend/main.py --mode batch   # OpenAI Batch API (cheaper, not latency-sensitive)
 # ---
 
 import os
 import json  # Added for Serper API request
+import argparse
+import logging
+import threading
+import time
 import requests  # Added for Serper API request
-from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from dotenv import load_dotenv
 from openai import OpenAI
 from supabase import create_client, Client
+from http_session import get_all_session_stats, get_session, print_session_stats
+from cache import DiskCache, make_cache_key, time_bucket
+from batch_mode import run_batch_summaries
+from prompt_registry import PromptRegistry, PromptRegistryError, PromptTemplate
+from scheduler import CategoryScheduler
+from dedup import StoryClaims
+from article_fetcher import ARTICLE_FETCH_ENABLED, ArticleFetcher
+from incremental import (INCREMENTAL_DELTA, INCREMENTAL_ENABLED, INCREMENTAL_MIN_CHANGE, SourceCheck,
+                         SourceTracker, build_delta_message)
+from edition import EDITION_DIR, EDITION_ENABLED, EditionPublisher
+from model_router import MODEL_ROUTES, ModelRoute, ModelRouter, ModelRouterError, parse_routes
+from validator import (VALIDATION_ENABLED, VALIDATION_MAX_REPAIRS, build_repair_messages, extract_sources,
+                       validate_summary)
+from harvest import HARVEST_RESULTS_PER_QUERY, harvest_articles, harvest_pages, harvest_queries
+from prompt_builder import (PROMPT_CONTEXT_TOKEN_BUDGET, build_category_prompt, get_token_usage,
+                            print_token_usage, record_token_usage, usage_from_response)
+from streaming import SummaryEventBroadcaster, consume_chat_stream, get_stream_metrics, print_stream_metrics
+from supabase_writer import (SummaryWriteBuffer, generation_timestamp, replay_journal,
+                             upsert_summary_rows)
+from telemetry import (LOG_FORMAT, LOG_LEVEL, LOG_PROMPTS, METRICS_DIR, MetricsServer, bind_category,
+                       configure_logging, get_logger, metrics, record_completion, write_openmetrics,
+                       write_run_summary)
 # Removed urlparse import
 # Removed NewsApiClient import
 # Removed re import (no longer needed)
 # Removed timedelta import (no longer needed)
 
+logger = get_logger("main")
+prompt_logger = get_logger("prompts")  # Full prompts/completions; enabled by --verbose-prompts
+
 # --- Configuration ---
 # Load environment variables from .env file located in the same directory as the script
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -41,55 +75,123 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")  # Load Serper Key
+# Optional Serper-compatible endpoint (e.g. backend/mock_serper.py for local testing)
+SERPER_BASE_URL = os.getenv("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/")
 
 # Load model from .env or use default
 MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-4o")
+# Optional OpenAI-compatible endpoint (e.g. backend/mock_openai.py for local testing)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+OPENAI_TEMPERATURE = 0.1  # Low temperature for factual summaries
+OPENAI_MAX_TOKENS = 600   # Increased slightly for URLs in sources
 
 # Adjust the path to be relative to the script's location
 PROMPTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'prompts')
-DAILY_PROMPTS_FILE = os.path.join(PROMPTS_DIR, "daily-prompts.md")  # This remains but is unused by load_category_prompts
+
+# Pipeline concurrency settings (overridable from the command line)
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "concurrent")  # 'serial', 'concurrent' or 'batch'
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "9"))
+SERPER_CONCURRENCY = int(os.getenv("SERPER_CONCURRENCY", "8"))
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "4"))
+SUPABASE_CONCURRENCY = int(os.getenv("SUPABASE_CONCURRENCY", "2"))
+
+# Local result caches (see backend/cache.py). Serper results are keyed on a time
+# bucket so a rerun inside the same window reuses them; pin CACHE_TIME_BUCKET (or
+# pass --cache-bucket) to replay an earlier run. --offline never calls the APIs.
+SERPER_CACHE_TTL = int(os.getenv("SERPER_CACHE_TTL", str(6 * 60 * 60)))
+SERPER_CACHE_BUCKET_SECONDS = int(os.getenv("SERPER_CACHE_BUCKET_SECONDS", str(60 * 60)))
+OPENAI_CACHE_TTL = int(os.getenv("OPENAI_CACHE_TTL", str(7 * 24 * 60 * 60)))
+CACHE_TIME_BUCKET = os.getenv("CACHE_TIME_BUCKET")  # Optional fixed bucket for replays
+OFFLINE_MODE = False  # Set by --offline: serve from cache only
+
+serper_cache = DiskCache("serper", ttl_seconds=SERPER_CACHE_TTL)
+openai_cache = DiskCache("openai", ttl_seconds=OPENAI_CACHE_TTL)
+
+# Optional full-article enrichment (see backend/article_fetcher.py); created by
+# configure_article_fetcher when --fetch-articles / ARTICLE_FETCH_ENABLED is set
+article_fetcher: ArticleFetcher | None = None
+
+# Optional incremental regeneration (see backend/incremental.py); created by
+# configure_incremental when --incremental / INCREMENTAL_REGENERATION is set
+source_tracker: SourceTracker | None = None
+
+# Static edition for the frontend (see backend/edition.py); created by
+# configure_edition unless --no-edition / EDITION_PUBLISH=false
+edition_publisher: EditionPublisher | None = None
+
+# Model routing (see backend/model_router.py); created by configure_model_router.
+# Without it every request goes to MODEL_NAME through the OpenAI client directly.
+model_router: ModelRouter | None = None
 
 # Supabase Table Schema Definition (for reference)
 # Table Name: daily_summaries
 # Columns:
 #   id: bigint (auto-incrementing primary key)
 #   created_at: timestamp with time zone (default: now())
-#   generation_date: timestamptz (index)
+#   generation_date: timestamptz (index; start of the run's generation window)
 #   category: text (index)
 #   summary: text
-#   sources: text (stores JSON string: '[{"name": "Source Name", "url": "..."}, ...]')
+#   sources: text (stores JSON string: '[{"name": "Short Header", "url": "...", "footnote": 1}, ...]',
+#            parsed from the summary's Sources section by backend/validator.py)
+# Constraints: unique (generation_date, category) -- see backend/migrations/
 
 # --- OpenAI Client Initialization ---
 def initialize_openai_client() -> OpenAI:
     """Initializes and returns the OpenAI client."""
     if not OPENAI_API_KEY:
-        print("Error: OPENAI_API_KEY not found in backend/.env file.")
+        if OFFLINE_MODE:
+            # Offline replays never reach the API; a placeholder key keeps the client constructible
+            return OpenAI(api_key="offline")
+        logger.error("Error: OPENAI_API_KEY not found in backend/.env file.")
         exit(1)
-    return OpenAI(api_key=OPENAI_API_KEY)
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
 
 # --- Serper News API Integration (NEW) ---
-def fetch_serper_articles(query: str, num_results: int = 5) -> list[dict]:
+def current_serper_bucket(bucket_seconds: int | None = None) -> int:
+    """Returns the cache time bucket for Serper lookups (pinned by CACHE_TIME_BUCKET)."""
+    if CACHE_TIME_BUCKET:
+        return int(CACHE_TIME_BUCKET)
+    return time_bucket(bucket_seconds or SERPER_CACHE_BUCKET_SECONDS)
+
+
+def fetch_serper_articles(query: str, num_results: int = 5, bucket_seconds: int | None = None,
+                          page: int = 1) -> list[dict]:
     """
     Fetches recent news articles from Serper News API based on a query.
+    Results are cached on disk per (query, num, tbs, page, time bucket).
 
     Args:
         query (str): Search query (e.g., category name).
         num_results (int): Max number of results to fetch.
+        bucket_seconds (int | None): Cache window width; defaults to SERPER_CACHE_BUCKET_SECONDS.
+        page (int): Result page (1-based).
 
     Returns:
         list[dict]: A list of articles, formatted similarly to the previous API.
                     Keys include 'title', 'link' (as 'url'), 'snippet' (as 'description'),
                     'source'. Returns empty list on error or if no key is found.
     """
+    tbs = "qdr:d"  # Filter for results from the last 24 hours ('d' for day)
+    cache_parts = ("serper", query, num_results, tbs) + ((page,) if page > 1 else ())  # Page 1 keeps its old keys
+    cache_key = make_cache_key(*cache_parts, current_serper_bucket(bucket_seconds))
+    cached = serper_cache.get(cache_key, ignore_ttl=OFFLINE_MODE)
+    if cached is not None:
+        logger.info(f"  [Serper] Cache hit for query: '{query}' ({len(cached)} articles)")
+        return cached
+    if OFFLINE_MODE:
+        logger.warning(f"  [Serper] Offline mode: no cached results for query: '{query}'.")
+        return []
+
     if not SERPER_API_KEY:
-        print("Error: SERPER_API_KEY not found in backend/.env file. Skipping Serper search.")
+        logger.error("Error: SERPER_API_KEY not found in backend/.env file. Skipping Serper search.")
         return []
 
-    serper_url = "https://google.serper.dev/news"
+    serper_url = f"{SERPER_BASE_URL}/news"
     payload = json.dumps({
         "q": query,
         "num": num_results,
-        "tbs": "qdr:d"  # Filter for results from the last 24 hours ('d' for day)
+        "tbs": tbs,
+        **({"page": page} if page > 1 else {})
     })
     headers = {
         'X-API-KEY': SERPER_API_KEY,
@@ -97,8 +199,9 @@ def fetch_serper_articles(query: str, num_results: int = 5) -> list[dict]:
     }
 
     try:
-        print(f"  [Serper] Fetching results for query: '{query}' (last 24 hours)")
-        response = requests.post(serper_url, headers=headers, data=payload)
+        logger.info(f"  [Serper] Fetching results for query: '{query}' (last 24 hours, page {page})")
+        # Shared keep-alive session with timeouts, retry/backoff and a circuit breaker
+        response = get_session("serper").post(serper_url, headers=headers, data=payload)
         response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
 
         search_results = response.json()
@@ -118,32 +221,59 @@ def fetch_serper_articles(query: str, num_results: int = 5) -> list[dict]:
                     "publishedAt": article.get("date", None)  # Serper provides 'date'
                 })
 
-        print(f"  [Serper] Found {len(formatted_articles)} relevant articles.")
-        return formatted_articles[:num_results]  # Ensure we don't exceed num_results
+        logger.info(f"  [Serper] Found {len(formatted_articles)} relevant articles.")
+        formatted_articles = formatted_articles[:num_results]  # Ensure we don't exceed num_results
+        serper_cache.set(cache_key, formatted_articles)
+        return formatted_articles
 
     except requests.exceptions.RequestException as e:
-        print(f"Error during Serper API request: {e}")
+        logger.error(f"Error during Serper API request: {e}")
         # Attempt to get more specific error details from response if available
         try:
             error_details = response.json()
-            print(f"  Serper Error Details: {error_details}")
+            logger.error(f"  Serper Error Details: {error_details}")
         except Exception:
             # If response wasn't JSON or doesn't exist
             if 'response' in locals() and response is not None:
-                print(f"  Serper Response Status: {response.status_code}")
-                print(f"  Serper Response Text: {response.text[:200]}...")  # Log snippet of text
+                logger.error(f"  Serper Response Status: {response.status_code}")
+                logger.error(f"  Serper Response Text: {response.text[:200]}...")  # Log snippet of text
         return []
     except json.JSONDecodeError:
-        print("Error decoding Serper JSON response.")
-        print(f"  Serper Response Text: {response.text[:200]}...")
+        logger.error("Error decoding Serper JSON response.")
+        logger.error(f"  Serper Response Text: {response.text[:200]}...")
         return []
     except Exception as e:
-        print(f"An unexpected error occurred during Serper fetch: {e}")
+        logger.error(f"An unexpected error occurred during Serper fetch: {e}")
         return []
 
 
 # --- OpenAI Integration (Modified for footnote headers & Serper context) ---
-def get_openai_summary_with_context(client: OpenAI, category: str, category_instruction: str, news_articles: list[dict]) -> str:
+def build_summary_prompt(category: str, category_instruction: str, news_articles: list[dict],
+                         token_budget: int = PROMPT_CONTEXT_TOKEN_BUDGET) -> dict:
+    """
+    Builds the chat messages used to summarize a category.
+
+    Shared by the synchronous/streaming path (`get_openai_summary_with_context`)
+    and the Batch API path (backend/batch_mode.py) so both send identical prompts.
+    See backend/prompt_builder.py for the static prefix and token budgeting.
+
+    Args:
+        category (str): The name of the category being processed (for logging).
+        category_instruction (str): The specific instruction for the news category.
+        news_articles (list[dict]): A list of article dicts from Serper API.
+        token_budget (int): Max tokens of article context to include.
+
+    Returns:
+        dict: 'system_prompt', 'user_message', 'article_links' (footnote index -> URL)
+              and 'prompt_tokens' (estimate), or just 'error' (an "Error: ..." message)
+              if there is nothing to summarize.
+    """
+    return build_category_prompt(category, category_instruction, news_articles, token_budget)
+
+
+def get_openai_summary_with_context(client: OpenAI, category: str, category_instruction: str, news_articles: list[dict],
+                                    token_budget: int = PROMPT_CONTEXT_TOKEN_BUDGET, stream: bool = False,
+                                    on_partial=None, previous_summary: str | None = None) -> str:
     """
     Generates a summary using OpenAI with short footnote headers, informed by Serper articles.
     The summary content itself should NOT include the main category title (e.g., **World News**).
@@ -153,306 +283,942 @@ def get_openai_summary_with_context(client: OpenAI, category: str, category_inst
         category (str): The name of the category being processed (for logging).
         category_instruction (str): The specific instruction for the news category.
         news_articles (list[dict]): A list of article dicts from Serper API.
+        token_budget (int): Max tokens of article context (from the prompt's metadata).
+        stream (bool): Consume the completion as a token stream (records time-to-first-token
+                       and tokens/sec, see backend/streaming.py).
+        on_partial (callable | None): With `stream`, called as on_partial(category, text_so_far).
+        previous_summary (str | None): Generate a delta that updates this earlier summary
+                                       (see backend/incremental.py).
 
     Returns:
         str: Formatted summary text with linked short footnote headers (without the main category title).
     """
-    # --- 1. Pre-check for sufficient context ---
-    if not news_articles:
-        print(f"  [{category}] Warning: No articles provided from Serper. Skipping OpenAI generation.")
-        return "Error: Insufficient data to generate summary."
-
-    # --- 2. Prepare context string and structured sources ---
-    context_str = "\n\nRelevant articles from the last 24 hours:\n"
-    # Create a mapping from index to URL for the AI
-    article_links = {idx: article.get('url') for idx, article in enumerate(news_articles, 1) if article.get('url')}
-
-    for idx, article in enumerate(news_articles, 1):
-        title = article.get('title', 'No Title')
-        link = article.get('url')  # Use 'url' which we mapped from Serper's 'link'
-
-        # Use 'description' (mapped from Serper's 'snippet')
-        snippet = article.get('description', '')
-        # Limit snippet length to avoid overly long context
-        snippet = (snippet[:300] + '...') if len(snippet) > 300 else snippet  # Increased length slightly
-
-        if not snippet or not link:  # Skip if no usable snippet or link
-            print(f"  [{category}] Warning: Skipping article {idx} ('{title}') due to missing snippet or link.")
-            continue
-
-        # Source name is now nested under 'source' key
-        source_name_raw = article.get('source', {}).get('name', 'N/A')
-        # Add index and URL to context for AI linking
-        context_str += f"{idx}. Title: {title}\n   Link: {link}\n   Source: {source_name_raw}\n   Snippet: {snippet}\n"
-
-    # --- Debug log for Serper context ---
-    # log_context_str = (context_str[:1000] + '...') if len(context_str) > 1000 else context_str # Removed shortening for debug
-    # print(f"DEBUG: [{category}] Serper context being passed to OpenAI...:\n{log_context_str}")
-    # --- End Debug log ---
-
-    if not article_links:  # Check if we have any articles with links to reference
-        print(f"  [{category}] Error: No valid articles with links remaining after filtering snippets. Cannot generate summary.")
-        return "Error: No valid source data with content to generate summary."
-
-    # --- 3. Construct the system prompt (UPDATED FOR NEWSPAPER FORMAT, FILTERING, NO PARTIAL QUOTES, LINKED FOOTNOTES, NO HEADER) ---
-    system_prompt = (
-        f"You are an AI assistant creating concise, factual news summaries formatted like newspaper articles, based ONLY on objective news reporting found in the provided context.\\n"
-        f"Follow these instructions precisely:\\n"
-        f"1. Analyze the articles provided under 'Relevant articles...'. Each article is numbered and has a Link.\\n"
-        f"CONTEXT:\\n"
-        f"-------\\n"
-        f"{context_str}"
-        f"-------\\n"
-        f"2. **CRITICAL FILTERING STEP:** Before summarizing, evaluate each article snippet in the CONTEXT. **IGNORE and EXCLUDE** any articles that are primarily:\\n"
-        f"   - Opinion pieces, editorials, or personal blogs.\\n"
-        f"   - Analysis or commentary with a strong subjective viewpoint or advocacy.\\n"
-        f"   - Articles focused heavily on polling data, survey results, or complex methodology rather than events.\\n"
-        f"   - Subjective reviews or speculative content.\\n"
-        f"   Focus ONLY on articles that present objective, factual news reporting.\\n"
-        f"3. Based *only* on the factual information in the **filtered, objective articles**, {category_instruction}\\n"
-        f"4. IMPORTANT: Do NOT include the main category title (like '**Category Name**') at the beginning of your response.\\n"
-        f"5. Format each summary item like a short newspaper article: \\n"
-        f"   a. Start with a short, bold Article Header (2-6 words) on its own line. Example: **New Trade Tariffs Announced**\\n"
-        f"   b. Follow the header with a paragraph (2-5 sentences) summarizing the key factual information. DO NOT use bullet points.\\n"
-        f"   c. Include footnote references like [¹], [²], etc. within the summary paragraph, referencing ONLY the objective articles used.\\n"
-        f"6. **WRITING STYLE:**\\n"
-        f"   a. Maintain a neutral, objective tone.\\n"
-        f"   b. **AVOID partial quotes.** Do not pull short phrases in quotation marks (e.g., \"worst offenders\") out of context. If quoting is necessary, use a more complete, self-contained statement or paraphrase instead.\\n"
-        f"   c. Ensure information is presented accurately and maintains the context provided in the source snippets. Do not misrepresent or oversimplify.\\n"
-        f"7. Separate each article item (Header + Paragraph) with a single blank line.\\n"
-        f"8. At the very end, include a 'Sources:' section.\\n"
-        f"9. In the 'Sources:' section, list the footnote numbers corresponding ONLY to the objective articles summarized. Use a short descriptive header (1-3 words) AND make that header a Markdown link to the corresponding article's URL from the context.\\n"
-        f"10. Example format for sources: [¹]: [Short Header](URL_from_context)\\n"
-        f"11. Ensure neutrality and factual accuracy based *only* on the filtered, objective snippets.\\n"
-        f"12. If, after filtering, NO objective articles provide sufficient information for the category, state that clearly (e.g., 'No objective news reports found for this category.'). Do NOT summarize subjective content.\"\n"
-    )
-
-    user_message = "Generate the summary content in newspaper article format (Header + Paragraph, no bullets) based *only* on the filtered, objective articles found in the provided context. Avoid partial quotes and maintain original context. Ignore opinion, polls, subjective analysis, and methodology-focused articles. Ensure sources reference only the objective articles used. Do not include the main category title in your response."
+    with metrics.stage("prompt_build", category):
+        prompt = build_summary_prompt(category, category_instruction, news_articles, token_budget)
+    if "error" in prompt:
+        return prompt["error"]
+    system_prompt = prompt["system_prompt"]
+    user_message = prompt["user_message"]
+    if previous_summary:
+        user_message = build_delta_message(user_message, previous_summary)
+
+    # Log the exact prompt being sent (opt-in: --verbose-prompts)
+    if prompt_logger.isEnabledFor(logging.INFO):
+        prompt_logger.info(f"\n--- START OpenAI Prompt for [{category}] ---\nSystem Prompt:\n{system_prompt}\n"
+                           f"User Message: {user_message}\n--- END OpenAI Prompt ---\n",
+                           extra={"kind": "prompt", "prompt_tokens_estimate": prompt["prompt_tokens"]})
+
+    # --- 4. Call OpenAI API (or reuse an identical cached completion) ---
+    temperature = OPENAI_TEMPERATURE
+    max_tokens = OPENAI_MAX_TOKENS
+    cache_key = completion_cache_key(system_prompt, user_message, category_model(category))
+    cached = openai_cache.get(cache_key, ignore_ttl=OFFLINE_MODE)
+    if cached is not None and not OFFLINE_MODE and VALIDATION_ENABLED \
+            and not validate_summary(cached, prompt["article_links"], category).ok:
+        logger.warning(f"  [{category}] [OpenAI] Cached completion fails validation; regenerating.")
+        cached = None
+    if cached is not None:
+        logger.info(f"  [{category}] [OpenAI] Cache hit; reusing stored completion.")
+        record_token_usage(category, prompt["prompt_tokens"], 0, 0, source="cache")
+        return cached
+    if OFFLINE_MODE:
+        logger.warning(f"  [{category}] [OpenAI] Offline mode: no cached completion for this prompt.")
+        return "Error: Offline mode and no cached completion available."
 
-    # --- ADDED: Log the exact prompt being sent ---
-    print(f"\n--- START OpenAI Prompt for [{category}] ---")
-    print(f"System Prompt:\n{system_prompt}")
-    print(f"User Message: {user_message}")
-    print("--- END OpenAI Prompt ---\n")
-    # --- END Log ---
-
-    # --- 4. Call OpenAI API ---
     try:
-        print(f"  [{category}] [OpenAI] Generating summary with linked footnote headers...")
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=0.1,  # Low temperature for factual summaries
-            max_tokens=600    # Increased slightly for URLs in sources
-        )
-        if response.choices:
-            summary_content = response.choices[0].message.content.strip()
-            # --- ADDED: Log the RAW response from OpenAI ---
-            print(f"--- START RAW OpenAI Response for [{category}] ---")
-            print(summary_content)
-            print("--- END RAW OpenAI Response ---")
-            # --- END Log ---
+        logger.info(f"  [{category}] [OpenAI] Generating summary with linked footnote headers{' (streaming)' if stream else ''}...")
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+        with metrics.stage("openai_call", category):
+            completion = route_completion(client, category, messages, temperature, max_tokens, stream, on_partial)
+        if "error" in completion:
+            return completion["error"]
+        summary_content = completion["text"]
+        finish_reason = completion["finish_reason"]
+        usage = usage_from_response(completion["usage"])
+        record_token_usage(category, prompt["prompt_tokens"], **usage)
+        record_completion(category, completion["model"], **usage)
+
+        # Log the raw response (opt-in: --verbose-prompts)
+        if prompt_logger.isEnabledFor(logging.INFO):
+            prompt_logger.info(f"--- START RAW OpenAI Response for [{category}] ---\n{summary_content}\n"
+                               f"--- END RAW OpenAI Response ---", extra={"kind": "completion"})
+
+        # A completion cut off at max_tokens is missing (at least) its Sources section
+        if finish_reason == "length":
+            logger.error(f"  [{category}] Error: Completion truncated at max_tokens={max_tokens}; not storing it as a summary.")
+            return f"Error: Summary truncated at max_tokens={max_tokens}."
+
+        summary_content = check_summary(client, category, messages, summary_content, prompt["article_links"])
+        if summary_content.startswith("Error:"):
             return summary_content
-        else:
-            print(f"  [{category}] Error: No response choices received from API.")
-            return "Error: No response choices received from API."
+        openai_cache.set(cache_key, summary_content)
+        return summary_content
 
     except Exception as e:
-        print(f"  [{category}] Error calling OpenAI API with context: {e}")
+        logger.error(f"  [{category}] Error calling OpenAI API with context: {e}")
+        metrics.inc("openai_errors_total", category=category)
         return f"Error generating summary with context: {e}"
 
 
-# --- Prompt Handling (NEW) ---
-def load_category_prompts(prompts_dir: str) -> dict[str, str]:
-    """
-    Loads prompts from individual markdown files in the prompts directory.
+def category_model(category: str) -> str:
+    """The model a category's summaries are generated with (its prompt's `model`, see backend/model_router.py)."""
+    return model_router.model_for(category) if model_router else MODEL_NAME
 
-    Args:
-        prompts_dir (str): Path to the directory containing category prompt files.
+
+def route_completion(client: OpenAI, category: str, messages: list[dict], temperature: float, max_tokens: int,
+                     stream: bool = False, on_partial=None) -> dict:
+    """
+    Sends one chat completion over the category's model routes (hedging and failing
+    over between them), or straight to MODEL_NAME if no router is configured.
 
     Returns:
-        dict[str, str]: A dictionary mapping category names to their prompt instructions.
+        dict: request_completion's result plus the 'model' that answered, or just 'error'.
     """
-    prompts = {}
-    print(f"  [Prompts] Loading category prompts from: {prompts_dir}")
+    if model_router is None:
+        return dict(request_completion(client, category, messages, temperature, max_tokens, stream, on_partial),
+                    model=MODEL_NAME)
+    return model_router.complete(category, messages, temperature, max_tokens, stream, on_partial)
 
-    try:
-        # Get list of all markdown files in the directory
-        prompt_files = [f for f in os.listdir(prompts_dir) if f.endswith('.md')]
-        print(f"  [Prompts] Found {len(prompt_files)} markdown files")
 
-        if not prompt_files:
-            print(f"Error: No markdown files found in {prompts_dir}")
-            exit(1)
+def request_completion(client: OpenAI, category: str, messages: list[dict], temperature: float, max_tokens: int,
+                       stream: bool = False, on_partial=None, model: str = MODEL_NAME) -> dict:
+    """
+    Sends one chat completion request (streamed or not).
 
-        for filename in prompt_files:
-            # Skip non-category files
-            if filename in ['daily-prompts.md', 'premium-prompts.md', 'general-prompt.md']:
-                continue
+    Returns:
+        dict: 'text', 'finish_reason' and 'usage', or just 'error' (an "Error: ..." message).
+    """
+    if stream:
+        completion_stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        result = consume_chat_stream(completion_stream, category, on_partial=on_partial)
+        stream_metrics = result["metrics"]
+        ttft = stream_metrics["ttft_seconds"]
+        rate = stream_metrics["tokens_per_second"]
+        logger.info(f"  [{category}] [OpenAI] Stream finished: ttft={'n/a' if ttft is None else f'{ttft:.2f}s'}, "
+                    f"{stream_metrics['completion_tokens']} tokens, {'n/a' if rate is None else f'{rate:.1f}'} tok/s")
+        if not result["text"].strip():
+            logger.error(f"  [{category}] Error: Stream ended without any content.")
+            return {"error": "Error: No content received from streamed API response."}
+        return {"text": result["text"].strip(), "finish_reason": result["finish_reason"], "usage": result["usage"]}
+
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    if not response.choices:
+        logger.error(f"  [{category}] Error: No response choices received from API.")
+        return {"error": "Error: No response choices received from API."}
+    return {"text": response.choices[0].message.content.strip(), "finish_reason": response.choices[0].finish_reason,
+            "usage": response.usage}
 
-            # Extract category name from filename
-            category = filename.replace('.md', '').replace('-', ' ').title()
-            file_path = os.path.join(prompts_dir, filename)
 
-            try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read().strip()
-                    prompts[category] = content
-                    print(f"  [Prompts] Successfully loaded: {category} from {filename}")
-            except Exception as e:
-                print(f"  [Prompts] Error reading {filename}: {e}")
+def check_summary(client: OpenAI, category: str, messages: list[dict], summary: str,
+                  article_links: dict[int, str]) -> str:
+    """
+    Validates a completion's footnotes and links against its context (see
+    backend/validator.py) and asks the model to repair it if that fails.
 
-        print(f"  [Prompts] Successfully loaded {len(prompts)} category prompts")
+    Only failing summaries cost another request: up to VALIDATION_MAX_REPAIRS
+    targeted repair prompts that list the problems and the valid sources.
 
-        if not prompts:
-            print(f"Error: No valid prompts could be loaded from {prompts_dir}")
-            exit(1)
+    Returns:
+        str: The normalized summary, or an "Error: ..." message if it could not be repaired.
+    """
+    if not VALIDATION_ENABLED:
+        return summary
+    validation = validate_summary(summary, article_links, category)
+    repairs = 0
+    while not validation.ok and repairs < VALIDATION_MAX_REPAIRS:
+        repairs += 1
+        logger.warning(f"  [{category}] [Validator] {len(validation.problems)} problem(s): "
+                       f"{' '.join(validation.problems)} Requesting a repair (attempt {repairs})...")
+        try:
+            with metrics.stage("openai_repair", category):
+                completion = route_completion(client, category,
+                                              build_repair_messages(messages, summary, validation, article_links),
+                                              OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS)
+        except Exception as e:
+            logger.error(f"  [{category}] [Validator] Error requesting a repair: {e}")
+            break
+        if "error" in completion:
+            break
+        record_completion(category, completion["model"], **usage_from_response(completion["usage"]))
+        summary = completion["text"]
+        validation = validate_summary(summary, article_links, category)
+
+    if not validation.ok:
+        metrics.inc("summary_validations_total", category=category, result="failed")
+        logger.error(f"  [{category}] [Validator] Summary still invalid; not storing it: {' '.join(validation.problems)}")
+        return f"Error: Summary failed validation: {validation.problems[0]}"
+    metrics.inc("summary_validations_total", category=category, result="repaired" if repairs else "passed")
+    if validation.fixes:
+        logger.info(f"  [{category}] [Validator] Normalized: {', '.join(validation.fixes)}.")
+    return validation.summary
+
+
+def completion_cache_key(system_prompt: str, user_message: str, model: str = MODEL_NAME) -> str:
+    """Cache key for a completion of these messages with `model` and the configured settings."""
+    return make_cache_key("openai", model, system_prompt, user_message, OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS)
 
-        return prompts
 
-    except Exception as e:
-        print(f"Error loading category prompts from {prompts_dir}: {e}")
+# --- Prompt Handling (NEW) ---
+def load_prompt_registry(prompts_dir: str) -> PromptRegistry:
+    """
+    Parses the category prompt files into a `PromptRegistry` (see backend/prompt_registry.py).
+
+    Args:
+        prompts_dir (str): Path to the directory containing category prompt files.
+
+    Returns:
+        PromptRegistry: The loaded registry. Exits the script if the prompts are invalid.
+    """
+    registry = PromptRegistry(prompts_dir)
+    try:
+        with metrics.stage("prompt_load", ""):
+            registry.load()
+    except PromptRegistryError as e:
+        logger.error(f"Error loading category prompts from {prompts_dir}: {e}")
         exit(1)
+    for template in registry.templates():
+        logger.info(f"  [Prompts] {template.display_name} ({template.slug}.md): query='{template.query}', "
+                    f"num_results={template.num_results}, token_budget={template.token_budget}, "
+                    f"hash={template.content_hash[:12]}")
+    return registry
+
 
 # --- Supabase Integration ---
 def initialize_supabase_client() -> Client | None:
     """Initializes and returns the Supabase client."""
     if not SUPABASE_URL or not SUPABASE_KEY:
-        print("Warning: SUPABASE_URL or SUPABASE_KEY not found in backend/.env file.")
-        print("Supabase integration will be skipped.")
+        logger.warning("Warning: SUPABASE_URL or SUPABASE_KEY not found in backend/.env file.")
+        logger.warning("Supabase integration will be skipped.")
         return None
     try:
         client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("Supabase client initialized.")
+        logger.info("Supabase client initialized.")
         # Optional: Add a simple check here later if needed.
         return client
     except Exception as e:
-        print(f"Error initializing Supabase client: {e}")
+        logger.error(f"Error initializing Supabase client: {e}")
         return None
 
-def save_summary_to_supabase(client: Client, category: str, summary: str):
-    """Saves a generated summary to the Supabase 'daily_summaries' table."""
+def save_summary_to_supabase(client: Client, category: str, summary: str, sources: str = "[]",
+                             generation_date: str | None = None, columns: dict | None = None) -> bool:
+    """
+    Saves a single summary to the Supabase 'daily_summaries' table.
+
+    The daily run batches its rows through `SummaryWriteBuffer`; this is the
+    one-off path for ad-hoc writes. Uses the same (generation_date, category)
+    upsert so it never duplicates a row written by the batch.
+    """
     if not client:
-        print("Supabase client not initialized. Skipping database save.")
-        return
+        logger.warning("Supabase client not initialized. Skipping database save.")
+        return False
+
+    row = {
+        "generation_date": generation_date or generation_timestamp(),
+        "category": category,
+        "summary": summary,  # Contains summary text with footnotes
+        "sources": sources,  # JSON array string
+    }
+    row.update(columns or {})  # e.g. the source fingerprint (backend/incremental.py)
+    logger.info(f"  Attempting to save summary for '{category}' (length {len(summary)}) to Supabase...")
+    if upsert_summary_rows(client, [row]):
+        logger.info(f"    Successfully saved summary for category: {category}")
+        return True
+    logger.error("    Also, verify SUPABASE_URL and SUPABASE_KEY in backend/.env are correct.")
+    return False
 
-    # --- Log the data just before saving ---
-    print(f"DEBUG: Saving to Supabase for {category}:")
-    print(f"  Summary length: {len(summary)}")
-    # --- End Log ---
+# --- Category Pipeline ---
+# Prepared content for the 'no articles' case (without header)
+NO_ARTICLES_MESSAGE = "No relevant articles were found for this category in the last 24 hours."
 
-    try:
-        table_name = "daily_summaries"
-        # Use datetime.now() and format as ISO string for Supabase
-        generation_timestamp = datetime.now().isoformat()
-        data_to_insert = {
-            "generation_date": generation_timestamp,
-            "category": category,
-            "summary": summary,  # Contains summary text with footnotes
-            "sources": "[]"      # Empty JSON array as sources are now in the summary text
-        }
-        print(f"  Attempting to save summary for '{category}' to Supabase table '{table_name}'...")
-        response = client.table(table_name).insert(data_to_insert).execute()
 
-        # Check response structure (supabase-py v2)
-        if response.data:
-            print(f"    Successfully saved summary for category: {category}")
-        else:
-            # Check for specific errors if data is empty
-            error_message = "Unknown error"  # Default error message
-            if hasattr(response, 'error') and response.error:
-                error_message = str(response.error)
-            elif hasattr(response, 'message') and response.message:
-                error_message = str(response.message)
-            elif hasattr(response, 'details') and response.details:
-                error_message = str(response.details)
-
-            print(f"    Error saving summary for {category} to Supabase: {error_message}")
-            status = getattr(response, 'status_code', 'N/A')
-            print(f"    Response status: {status}")
-            print("    Please ensure the table 'daily_summaries' exists and has the correct schema/permissions.")
-            print("    Also, verify SUPABASE_URL and SUPABASE_KEY in backend/.env are correct.")
+class ServiceLimits:
+    """Bounded semaphores capping in-flight calls to each external service."""
 
-    except Exception as e:
-        print(f"  Error during Supabase insertion for category {category}: {e}")
-        # Ensure data_to_insert is defined for the error message even if created above
-        data_attempted_str = str(data_to_insert) if 'data_to_insert' in locals() else "{Could not capture data before error}"
-        print(f"  Data attempted: {data_attempted_str}")
+    def __init__(self, serper: int = SERPER_CONCURRENCY, openai: int = OPENAI_CONCURRENCY,
+                 supabase: int = SUPABASE_CONCURRENCY):
+        self.serper = threading.BoundedSemaphore(max(1, serper))
+        self.openai = threading.BoundedSemaphore(max(1, openai))
+        self.supabase = threading.BoundedSemaphore(max(1, supabase))
 
-# --- Main Execution (Updated for Category Prompts & Serper) ---
-def main():
-    """Main function to fetch context, generate summaries, and store them."""
-    print("Starting daily summary generation with individualized category prompts using Serper API...")
 
-    # 1. Initialize Clients
-    openai_client = initialize_openai_client()
-    supabase_client = initialize_supabase_client()
+def fetch_category_articles(template: PromptTemplate, limits: ServiceLimits,
+                            bucket_seconds: int | None = None) -> list[dict]:
+    """
+    Harvests a category's articles (see backend/harvest.py): its query plus the
+    `queries` from its prompt metadata are searched concurrently, each request
+    holding a Serper slot, and the best `num_results` candidates are kept.
+    """
+    def fetch(query: str, page: int) -> list[dict]:
+        return fetch_serper_articles(query=query, num_results=HARVEST_RESULTS_PER_QUERY,
+                                     bucket_seconds=bucket_seconds, page=page)
 
-    # 2. Load Category Prompts
-    print(f"Loading category prompts from: {PROMPTS_DIR}")
-    category_prompts = load_category_prompts(PROMPTS_DIR)
-    print(f"Loaded {len(category_prompts)} category prompts.")
+    with bind_category(template.display_name), metrics.stage("serper_fetch"):
+        return harvest_articles(template.display_name, harvest_queries(template), fetch, template.num_results,
+                                pages=harvest_pages(template), semaphore=limits.serper)
 
-    # Track used article URLs for deduplication
-    used_article_urls = set()
 
-    # 3. Generate and Store Summaries for each category
-    today = date.today()
-    print(f"\nGenerating summaries for {today}...")
+def claim_category_articles(category: str, articles: list[dict], used_article_urls: set,
+                            story_claims: StoryClaims | None = None) -> list[dict]:
+    """
+    Removes articles already claimed by an earlier category and claims the rest.
 
-    for category, prompt_instruction in category_prompts.items():
-        print(f"\nProcessing category: {category}...")
+    Besides exact URLs, `story_claims` (see backend/dedup.py) drops near-duplicate
+    copies of a story an earlier category already covers and keeps only the best
+    source when a category's own results repeat a story.
 
-        # 3a. Fetch Serper Articles for the category
-        serper_articles_raw = fetch_serper_articles(query=category, num_results=7)  # Fetch using Serper
+    Categories must be claimed in prompt order (`PromptRegistry.templates()`) so that
+    serial and concurrent runs deduplicate identically: the first category (in
+    prompt order) to return a URL keeps it.
 
-        # Filter out already used articles
-        serper_articles = [
-            article for article in serper_articles_raw
-            if article.get('url') not in used_article_urls  # Use 'url' field now
-        ]
+    Args:
+        category (str): The category claiming the articles (for logging).
+        articles (list[dict]): Raw Serper articles for the category.
+        used_article_urls (set): URLs claimed by earlier categories. Updated in place.
+        story_claims (StoryClaims | None): The run's story clusters. Updated in place.
+
+    Returns:
+        list[dict]: The articles not claimed by any earlier category.
+    """
+    # Filter out already used articles
+    claimed = [
+        article for article in articles
+        if article.get('url') not in used_article_urls  # Use 'url' field now
+    ]
+
+    if len(claimed) < len(articles):
+        logger.info(f"  [{category}] Filtered out {len(articles) - len(claimed)} duplicate articles.")
 
-        if len(serper_articles) < len(serper_articles_raw):
-            print(f"  Filtered out {len(serper_articles_raw) - len(serper_articles)} duplicate articles.")
+    if story_claims is not None:
+        claimed, dropped = story_claims.claim(category, claimed)
+        for article, owner in dropped:
+            reason = "better copy kept here" if owner == category else f"already covered by {owner}"
+            logger.info(f"  [{category}] Dropped near-duplicate story ({reason}): {article.get('title')}")
 
-        # 3b. Generate Summary Content (without header) with OpenAI
-        summary_content = ""
-        if serper_articles:
+    # Track used URLs to avoid duplicates in other categories
+    for article in claimed:
+        if article.get('url'):
+            used_article_urls.add(article.get('url'))
+
+    return claimed
+
+
+class StreamingOutput:
+    """
+    Destinations for streamed summaries: partial text goes to the local SSE
+    endpoint, and (optionally) each finished category is persisted right away
+    instead of waiting for the end-of-run flush.
+    """
+
+    def __init__(self, broadcaster: SummaryEventBroadcaster | None = None,
+                 supabase_client: Client | None = None, generation_date: str | None = None):
+        self.broadcaster = broadcaster
+        self.supabase_client = supabase_client
+        self.generation_date = generation_date
+
+    def on_partial(self, category: str, summary: str):
+        if self.broadcaster:
+            self.broadcaster.publish_partial(category, summary)
+
+    def on_complete(self, category: str, summary: str, limits: ServiceLimits, sources: str = "[]",
+                    columns: dict | None = None) -> bool:
+        """Publishes a finished summary. Returns True if it was already persisted."""
+        if self.broadcaster:
+            self.broadcaster.publish("error" if summary.startswith("Error:") else "done", category, summary)
+        if not self.supabase_client:
+            return False
+        with limits.supabase, metrics.stage("supabase_write", category):
+            return save_summary_to_supabase(self.supabase_client, category, summary, sources,
+                                            generation_date=self.generation_date, columns=columns)
+
+
+def generate_and_save_category(openai_client: OpenAI, writer: SummaryWriteBuffer, template: PromptTemplate,
+                               serper_articles: list[dict],
+                               limits: ServiceLimits, streaming: StreamingOutput | None = None) -> str:
+    """
+    Generates the summary for one category and queues it in the run's write buffer.
+
+    With `streaming`, the completion is streamed and the finished summary is
+    published immediately (SSE and/or an early Supabase write).
+
+    Returns:
+        str: The summary content that was queued (or the error / 'no articles' message).
+    """
+    category = template.display_name
+    with bind_category(category):
+        return _generate_and_save_category(openai_client, writer, template, serper_articles, limits, streaming)
+
+
+def _generate_and_save_category(openai_client: OpenAI, writer: SummaryWriteBuffer, template: PromptTemplate,
+                                serper_articles: list[dict], limits: ServiceLimits,
+                                streaming: StreamingOutput | None = None) -> str:
+    category = template.display_name
+    check = check_category_sources(template, serper_articles)
+    if check and check.unchanged:
+        return keep_unchanged_summary(writer, check, streaming)
+
+    # Generate Summary Content (without header) with OpenAI
+    if serper_articles:
+        serper_articles = enrich_category_articles(template, serper_articles)
+        with limits.openai:
             # Pass category name to the function for logging
-            summary_content = get_openai_summary_with_context(openai_client, category, prompt_instruction, serper_articles)
+            summary_content = get_openai_summary_with_context(
+                openai_client, category, template.instruction, serper_articles,
+                token_budget=template.token_budget,
+                stream=streaming is not None,
+                on_partial=streaming.on_partial if streaming else None,
+                previous_summary=check.previous_summary if check and check.delta else None)
+    else:
+        logger.warning(f"  [{category}] No relevant articles found via Serper. Skipping summary generation.")
+        summary_content = NO_ARTICLES_MESSAGE
+
+    return queue_category_summary(writer, category, summary_content, bool(serper_articles), limits, streaming,
+                                  check)
+
+
+def check_category_sources(template: PromptTemplate, articles: list[dict]) -> SourceCheck | None:
+    """Compares a category's claimed articles with its stored summary when incremental regeneration is on."""
+    if source_tracker is None:
+        return None
+    check = source_tracker.check(template, articles, category_model(template.display_name))
+    if check.unchanged:
+        logger.info(f"  [{template.display_name}] [Incremental] Sources unchanged "
+                    f"({check.change:.0%} of the article set differs); keeping the stored summary.")
+    elif check.change is not None:
+        logger.info(f"  [{template.display_name}] [Incremental] {check.change:.0%} of the article set changed; "
+                    f"regenerating{' as a delta' if check.delta else ''}.")
+    return check
+
+
+def keep_unchanged_summary(writer: SummaryWriteBuffer, check: SourceCheck,
+                           streaming: StreamingOutput | None = None) -> str:
+    """
+    Skips generation for a category whose sources have not changed: only its
+    latest_summaries.checked_at is updated at the next flush.
 
-            # Track used URLs to avoid duplicates in other categories
-            for article in serper_articles:
-                if article.get('url'):
-                    used_article_urls.add(article.get('url'))
-        else:
-            print(f"  [{category}] No relevant articles found via Serper. Skipping summary generation.")
-            # Prepare content for the 'no articles' case (without header)
-            summary_content = "No relevant articles were found for this category in the last 24 hours."
+    Returns:
+        str: The stored summary.
+    """
+    metrics.inc("summaries_total", category=check.category, status="unchanged")
+    if streaming and streaming.broadcaster:
+        streaming.broadcaster.publish("done", check.category, check.previous_summary)
+    writer.mark_unchanged(check.category)
+    if edition_publisher:
+        edition_publisher.update(check.category, check.previous_summary)
+    return check.previous_summary
+
+
+def enrich_category_articles(template: PromptTemplate, articles: list[dict]) -> list[dict]:
+    """Adds full-text excerpts to a category's articles when article fetching is enabled."""
+    if article_fetcher is None or not articles:
+        return articles
+    with metrics.stage("article_fetch", template.display_name):
+        return article_fetcher.enrich(template.display_name, articles, template.token_budget)
+
+
+def queue_category_summary(writer: SummaryWriteBuffer, category: str, summary_content: str, had_articles: bool,
+                           limits: ServiceLimits, streaming: StreamingOutput | None = None,
+                           check: SourceCheck | None = None) -> str:
+    """
+    Queues a category's result (summary, error or 'no articles' message) for saving.
 
-        # 3c. Save the raw content (or error/message) to Supabase
-        # The header **Category** is now handled solely by the frontend CategorySection component
-        # final_summary_text = f"**{category}**\n\n{summary_content}" # REMOVED THIS LINE
+    With `check` (incremental regeneration), the row carries the source
+    fingerprint; errors are stored without one so they are retried next run.
+
+    Returns:
+        str: The queued summary content.
+    """
+    # Queue the raw content (or error/message) for the run's single Supabase flush
+    # The header **Category** is handled solely by the frontend CategorySection component
+    if summary_content.startswith("Error:"):
+        logger.error(f"  [{category}] Failed to generate summary. Error: {summary_content}")
+        status = "error"
+    elif not had_articles:
+        logger.info(f"  [{category}] Saving 'no articles' message.")
+        status = "no_articles"
+    else:
+        logger.info(f"  [{category}] Summary content generated successfully.")
+        status = "ok"
+    metrics.inc("summaries_total", category=category, status=status)
+
+    # The summary's Sources section as the `sources` column JSON (see backend/validator.py)
+    sources = json.dumps(extract_sources(summary_content), ensure_ascii=False) if status == "ok" else "[]"
+    columns = None
+    if check is not None:
+        columns = check.columns if status != "error" else {"fingerprint": None, "source_urls": "[]"}
+        source_tracker.record(check, summary_content)
+    if edition_publisher:
+        edition_publisher.update(category, summary_content)
+    if streaming and streaming.on_complete(category, summary_content, limits, sources, columns):
+        return summary_content  # Already persisted; nothing left for the end-of-run flush
+    writer.add(category, summary_content, sources, columns=columns)
+    return summary_content
+
+
+def run_serial(openai_client: OpenAI, writer: SummaryWriteBuffer, category_prompts: dict[str, PromptTemplate],
+               limits: ServiceLimits, streaming: StreamingOutput | None = None) -> dict[str, str]:
+    """Processes categories one after another (fetch, generate, queue for saving)."""
+    used_article_urls = set()
+    story_claims = StoryClaims()
+    results = {}
+    for category, template in category_prompts.items():
+        logger.info(f"\nProcessing category: {category}...")
+        serper_articles_raw = fetch_category_articles(template, limits)
+        serper_articles = claim_category_articles(category, serper_articles_raw, used_article_urls, story_claims)
+        results[category] = generate_and_save_category(
+            openai_client, writer, template, serper_articles, limits, streaming)
+    return results
+
+
+def run_concurrent(openai_client: OpenAI, writer: SummaryWriteBuffer, category_prompts: dict[str, PromptTemplate],
+                   limits: ServiceLimits, max_workers: int = PIPELINE_MAX_WORKERS,
+                   streaming: StreamingOutput | None = None) -> dict[str, str]:
+    """
+    Fans categories out across a bounded worker pool.
+
+    All Serper fetches are submitted up front. Articles are then claimed in
+    prompt order as soon as every earlier category's fetch has finished, and
+    each category's generation/save is submitted immediately after its claim,
+    so deduplication matches `run_serial` while the OpenAI calls overlap.
+    """
+    used_article_urls = set()
+    story_claims = StoryClaims()
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="category") as executor:
+        fetch_futures = {
+            category: executor.submit(fetch_category_articles, template, limits)
+            for category, template in category_prompts.items()
+        }
+
+        generate_futures = {}
+        for category, template in category_prompts.items():
+            try:
+                serper_articles_raw = fetch_futures[category].result()
+            except Exception as e:
+                logger.error(f"  [{category}] Unexpected error while fetching articles: {e}")
+                serper_articles_raw = []
+            serper_articles = claim_category_articles(category, serper_articles_raw, used_article_urls,
+                                                      story_claims)
+            generate_futures[category] = executor.submit(
+                generate_and_save_category, openai_client, writer, template,
+                serper_articles, limits, streaming)
+
+        for category, future in generate_futures.items():
+            try:
+                results[category] = future.result()
+            except Exception as e:
+                logger.error(f"  [{category}] Unexpected error while generating/saving summary: {e}")
+                results[category] = f"Error: {e}"
+    return results
+
+
+def run_daemon(openai_client: OpenAI, supabase_client: Client | None, registry: PromptRegistry,
+               limits: ServiceLimits, streaming: StreamingOutput | None = None):
+    """
+    Keeps the clients warm and refreshes each category on its own schedule
+    (see backend/scheduler.py) until SIGINT/SIGTERM.
+
+    Each refresh is written immediately in its own flush. Cross-category URL
+    and story deduplication is kept against the articles the other categories
+    used in their most recent refresh.
+    """
+    category_articles: dict[str, list[dict]] = {}  # category -> articles used by its latest refresh
+    category_articles_lock = threading.Lock()
+
+    def refresh_category(template: PromptTemplate, period_seconds: float):
+        category = template.display_name
+        # The template is the registry's current version, so hot-reloaded `model:` edits apply here
+        assign_model_route(template)
+        # Never serve Serper results older than the category's refresh period
+        bucket_seconds = max(60, min(SERPER_CACHE_BUCKET_SECONDS, int(period_seconds)))
+        serper_articles_raw = fetch_category_articles(template, limits, bucket_seconds)
+        with category_articles_lock:
+            used_article_urls = set()
+            story_claims = StoryClaims()
+            for other in registry.templates():
+                if other.display_name != category and other.display_name in category_articles:
+                    other_articles = category_articles[other.display_name]
+                    used_article_urls.update(article["url"] for article in other_articles if article.get("url"))
+                    story_claims.claim(other.display_name, other_articles)
+            serper_articles = claim_category_articles(category, serper_articles_raw, used_article_urls,
+                                                      story_claims)
+            category_articles[category] = serper_articles
+        writer = SummaryWriteBuffer()  # generation_date of the window this refresh falls in
+        generate_and_save_category(openai_client, writer, template, serper_articles, limits, streaming)
+        with limits.supabase, metrics.stage("supabase_write", category):
+            writer.flush(supabase_client)
+        publish_edition(registry.category_prompts(), writer.generation_date)
+
+    scheduler = CategoryScheduler(registry, refresh_category)
+    scheduler.install_signal_handlers()
+    scheduler.run_forever()
+
+
+def configure_article_fetcher(args: argparse.Namespace):
+    """Creates the shared article fetcher if full-article enrichment is enabled."""
+    global article_fetcher
+    if args.fetch_articles:
+        article_fetcher = ArticleFetcher(offline=OFFLINE_MODE)
+        if args.no_cache:
+            article_fetcher.cache.enabled = False
+        logger.info(f"Full-article enrichment enabled (offline={OFFLINE_MODE}).")
+
+
+def configure_incremental(args: argparse.Namespace, supabase_client: Client | None):
+    """Loads the stored source fingerprints if incremental regeneration is enabled."""
+    global source_tracker
+    if args.incremental:
+        source_tracker = SourceTracker.load(supabase_client, MODEL_NAME, min_change=args.min_source_change,
+                                            delta=args.delta)
+        if source_tracker:
+            logger.info(f"Incremental regeneration enabled (min change {args.min_source_change:.0%}, "
+                        f"delta={args.delta}).")
+
+
+def configure_model_router(openai_client: OpenAI, registry: PromptRegistry):
+    """
+    Creates the model router from MODEL_ROUTES (or a single route for MODEL_NAME)
+    and assigns each category the route or model named by its prompt's `model`.
+    """
+    global model_router
+    try:
+        routes = parse_routes(MODEL_ROUTES) if MODEL_ROUTES else [ModelRoute(name="openai", model=MODEL_NAME)]
+    except ModelRouterError as e:
+        logger.error(f"Error: {e}")
+        exit(1)
+    model_router = ModelRouter(openai_client, routes, request_completion)
+    for template in registry.templates():
+        assign_model_route(template)
+    if len(routes) > 1:
+        logger.info(f"Model routes (in fallback order): {', '.join(f'{r.name}={r.model}' for r in routes)}")
+
+
+def configure_edition(args: argparse.Namespace):
+    """Creates the edition publisher (seeded with the current edition) unless it is disabled."""
+    global edition_publisher
+    if args.edition:
+        edition_publisher = EditionPublisher(args.edition_dir)
+        logger.info(f"Publishing editions to {edition_publisher.directory}.")
+
+
+def publish_edition(category_prompts: dict[str, PromptTemplate], generation_date: str):
+    """Writes the current summaries of every category as the frontend's static edition."""
+    if edition_publisher:
+        edition_publisher.publish(list(category_prompts), generation_date)
+
+
+def assign_model_route(template: PromptTemplate):
+    """Points a category at the route or model named by its prompt's `model` (none: the first route)."""
+    if model_router:
+        model_router.assign(template.display_name, template.metadata.get("model"))
+
+
+def configure_caches(args: argparse.Namespace):
+    """Applies the cache-related command line options to the module-level caches."""
+    global OFFLINE_MODE, CACHE_TIME_BUCKET
+    if args.no_cache:
+        serper_cache.enabled = False
+        openai_cache.enabled = False
+    OFFLINE_MODE = args.offline
+    if args.cache_bucket is not None:
+        CACHE_TIME_BUCKET = str(args.cache_bucket)
+    logger.info(f"Serper cache bucket: {current_serper_bucket()} (offline={OFFLINE_MODE}, "
+                f"cache={'on' if serper_cache.enabled else 'off'})")
+
+
+def run_batch(openai_client: OpenAI, writer: SummaryWriteBuffer, category_prompts: dict[str, PromptTemplate],
+              limits: ServiceLimits, max_workers: int = PIPELINE_MAX_WORKERS) -> dict[str, str]:
+    """
+    Generates every category through a single OpenAI Batch API job.
+
+    Articles are fetched concurrently and claimed in prompt order (as in the
+    other modes), prompts are built with `build_summary_prompt`, cached
+    completions are reused, and everything else is submitted as one batch.
+    Results go through the same save path as the synchronous modes.
+    """
+    used_article_urls = set()
+    story_claims = StoryClaims()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="fetch") as executor:
+        fetch_futures = {
+            category: executor.submit(fetch_category_articles, template, limits)
+            for category, template in category_prompts.items()
+        }
+        claimed = {}
+        for category in category_prompts:
+            try:
+                serper_articles_raw = fetch_futures[category].result()
+            except Exception as e:
+                logger.error(f"  [{category}] Unexpected error while fetching articles: {e}")
+                serper_articles_raw = []
+            claimed[category] = claim_category_articles(category, serper_articles_raw, used_article_urls,
+                                                        story_claims)
+
+    results = {}
+    checks = {}
+    batch_prompts = {}
+    cache_keys = {}
+    for category, template in category_prompts.items():
+        with bind_category(category):
+            checks[category] = check_category_sources(template, claimed[category])
+            if checks[category] and checks[category].unchanged:
+                results[category] = keep_unchanged_summary(writer, checks[category])
+                continue
+            if not claimed[category]:
+                logger.warning(f"  [{category}] No relevant articles found via Serper. Skipping summary generation.")
+                results[category] = NO_ARTICLES_MESSAGE
+                continue
+            articles = enrich_category_articles(template, claimed[category])
+            with metrics.stage("prompt_build"):
+                prompt = build_summary_prompt(category, template.instruction, articles, template.token_budget)
+            if "error" in prompt:
+                results[category] = prompt["error"]
+                continue
+            if checks[category] and checks[category].delta:
+                prompt["user_message"] = build_delta_message(prompt["user_message"],
+                                                             checks[category].previous_summary)
+            prompt["model"] = model_router.batch_model_for(category, MODEL_NAME) if model_router else MODEL_NAME
+            cache_keys[category] = completion_cache_key(prompt["system_prompt"], prompt["user_message"],
+                                                        prompt["model"])
+            cached = openai_cache.get(cache_keys[category], ignore_ttl=OFFLINE_MODE)
+            if cached is not None:
+                logger.info(f"  [{category}] [OpenAI] Cache hit; reusing stored completion.")
+                record_token_usage(category, prompt["prompt_tokens"], 0, 0, source="cache")
+                results[category] = cached
+            elif OFFLINE_MODE:
+                results[category] = "Error: Offline mode and no cached completion available."
+            else:
+                record_token_usage(category, prompt["prompt_tokens"], source="batch")
+                batch_prompts[category] = prompt
+
+    if batch_prompts:
+        logger.info(f"\nSubmitting {len(batch_prompts)} categories as one OpenAI batch job...")
+        with metrics.stage("openai_batch", ""):
+            batch_results = run_batch_summaries(openai_client, batch_prompts, MODEL_NAME,
+                                                OPENAI_TEMPERATURE, OPENAI_MAX_TOKENS)
+        for category, summary_content in batch_results.items():
+            if not summary_content.startswith("Error:"):
+                # Only categories failing validation go back to the model (synchronously)
+                messages = [{"role": "system", "content": batch_prompts[category]["system_prompt"]},
+                            {"role": "user", "content": batch_prompts[category]["user_message"]}]
+                with bind_category(category), limits.openai:
+                    summary_content = check_summary(openai_client, category, messages, summary_content,
+                                                    batch_prompts[category]["article_links"])
+            if not summary_content.startswith("Error:"):
+                openai_cache.set(cache_keys[category], summary_content)
+            results[category] = summary_content
+
+    # Route every result through the normal save path, in prompt order
+    return {
+        category: (results[category] if checks[category] and checks[category].unchanged else
+                   queue_category_summary(writer, category, results[category], bool(claimed[category]), limits,
+                                          check=checks[category]))
+        for category in category_prompts
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parses command line options for the daily summary run."""
+    parser = argparse.ArgumentParser(description="Generate daily news summaries for every category prompt.")
+    parser.add_argument("--mode", choices=["serial", "concurrent", "batch"], default=PIPELINE_MODE,
+                        help="Process categories one at a time, concurrently, or as one OpenAI Batch API "
+                             "job (default: %(default)s).")
+    parser.add_argument("--max-workers", type=int, default=PIPELINE_MAX_WORKERS,
+                        help="Worker pool size for concurrent mode (default: %(default)s).")
+    parser.add_argument("--serper-concurrency", type=int, default=SERPER_CONCURRENCY,
+                        help="Max in-flight Serper requests (default: %(default)s).")
+    parser.add_argument("--openai-concurrency", type=int, default=OPENAI_CONCURRENCY,
+                        help="Max in-flight OpenAI requests (default: %(default)s).")
+    parser.add_argument("--supabase-concurrency", type=int, default=SUPABASE_CONCURRENCY,
+                        help="Max in-flight Supabase writes (default: %(default)s).")
+    parser.add_argument("--generation-date", default=None,
+                        help="Override the run's generation_date (ISO timestamp), e.g. to redo a past run in place.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream OpenAI completions (reports time-to-first-token and tokens/sec).")
+    parser.add_argument("--sse-port", type=int, default=None,
+                        help="With --stream, serve partial summaries as Server-Sent Events on this local port.")
+    parser.add_argument("--stream-persist", action="store_true",
+                        help="With --stream, save each category to Supabase as soon as it finishes.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the local Serper/OpenAI result caches.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Serve Serper/OpenAI results from the local cache only (replay mode).")
+    parser.add_argument("--cache-bucket", type=int, default=None,
+                        help="Pin the Serper cache time bucket, e.g. to replay an earlier run.")
+    parser.add_argument("--fetch-articles", action="store_true", default=ARTICLE_FETCH_ENABLED,
+                        help="Download linked articles and add full-text excerpts to the prompt context.")
+    parser.add_argument("--incremental", action="store_true", default=INCREMENTAL_ENABLED,
+                        help="Skip categories whose articles, prompt and model match their stored summary "
+                             "(needs backend/migrations/003_summary_fingerprints.sql).")
+    parser.add_argument("--min-source-change", type=float, default=INCREMENTAL_MIN_CHANGE,
+                        help="With --incremental, share of the article set (1 - Jaccard of the URLs) that must "
+                             "change before a category is regenerated (default: %(default)s, any change). Higher "
+                             "values save more calls but can keep a summary that misses a new story: with 7 "
+                             "articles, one swapped article is a change of 0.25.")
+    parser.add_argument("--delta", action="store_true", default=INCREMENTAL_DELTA,
+                        help="With --incremental, regenerate changed categories as an update of their "
+                             "stored summary.")
+    parser.add_argument("--edition-dir", default=EDITION_DIR,
+                        help="Directory the static edition for the frontend is written to "
+                             "(default: backend/.editions, served by the frontend's /editions route; EDITION_DIR).")
+    parser.add_argument("--no-edition", dest="edition", action="store_false", default=EDITION_ENABLED,
+                        help="Do not publish the static edition (EDITION_PUBLISH=false).")
+    parser.add_argument("--log-format", choices=["text", "json"], default=LOG_FORMAT,
+                        help="Console log format: human-readable text or one JSON object per line "
+                             "(default: %(default)s).")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="Minimum log level (default: %(default)s).")
+    parser.add_argument("--verbose-prompts", action="store_true", default=LOG_PROMPTS,
+                        help="Log every full system prompt and raw completion.")
+    parser.add_argument("--run-summary", default=os.path.join(METRICS_DIR, "run_summary.json"),
+                        help="Where to write the JSON run summary (default: %(default)s).")
+    parser.add_argument("--metrics-file", default=os.path.join(METRICS_DIR, "metrics.prom"),
+                        help="Where to write metrics in OpenMetrics text format (default: %(default)s).")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve OpenMetrics at http://127.0.0.1:PORT/metrics while running.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Stay resident and refresh each category on its own schedule "
+                             "(refresh_interval/cron in the prompt front matter).")
+    args = parser.parse_args(argv)
+    if args.daemon and args.mode == "batch":
+        parser.error("--daemon refreshes categories individually and cannot use --mode batch")
+    return args
+
+
+def report_run(args: argparse.Namespace):
+    """
+    Logs the end-of-run stats (HTTP, caches, tokens, articles, streams) and writes
+    the JSON run summary and OpenMetrics file (see backend/telemetry.py).
+    """
+    print_session_stats()
+    serper_cache.print_stats()
+    openai_cache.print_stats()
+    print_token_usage()
+    if article_fetcher:
+        article_fetcher.print_stats()
+        article_fetcher.close()
+    if model_router:
+        model_router.print_stats()
+    if args.stream:
+        print_stream_metrics()
+
+    extra = {
+        "mode": "daemon" if args.daemon else args.mode,
+        "model": MODEL_NAME,
+        "token_usage": get_token_usage(),
+        "http_sessions": get_all_session_stats(),
+        "caches": [cache.get_stats() for cache in (serper_cache, openai_cache)],
+    }
+    if article_fetcher:
+        extra["articles"] = article_fetcher.get_stats()
+    if model_router:
+        extra["model_routes"] = model_router.get_stats()
+    if args.stream:
+        extra["streams"] = get_stream_metrics()
+    try:
+        summary = write_run_summary(args.run_summary, extra)
+        write_openmetrics(args.metrics_file)
+    except OSError as e:
+        logger.error(f"Error writing run metrics: {e}")
+        return
+    logger.info(f"  [Metrics] Estimated OpenAI cost ${summary['estimated_cost_usd']:.4f}; "
+                f"run summary: {args.run_summary}; metrics: {args.metrics_file}")
 
-        # Check if the content generation resulted in an error message or no articles found
-        if summary_content.startswith("Error:"):
-            print(f"  Failed to generate summary for {category}. Error: {summary_content}")
-            # Save the error message (without manual header)
-            save_summary_to_supabase(supabase_client, category, summary_content)
-        elif not serper_articles:
-            # Also save the 'no articles' message (without manual header)
-            print("  Saving 'no articles' message.")
-            save_summary_to_supabase(supabase_client, category, summary_content)
-        else:
-            # Summary content generation was successful
-            print("  Summary content generated successfully.")
-            save_summary_to_supabase(supabase_client, category, summary_content)  # Save raw content
 
-    print("\nDaily summary generation process complete.")
+# --- Main Execution (Updated for Category Prompts & Serper) ---
+def main(argv: list[str] | None = None):
+    """Main function to fetch context, generate summaries, and store them."""
+    args = parse_args(argv)
+    configure_logging(args.log_format, args.log_level, args.verbose_prompts)
+    metrics_server = MetricsServer(port=args.metrics_port).start() if args.metrics_port is not None else None
+    configure_caches(args)
+    configure_article_fetcher(args)
+    configure_edition(args)
+    logger.info("Starting daily summary generation with individualized category prompts using Serper API...")
+
+    # 1. Initialize Clients
+    openai_client = initialize_openai_client()
+    supabase_client = initialize_supabase_client()
+
+    # 2. Load Category Prompts
+    logger.info(f"Loading category prompts from: {PROMPTS_DIR}")
+    registry = load_prompt_registry(PROMPTS_DIR)
+    category_prompts = registry.category_prompts()
+    logger.info(f"Loaded {len(category_prompts)} category prompts.")
+    configure_model_router(openai_client, registry)
 
+    try:
+        # 3. Generate and Store Summaries for each category
+        limits = ServiceLimits(args.serper_concurrency, args.openai_concurrency, args.supabase_concurrency)
+
+        # Rows from earlier failed flushes go first so this run's rows win on conflict
+        replay_journal(supabase_client)
+        configure_incremental(args, supabase_client)
+
+        if args.daemon:
+            logger.info("\nStarting scheduler daemon (Ctrl+C or SIGTERM to stop)...")
+            broadcaster = None
+            streaming = None
+            if args.stream:
+                if args.sse_port is not None:
+                    broadcaster = SummaryEventBroadcaster(port=args.sse_port).start()
+                streaming = StreamingOutput(broadcaster, supabase_client if args.stream_persist else None)
+            run_daemon(openai_client, supabase_client, registry, limits, streaming)
+            report_run(args)
+            if broadcaster:
+                broadcaster.stop()
+            if metrics_server:
+                metrics_server.stop()
+            return
+
+        today = date.today()
+        logger.info(f"\nGenerating summaries for {today} ({args.mode} mode)...")
+        writer = SummaryWriteBuffer(generation_date=args.generation_date)
+        logger.info(f"Generation date for this run: {writer.generation_date}")
+
+        streaming = None
+        broadcaster = None
+        if args.stream:
+            if args.sse_port is not None:
+                broadcaster = SummaryEventBroadcaster(port=args.sse_port).start()
+            streaming = StreamingOutput(broadcaster, supabase_client if args.stream_persist else None,
+                                        writer.generation_date)
+
+        started = time.perf_counter()
+        if args.mode == "serial":
+            run_serial(openai_client, writer, category_prompts, limits, streaming)
+        elif args.mode == "batch":
+            run_batch(openai_client, writer, category_prompts, limits, args.max_workers)
+        else:
+            run_concurrent(openai_client, writer, category_prompts, limits, args.max_workers, streaming)
+
+        # 4. Flush every summary from this run in one bulk upsert
+        with limits.supabase, metrics.stage("supabase_write", ""):
+            writer.flush(supabase_client)
+        publish_edition(category_prompts, writer.generation_date)
+
+        logger.info(f"\nDaily summary generation process complete in {time.perf_counter() - started:.1f}s.")
+        report_run(args)
+        if broadcaster:
+            broadcaster.stop()
+        if metrics_server:
+            metrics_server.stop()
+    finally:
+        # Every path (serial, concurrent, batch, daemon, errors) releases the hedging workers
+        if model_router:
+            model_router.close()
 
 if __name__ == "__main__":
     main()
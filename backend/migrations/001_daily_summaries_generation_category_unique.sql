@@ -0,0 +1,14 @@
+-- 001: Make (generation_date, category) unique on daily_summaries.
+-- Required by the bulk upsert in backend/supabase_writer.py, which writes every
+-- summary of a run in one request with on_conflict=generation_date,category.
+-- Run once in the Supabase SQL editor.
+
+-- Collapse any existing duplicates, keeping the newest row of each pair.
+delete from public.daily_summaries older
+using public.daily_summaries newer
+where older.generation_date = newer.generation_date
+  and older.category = newer.category
+  and older.id < newer.id;
+
+create unique index if not exists daily_summaries_generation_date_category_key
+  on public.daily_summaries (generation_date, category);
@@ -0,0 +1,35 @@
+-- 002: One-row-per-category read model for the frontend, plus the history index.
+-- backend/supabase_writer.py refreshes latest_summaries after every successful
+-- write to daily_summaries, so page loads read ~9 rows regardless of history.
+-- Run once in the Supabase SQL editor.
+
+create table if not exists public.latest_summaries (
+  category text primary key,
+  id bigint references public.daily_summaries (id) on delete set null,
+  generation_date timestamptz,
+  summary text,
+  sources text default '[]',
+  created_at timestamptz not null default now()
+);
+
+-- Serves "newest rows of a category" lookups on the history table.
+create index if not exists daily_summaries_category_created_at_idx
+  on public.daily_summaries (category, created_at desc);
+
+-- Backfill from existing history: newest row per category.
+insert into public.latest_summaries (category, id, generation_date, summary, sources, created_at)
+select distinct on (category) category, id, generation_date, summary, sources, created_at
+from public.daily_summaries
+order by category, created_at desc
+on conflict (category) do update
+  set id = excluded.id,
+      generation_date = excluded.generation_date,
+      summary = excluded.summary,
+      sources = excluded.sources,
+      created_at = excluded.created_at;
+
+-- The frontend reads with the anon key, mirroring the daily_summaries read policy.
+alter table public.latest_summaries enable row level security;
+drop policy if exists "Public read access" on public.latest_summaries;
+create policy "Public read access" on public.latest_summaries
+  for select using (true);
@@ -0,0 +1,19 @@
+-- 003: Source fingerprints for incremental regeneration (backend/incremental.py).
+-- With --incremental, every saved summary stores a fingerprint of its inputs
+-- (article URLs, prompt, model) and the URLs themselves. Runs compare against
+-- latest_summaries and skip categories whose inputs have not changed, only
+-- bumping checked_at. Run once in the Supabase SQL editor.
+
+alter table public.daily_summaries
+  add column if not exists fingerprint text,
+  add column if not exists source_urls text default '[]';
+
+alter table public.latest_summaries
+  add column if not exists fingerprint text,
+  add column if not exists source_urls text default '[]',
+  add column if not exists checked_at timestamptz;
+
+-- Existing rows have no fingerprint, so every category is regenerated once.
+update public.latest_summaries
+  set checked_at = created_at
+  where checked_at is null;
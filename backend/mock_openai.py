@@ -0,0 +1,336 @@
+# backend/mock_openai.py
+# A local, OpenAI-compatible stand-in for development and testing. It implements
+# just enough of the API for this project: chat completions (plain and streamed),
+# file upload/download and the Batch API. Summaries are built deterministically
+# from the articles listed in the prompt's context, in the project's footnote format.
+#
+# Chat completions can be replayed from recorded fixtures, recorded from the real
+# API once (`--record` with `--upstream`), and slowed down or failed on purpose
+# (`--latency`, `--error-rate`; see backend/fixtures.py).
+#
+# Usage:
+#    python backend/mock_openai.py --port 8089
+#    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=test python backend/main.py --mode batch
+#    python backend/mock_openai.py --record fixtures.json --upstream https://api.openai.com/v1
+
+import argparse
+import email.parser
+import email.policy
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from fixtures import FaultInjector, FixtureStore
+
+SUPERSCRIPTS = "¹²³⁴⁵⁶⁷⁸⁹"
+_LINK_PATTERN = re.compile(r"^\s*\d+\. Title: (?P<title>.*?)\n\s*Link: (?P<link>\S+)", re.MULTILINE)
+
+
+def fake_summary(prompt: str, max_items: int = 3) -> str:
+    """Builds a newspaper-style summary citing the first articles in the prompt's context."""
+    articles = _LINK_PATTERN.findall(prompt)[:max_items]
+    if not articles:
+        return "No objective news reports found for this category."
+    items = []
+    sources = []
+    for number, (title, link) in enumerate(articles, 1):
+        marker = SUPERSCRIPTS[number - 1]
+        header = " ".join(title.split()[:5]) or "News Update"
+        items.append(f"**{header}**\n{title.strip()} was reported in the provided coverage.[{marker}]")
+        sources.append(f"[{marker}]: [{' '.join(title.split()[:2]) or 'Source'}]({link})")
+    return "\n\n".join(items) + "\n\n**Sources:**\n" + "\n".join(sources)
+
+
+class MockOpenAIState:
+    """In-memory files and batches shared by all request handlers."""
+
+    def __init__(self, batch_delay: float = 0.5, fixtures: FixtureStore | None = None,
+                 faults: FaultInjector | None = None, upstream: str | None = None):
+        self.batch_delay = batch_delay
+        self.fixtures = fixtures or FixtureStore()
+        self.faults = faults or FaultInjector()
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.files: dict[str, dict] = {}
+        self.batches: dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids):06d}"
+
+    def completion(self, body: dict, authorization: str | None = None) -> dict:
+        """Returns a recorded completion for these messages, records one upstream, or fakes one."""
+        key = FixtureStore.key(body.get("model"), body.get("messages"), body.get("temperature"),
+                               body.get("max_tokens"))
+        recorded = self.fixtures.get("openai", key)
+        if recorded is None and self.upstream and authorization:
+            request_body = {name: value for name, value in body.items() if name not in ("stream", "stream_options")}
+            response = requests.post(f"{self.upstream}/chat/completions", json=request_body, timeout=120,
+                                     headers={"Authorization": authorization})
+            response.raise_for_status()
+            recorded = response.json()
+            self.fixtures.put("openai", key, recorded)
+        if recorded is not None:
+            return dict(recorded, id=self.new_id("chatcmpl"), created=int(time.time()))
+        return self.synthetic_completion(body)
+
+    def synthetic_completion(self, body: dict) -> dict:
+        messages = body.get("messages", [])
+        # The context is in the first user message (the system message is the static prefix)
+        prompt = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+        text = fake_summary(prompt)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = max(1, len(text) // 4)
+        finish_reason = "stop"
+        max_tokens = body.get("max_tokens")
+        if max_tokens and completion_tokens > max_tokens:
+            text = text[:max_tokens * 4]
+            completion_tokens = max_tokens
+            finish_reason = "length"
+        return {
+            "id": self.new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def store_file(self, filename: str, purpose: str, content: bytes) -> dict:
+        file_object = {
+            "id": self.new_id("file"),
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.lock:
+            self.files[file_object["id"]] = {"object": file_object, "content": content}
+        return file_object
+
+    def create_batch(self, body: dict) -> dict:
+        batch = {
+            "id": self.new_id("batch"),
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "errors": None,
+            "input_file_id": body.get("input_file_id"),
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+        threading.Timer(self.batch_delay, self._run_batch, args=(batch["id"],)).start()
+        return batch
+
+    def cancel_batch(self, batch_id: str) -> dict | None:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is not None and batch["status"] not in ("completed", "failed", "expired", "cancelled"):
+                batch.update(status="cancelled", cancelled_at=int(time.time()))
+            return dict(batch) if batch else None
+
+    def _run_batch(self, batch_id: str):
+        with self.lock:
+            batch = self.batches[batch_id]
+            input_file = self.files.get(batch["input_file_id"])
+            if batch["status"] == "cancelled":
+                return
+        if input_file is None:
+            with self.lock:
+                batch["status"] = "failed"
+                batch["errors"] = {"object": "list", "data": [{"message": "input file not found"}]}
+            return
+
+        output_lines = []
+        counts = {"total": 0, "completed": 0, "failed": 0}
+        for line in input_file["content"].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            counts["total"] += 1
+            counts["completed"] += 1
+            output_lines.append(json.dumps({
+                "id": self.new_id("batch_req"),
+                "custom_id": request.get("custom_id"),
+                "response": {"status_code": 200, "request_id": self.new_id("req"),
+                             "body": self.completion(request.get("body", {}))},
+                "error": None,
+            }))
+        output_file = self.store_file(f"{batch_id}_output.jsonl", "batch_output",
+                                      ("\n".join(output_lines) + "\n").encode("utf-8"))
+        with self.lock:
+            if batch["status"] == "cancelled":
+                return
+            batch.update(status="completed", output_file_id=output_file["id"], request_counts=counts,
+                         completed_at=int(time.time()))
+
+
+def make_handler(state: MockOpenAIState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _send_json(self, payload: dict, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_error(self, status: int, message: str):
+            self._send_json({"error": {"message": message, "type": "invalid_request_error"}}, status)
+
+        def _stream_completion(self, completion: dict):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            base = {key: completion[key] for key in ("id", "created", "model")}
+            base["object"] = "chat.completion.chunk"
+            text = completion["choices"][0]["message"]["content"]
+            for token in re.findall(r"\S+\s*", text):
+                chunk = dict(base, choices=[{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            finish = completion["choices"][0]["finish_reason"]
+            self.wfile.write(f"data: {json.dumps(dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': finish}]))}\n\n".encode("utf-8"))
+            self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=completion['usage']))}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def do_POST(self):
+            path = self.path.split("?")[0].rstrip("/")
+            raw = self._read_body()
+            cancel = re.search(r"/batches/([^/]+)/cancel$", path)
+            if path.endswith("/chat/completions"):
+                error_status = state.faults.apply()
+                if error_status:
+                    self._send_error(error_status, "Injected failure")
+                    return
+                body = json.loads(raw or b"{}")
+                try:
+                    completion = state.completion(body, self.headers.get("Authorization"))
+                except requests.exceptions.RequestException as e:
+                    self._send_error(502, f"Upstream error: {e}")
+                    return
+                if body.get("stream"):
+                    self._stream_completion(completion)
+                else:
+                    self._send_json(completion)
+            elif path.endswith("/files"):
+                message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                    b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + raw)
+                fields = {}
+                for part in message.iter_parts():
+                    fields[part.get_param("name", header="content-disposition")] = (
+                        part.get_filename(), part.get_payload(decode=True))
+                filename, content = fields.get("file", (None, None))
+                if content is None:
+                    self._send_error(400, "missing file")
+                    return
+                purpose = (fields.get("purpose", (None, b""))[1] or b"").decode()
+                self._send_json(state.store_file(filename or "upload.jsonl", purpose, content))
+            elif path.endswith("/batches"):
+                self._send_json(state.create_batch(json.loads(raw or b"{}")))
+            elif cancel:
+                batch = state.cancel_batch(cancel.group(1))
+                if batch is None:
+                    self._send_error(404, "batch not found")
+                else:
+                    self._send_json(batch)
+            else:
+                self._send_error(404, f"Unknown endpoint {path}")
+
+        def do_GET(self):
+            path = self.path.split("?")[0].rstrip("/")
+            match = re.search(r"/files/([^/]+)/content$", path)
+            if match:
+                with state.lock:
+                    stored = state.files.get(match.group(1))
+                if stored is None:
+                    self._send_error(404, "file not found")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(stored["content"])))
+                self.end_headers()
+                self.wfile.write(stored["content"])
+                return
+            match = re.search(r"/batches/([^/]+)$", path)
+            if match:
+                with state.lock:
+                    batch = state.batches.get(match.group(1))
+                    batch = dict(batch) if batch else None
+                if batch is None:
+                    self._send_error(404, "batch not found")
+                else:
+                    self._send_json(batch)
+                return
+            self._send_error(404, f"Unknown endpoint {path}")
+
+    return Handler
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, batch_delay: float = 0.5,
+                      fixtures: FixtureStore | None = None, faults: FaultInjector | None = None,
+                      upstream: str | None = None) -> ThreadingHTTPServer:
+    """Starts the mock server on a background thread; base URL is http://host:port/v1."""
+    state = MockOpenAIState(batch_delay, fixtures, faults, upstream)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--batch-delay", type=float, default=0.5, help="Seconds before a batch completes.")
+    parser.add_argument("--fixtures", default=None, help="Replay recorded completions from this file.")
+    parser.add_argument("--record", default=None, help="Record upstream completions into this file (needs --upstream).")
+    parser.add_argument("--upstream", default=None, help="Real API base URL, e.g. https://api.openai.com/v1")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean added latency per completion (seconds).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of completions failing with 5xx/429.")
+    parser.add_argument("--seed", type=int, default=None)
+    cli_args = parser.parse_args()
+    if cli_args.record and not cli_args.upstream:
+        parser.error("--record needs --upstream")
+    store = FixtureStore(cli_args.record or cli_args.fixtures)
+    mock = start_mock_server(cli_args.host, cli_args.port, cli_args.batch_delay, store,
+                             FaultInjector(cli_args.latency, error_rate=cli_args.error_rate, seed=cli_args.seed),
+                             cli_args.upstream if cli_args.record else None)
+    print(f"Mock OpenAI API listening on http://{cli_args.host}:{mock.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.save()
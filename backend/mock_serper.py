@@ -0,0 +1,174 @@
+# backend/mock_serper.py
+# A local stand-in for the Serper News API (POST /news). Responses come from
+# recorded fixtures when available and are otherwise generated deterministically
+# from the query, so every run sees the same articles. A share of each page is
+# drawn from a common pool of "wire stories" that other queries also return, as
+# real syndicated news is, which exercises cross-category deduplication.
+#
+# Latency and errors can be injected (see backend/fixtures.py). With `--record`
+# and `--upstream`, requests are forwarded to the real API once (using the
+# caller's X-API-KEY) and stored in the fixture file for offline replay.
+#
+# Usage:
+#    python backend/mock_serper.py --port 8088 --latency 0.05 --error-rate 0.02
+#    SERPER_BASE_URL=http://127.0.0.1:8088 SERPER_API_KEY=test python backend/main.py
+#    # Record real responses once:
+#    python backend/mock_serper.py --record fixtures.json --upstream https://google.serper.dev
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from fixtures import FaultInjector, FixtureStore
+
+OUTLETS = ["Reuters", "AP News", "BBC", "CNN", "NPR", "Bloomberg", "The Guardian", "Axios", "Politico", "CNBC"]
+WIRE_POOL_SIZE = 60
+WIRE_SHARE = 0.2  # Share of each result page taken from the shared wire-story pool
+_VOCABULARY = [f"{syllable}{suffix}" for syllable in ("ka", "lo", "mi", "ne", "pu", "ra", "si", "to", "ve", "zu")
+               for suffix in ("bar", "den", "fin", "gol", "hir", "jun", "kel", "mor", "nax", "pil",
+                              "qua", "rist", "sol", "tarn", "urb", "vex", "wil", "yor", "zed", "ames")]
+
+
+def _story(rng: random.Random, slug: str) -> dict:
+    title = " ".join(rng.sample(_VOCABULARY, rng.randint(7, 10))).capitalize()
+    snippet = " ".join(rng.sample(_VOCABULARY, rng.randint(22, 32))).capitalize() + "."
+    return {
+        "title": title,
+        "link": f"https://news.example.com/{slug}",
+        "snippet": snippet,
+        "source": rng.choice(OUTLETS),
+        "date": f"{rng.randint(1, 23)} hours ago",
+    }
+
+
+def synthetic_results(query: str, num: int, page: int = 1) -> dict:
+    """Deterministic Serper-shaped results for `query` (same inputs, same articles)."""
+    seed = int(hashlib.sha256(f"{query}\0{page}".encode("utf-8")).hexdigest()[:12], 16)
+    rng = random.Random(seed)
+    news = []
+    for position in range(num):
+        if rng.random() < WIRE_SHARE:
+            wire_id = rng.randrange(WIRE_POOL_SIZE)
+            story = _story(random.Random(wire_id), f"wire/{wire_id}")
+            story["link"] += f"?outlet={rng.choice(OUTLETS).replace(' ', '').lower()}"  # Same story, another URL
+        else:
+            story = _story(rng, f"{seed:x}/{page}/{position}")
+        story["position"] = (page - 1) * num + position + 1
+        news.append(story)
+    return {"searchParameters": {"q": query, "num": num, "page": page, "type": "news"}, "news": news}
+
+
+class MockSerperState:
+    """Fixtures, fault injection and counters shared by the request handlers."""
+
+    def __init__(self, fixtures: FixtureStore | None = None, faults: FaultInjector | None = None,
+                 upstream: str | None = None):
+        self.fixtures = fixtures or FixtureStore()
+        self.faults = faults or FaultInjector()
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.stats = {"requests": 0, "replayed": 0, "recorded": 0, "synthetic": 0}
+        self.lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats[key] += 1
+
+    def search(self, path: str, body: dict, api_key: str | None) -> dict:
+        query, num, page = body.get("q", ""), int(body.get("num", 10)), int(body.get("page", 1))
+        key = FixtureStore.key(path, query, num, body.get("tbs"), page)
+        recorded = self.fixtures.get("serper", key)
+        if recorded is not None:
+            self._count("replayed")
+            return recorded
+        if self.upstream:
+            response = requests.post(f"{self.upstream}{path}", json=body, timeout=30,
+                                     headers={"X-API-KEY": api_key or "", "Content-Type": "application/json"})
+            response.raise_for_status()
+            recorded = response.json()
+            self.fixtures.put("serper", key, recorded)
+            self._count("recorded")
+            return recorded
+        self._count("synthetic")
+        return synthetic_results(query, num, page)
+
+
+def make_handler(state: MockSerperState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, payload: dict, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            path = self.path.split("?")[0].rstrip("/")
+            if path not in ("/news", "/search"):
+                self._send_json({"message": f"Unknown endpoint {path}"}, 404)
+                return
+            error_status = state.faults.apply()
+            if error_status:
+                self._send_json({"message": "Injected failure", "statusCode": error_status}, error_status)
+                return
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                self._send_json({"message": "Invalid JSON body"}, 400)
+                return
+            try:
+                self._send_json(state.search(path, body, self.headers.get("X-API-KEY")))
+            except requests.exceptions.RequestException as e:
+                self._send_json({"message": f"Upstream error: {e}"}, 502)
+
+    return Handler
+
+
+def start_mock_serper(host: str = "127.0.0.1", port: int = 0, fixtures: FixtureStore | None = None,
+                      faults: FaultInjector | None = None, upstream: str | None = None) -> ThreadingHTTPServer:
+    """Starts the mock on a background thread; point SERPER_BASE_URL at http://host:port."""
+    state = MockSerperState(fixtures, faults, upstream)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, name="mock-serper", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Serper News API stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--fixtures", default=None, help="Replay recorded responses from this file.")
+    parser.add_argument("--record", default=None, help="Record upstream responses into this file (needs --upstream).")
+    parser.add_argument("--upstream", default=None, help="Real API base URL, e.g. https://google.serper.dev")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean added latency per request (seconds).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 5xx/429.")
+    parser.add_argument("--seed", type=int, default=None)
+    cli_args = parser.parse_args()
+    if cli_args.record and not cli_args.upstream:
+        parser.error("--record needs --upstream")
+    store = FixtureStore(cli_args.record or cli_args.fixtures)
+    mock = start_mock_serper(cli_args.host, cli_args.port, store,
+                             FaultInjector(cli_args.latency, error_rate=cli_args.error_rate, seed=cli_args.seed),
+                             cli_args.upstream if cli_args.record else None)
+    print(f"Mock Serper API listening on http://{cli_args.host}:{mock.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.save()
+        print(f"Requests: {mock.state.stats}")
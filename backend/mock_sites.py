@@ -0,0 +1,134 @@
+# backend/mock_sites.py
+# Local fixture web server for the article fetcher (backend/article_fetcher.py).
+# Serves news-like pages with page chrome around an <article>, a robots.txt that
+# disallows /private/, ETag/Last-Modified revalidation, and pages that exercise
+# the size, time and paywall limits. Request counts and the peak number of
+# concurrent requests are kept in `server.stats`.
+#
+# Usage:
+#    python backend/mock_sites.py --port 8090
+#    (article URLs: http://127.0.0.1:8090/news/1, /private/1, /big, /slow, /paywall)
+
+import argparse
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LAST_MODIFIED = "Wed, 01 Oct 2025 08:00:00 GMT"
+ROBOTS_TXT = "User-agent: *\nDisallow: /private/\n"
+
+
+def article_html(number: int) -> str:
+    """A news page whose main text lives in <article>, surrounded by navigation and scripts."""
+    paragraphs = "".join(
+        f"<p>Story {number} paragraph {index}: Officials in the city of Example confirmed on Tuesday that the "
+        f"new transit line number {number} will open next spring after years of planning and review.</p>"
+        for index in range(1, 9)
+    )
+    return (
+        f"<!doctype html><html><head><meta charset='utf-8'><title>Story {number}</title>"
+        "<script>var tracking = 'ignore me';</script><style>p { color: black; }</style></head><body>"
+        "<header><nav><ul><li>Home and all the other sections of this website</li>"
+        "<li>Subscribe to our newsletter for daily updates today</li></ul></nav></header>"
+        f"<article><h1>Transit line {number} approved</h1>{paragraphs}"
+        "<figure><figcaption>A photo caption that should not be part of the article text.</figcaption></figure>"
+        "</article>"
+        "<aside><p>Related: ten other stories you might enjoy reading this week on our site.</p></aside>"
+        "<footer><p>Copyright Example News. All rights reserved. Terms of service apply.</p></footer>"
+        "</body></html>"
+    )
+
+
+def make_handler(stats: dict, lock: threading.Lock, delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8",
+                  headers: dict | None = None):
+            self.send_response(status)
+            if status != 304:
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            with lock:
+                stats["requests"] += 1
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+                stats["paths"][self.path] = stats["paths"].get(self.path, 0) + 1
+            try:
+                if delay:
+                    time.sleep(delay)
+                self._route()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                with lock:
+                    stats["in_flight"] -= 1
+
+        def _route(self):
+            path = self.path.split("?")[0]
+            if path == "/robots.txt":
+                self._send(200, ROBOTS_TXT.encode(), "text/plain")
+            elif path.startswith("/news/") or path.startswith("/private/"):
+                body = article_html(int(path.rsplit("/", 1)[-1] or 0)).encode("utf-8")
+                etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with lock:
+                        stats["not_modified"] += 1
+                    self._send(304, headers={"ETag": etag})
+                    return
+                self._send(200, body, headers={"ETag": etag, "Last-Modified": LAST_MODIFIED})
+            elif path == "/big":
+                self._send(200, article_html(0).encode("utf-8") + b"<p>" + b"x" * (8 * 1024 * 1024) + b"</p>")
+            elif path == "/slow":
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                for _ in range(40):
+                    self.wfile.write(b"<p>" + b"slow " * 4000 + b"</p>")
+                    self.wfile.flush()
+                    time.sleep(0.25)
+            elif path == "/paywall":
+                self._send(200, b"<html><body><article><p>Subscribe to continue reading.</p></article></body></html>")
+            elif path == "/data.json":
+                self._send(200, b"{}", "application/json")
+            else:
+                self._send(404, b"not found", "text/plain")
+
+    return Handler
+
+
+def start_mock_sites(host: str = "127.0.0.1", port: int = 0, delay: float = 0.0) -> ThreadingHTTPServer:
+    """Starts the fixture server on a background thread; see `server.stats` for counters."""
+    stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0, "not_modified": 0, "paths": {}}
+    server = ThreadingHTTPServer((host, port), make_handler(stats, threading.Lock(), delay))
+    server.daemon_threads = True
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, name="mock-sites", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fixture news pages for the article fetcher.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering each request.")
+    cli_args = parser.parse_args()
+    sites = start_mock_sites(cli_args.host, cli_args.port, cli_args.delay)
+    print(f"Fixture sites listening on http://{cli_args.host}:{sites.server_port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
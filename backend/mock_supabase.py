@@ -0,0 +1,112 @@
+# backend/mock_supabase.py
+# An in-memory stand-in for the parts of the supabase-py client the backend uses
+# (`client.table(name).upsert(rows, on_conflict=...).execute()` and simple
+# selects), with the same response shape (`.data`). Rows live in a dict per
+# table keyed by the on_conflict columns, so reruns update rows in place exactly
+# as the unique indexes in backend/migrations/ make Postgres do. Latency and
+# errors can be injected like the HTTP stand-ins (see backend/fixtures.py).
+#
+# Usage (e.g. from a benchmark):
+#    client = InMemorySupabase(faults=FaultInjector(latency=0.03))
+#    SummaryWriteBuffer().flush(client)
+
+import itertools
+import threading
+from datetime import datetime, timezone
+
+from fixtures import FaultInjector
+
+
+class MockSupabaseError(Exception):
+    """Raised by execute() when the fault injector fails a request."""
+
+
+class MockResponse:
+    """Mirrors supabase-py's APIResponse: `.data` holds the returned rows."""
+
+    def __init__(self, data: list[dict], count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    def __init__(self, client: "InMemorySupabase", table: str):
+        self._client = client
+        self._table = table
+        self._operation = "select"
+        self._rows: list[dict] = []
+        self._conflict_columns: tuple[str, ...] = ()
+        self._filters: list[tuple[str, object]] = []
+        self._order: tuple[str, bool] | None = None
+        self._limit: int | None = None
+
+    def upsert(self, rows, on_conflict: str = "id", **_options) -> "_Query":
+        self._operation = "upsert"
+        self._rows = [dict(row) for row in (rows if isinstance(rows, list) else [rows])]
+        self._conflict_columns = tuple(column.strip() for column in on_conflict.split(","))
+        return self
+
+    def insert(self, rows, **_options) -> "_Query":
+        return self.upsert(rows, on_conflict="id")
+
+    def select(self, *_columns, **_options) -> "_Query":
+        self._operation = "select"
+        return self
+
+    def eq(self, column: str, value) -> "_Query":
+        self._filters.append((column, value))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "_Query":
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count: int) -> "_Query":
+        self._limit = count
+        return self
+
+    def execute(self) -> MockResponse:
+        if self._client.faults.apply():
+            raise MockSupabaseError(f"Injected failure on '{self._table}'")
+        if self._operation == "upsert":
+            return MockResponse(self._client._upsert(self._table, self._rows, self._conflict_columns))
+        rows = self._client.rows(self._table)
+        rows = [row for row in rows if all(row.get(column) == value for column, value in self._filters)]
+        if self._order:
+            column, desc = self._order
+            rows.sort(key=lambda row: str(row.get(column)), reverse=desc)
+        return MockResponse(rows[:self._limit] if self._limit is not None else rows)
+
+
+class InMemorySupabase:
+    """Thread-safe in-memory tables with upsert semantics; records every write for inspection."""
+
+    def __init__(self, faults: FaultInjector | None = None):
+        self.faults = faults or FaultInjector()
+        self._tables: dict[str, dict[tuple, dict]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {"upserts": 0, "rows_written": 0}
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def _upsert(self, table: str, rows: list[dict], conflict_columns: tuple[str, ...]) -> list[dict]:
+        saved = []
+        with self._lock:
+            stored = self._tables.setdefault(table, {})
+            for row in rows:
+                key = tuple(str(row.get(column)) for column in conflict_columns)
+                existing = stored.get(key)
+                merged = dict(existing or {}, **row)
+                merged.setdefault("id", existing["id"] if existing and "id" in existing else next(self._ids))
+                merged.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+                stored[key] = merged
+                saved.append(dict(merged))
+            self.stats["upserts"] += 1
+            self.stats["rows_written"] += len(rows)
+        return saved
+
+    def rows(self, table: str) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self._tables.get(table, {}).values()]
@@ -0,0 +1,385 @@
+# backend/model_router.py
+# Routing layer for chat completions. A route is a model on an OpenAI-compatible
+# endpoint (the OpenAI API, another provider, or backend/mock_openai.py); routes
+# are configured with MODEL_ROUTES, a JSON list such as
+#
+#    [{"name": "gpt-4o", "model": "gpt-4o"},
+#     {"name": "mini", "model": "gpt-4o-mini", "requests_per_minute": 500},
+#     {"name": "local", "model": "mock", "base_url": "http://127.0.0.1:8089/v1", "api_key": "test"}]
+#
+# Without MODEL_ROUTES there is a single route (OPENAI_MODEL on OPENAI_BASE_URL)
+# and requests behave exactly as before. A category picks its first route with
+# `model: <route name or model>` in its prompt front matter; the other routes
+# follow in configured order as fallbacks. For each request the router:
+#
+# - skips routes that are cooling down after a 429/5xx/connection error or whose
+#   own requests-per-minute bucket is empty (each route is accounted separately);
+# - hedges: if the first route has not answered after MODEL_HEDGE_AFTER_SECONDS
+#   (or its recent p95 latency, once known) the next route is started as well
+#   and the first answer wins; streams are never hedged;
+# - fails over to the next route when a request errors.
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+import openai
+from openai import OpenAI
+
+from prompt_builder import usage_from_response
+from rate_limit import TokenBucket
+from telemetry import get_logger, metrics, record_completion
+
+logger = get_logger("model_router")
+
+# --- Configuration ---
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "")
+# Hedge after this many seconds until a route has MODEL_HEDGE_MIN_SAMPLES latencies,
+# then after its p95 latency (never sooner than MODEL_HEDGE_MIN_SECONDS). 0 disables hedging.
+MODEL_HEDGE_AFTER_SECONDS = float(os.getenv("MODEL_HEDGE_AFTER_SECONDS", "20"))
+MODEL_HEDGE_MIN_SECONDS = float(os.getenv("MODEL_HEDGE_MIN_SECONDS", "5"))
+MODEL_HEDGE_MIN_SAMPLES = 20
+MODEL_ROUTE_COOLDOWN_SECONDS = float(os.getenv("MODEL_ROUTE_COOLDOWN_SECONDS", "30"))
+# SDK retries per request when there are fallback routes (failing over is faster than retrying)
+MODEL_ROUTE_MAX_RETRIES = int(os.getenv("MODEL_ROUTE_MAX_RETRIES", "1"))
+MODEL_ROUTE_TIMEOUT_SECONDS = float(os.getenv("MODEL_ROUTE_TIMEOUT_SECONDS", "120"))
+
+metrics.describe("model_requests_total", "Chat completion requests per route by result (ok, error, "
+                                         "rate_limited, unavailable, hedge_lost).")
+metrics.describe("model_request_seconds", "Chat completion latency per route.")
+metrics.describe("model_hedges_total", "Hedge requests started per route.")
+
+
+class ModelRouterError(Exception):
+    """Raised for an invalid MODEL_ROUTES configuration."""
+
+
+@dataclass
+class ModelRoute:
+    """One model on one OpenAI-compatible endpoint."""
+
+    name: str
+    model: str
+    base_url: str | None = None          # None: the default client's endpoint
+    api_key: str | None = None           # Literal key (e.g. for the local mock)
+    api_key_env: str = "OPENAI_API_KEY"
+    requests_per_minute: float | None = None
+    max_concurrency: int | None = None
+    hedge_after_seconds: float | None = None
+
+
+def parse_routes(config: str) -> list[ModelRoute]:
+    """Parses MODEL_ROUTES (a JSON list of route objects)."""
+    try:
+        entries = json.loads(config)
+    except ValueError as e:
+        raise ModelRouterError(f"MODEL_ROUTES is not valid JSON: {e}") from e
+    if not isinstance(entries, list) or not entries:
+        raise ModelRouterError("MODEL_ROUTES must be a non-empty JSON list of routes")
+    routes = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("model"):
+            raise ModelRouterError(f"Every route needs a 'model': {entry!r}")
+        entry = dict(entry, name=entry.get("name") or entry["model"])
+        try:
+            routes.append(ModelRoute(**entry))
+        except TypeError as e:
+            raise ModelRouterError(f"Invalid route {entry['name']!r}: {e}") from e
+    names = [route.name for route in routes]
+    if len(set(names)) != len(names):
+        raise ModelRouterError(f"Route names must be unique: {names}")
+    return routes
+
+
+class _RouteState:
+    """A route's client and its own rate-limit, cooldown and latency accounting."""
+
+    def __init__(self, route: ModelRoute, client: OpenAI):
+        self.route = route
+        self.client = client
+        self.bucket = (TokenBucket(route.requests_per_minute / 60.0, max(1.0, route.requests_per_minute / 60.0))
+                       if route.requests_per_minute else None)
+        self.slots = threading.BoundedSemaphore(route.max_concurrency) if route.max_concurrency else None
+        self.cooldown_until = 0.0
+        self.latencies: deque[float] = deque(maxlen=200)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "hedges": 0, "hedges_won": 0}
+
+    def wait_time(self, now: float) -> float:
+        with self.lock:
+            cooldown = max(0.0, self.cooldown_until - now)
+        return max(cooldown, self.bucket.wait_time() if self.bucket else 0.0)
+
+    def hedge_after(self) -> float:
+        if self.route.hedge_after_seconds is not None:
+            return self.route.hedge_after_seconds
+        with self.lock:
+            samples = sorted(self.latencies)
+        if len(samples) < MODEL_HEDGE_MIN_SAMPLES:
+            return MODEL_HEDGE_AFTER_SECONDS
+        return max(MODEL_HEDGE_MIN_SECONDS, samples[int(0.95 * (len(samples) - 1))])
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+
+class ModelRouter:
+    """
+    Sends chat completions over the configured routes (see the module comment).
+
+    Args:
+        default_client (OpenAI): Client for routes without their own base_url.
+        routes (list[ModelRoute]): Routes in fallback order.
+        send (callable): Performs one request on one route, as
+                         send(client, category, messages, temperature, max_tokens, stream, on_partial, model=...)
+                         and returns main.request_completion's dict.
+        category_routes (dict[str, str] | None): Category -> preferred route name or model.
+    """
+
+    def __init__(self, default_client: OpenAI, routes: list[ModelRoute], send,
+                 category_routes: dict[str, str] | None = None):
+        self.send = send
+        self.default_client = default_client
+        failover = len(routes) > 1
+        self._routes: dict[str, _RouteState] = {}
+        for route in routes:
+            if route.base_url:
+                api_key = route.api_key or os.getenv(route.api_key_env) or "none"
+                client = OpenAI(api_key=api_key, base_url=route.base_url, timeout=MODEL_ROUTE_TIMEOUT_SECONDS,
+                                max_retries=MODEL_ROUTE_MAX_RETRIES if failover else 2)
+            else:
+                client = default_client.with_options(max_retries=MODEL_ROUTE_MAX_RETRIES) if failover \
+                    else default_client
+            self._routes[route.name] = _RouteState(route, client)
+        self._order = [route.name for route in routes]
+        self._category_routes = dict(category_routes or {})
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="model-route")
+
+    def assign(self, category: str, preferred: str | None):
+        """Sets a category's preferred route (a route name, or a model served by the first route)."""
+        with self._lock:
+            if preferred:
+                self._category_routes[category] = preferred
+            else:
+                self._category_routes.pop(category, None)
+
+    def _preferred_state(self, category: str) -> _RouteState:
+        with self._lock:
+            preferred = self._category_routes.get(category)
+            if not preferred:
+                return self._routes[self._order[0]]
+            if preferred in self._routes:
+                return self._routes[preferred]
+            for name in self._order:
+                if self._routes[name].route.model == preferred:
+                    return self._routes[name]
+            # A model without a route of its own: serve it from the first route's endpoint
+            first = self._routes[self._order[0]]
+            name = f"{first.route.name}:{preferred}"
+            if name not in self._routes:  # Shared by every category asking for this model
+                self._routes[name] = _RouteState(ModelRoute(name=name, model=preferred,
+                                                            base_url=first.route.base_url,
+                                                            requests_per_minute=first.route.requests_per_minute),
+                                                 first.client)
+            self._category_routes[category] = name
+            return self._routes[name]
+
+    def routes_for(self, category: str) -> list[str]:
+        """Route names in the order they are tried for `category`."""
+        preferred = self._preferred_state(category).route.name
+        return [preferred] + [name for name in self._order if name != preferred]
+
+    def model_for(self, category: str) -> str:
+        """The model a category's summaries are normally generated with."""
+        return self._preferred_state(category).route.model
+
+    def batch_model_for(self, category: str, default_model: str) -> str:
+        """The category's model if it is served by the default endpoint (where batch jobs run)."""
+        state = self._preferred_state(category)
+        return default_model if state.route.base_url else state.route.model
+
+    # --- Requests ---
+    def _acquire_route(self, candidates: list[str], unless_done: Future | None = None) -> _RouteState | None:
+        """
+        Takes the first candidate with capacity, waiting for the soonest one if none has any.
+
+        With `unless_done` (the request a hedge would back up), gives up and
+        returns None as soon as that request finishes.
+        """
+        while True:
+            if unless_done is not None and unless_done.done():
+                return None
+            now = time.monotonic()
+            waits = [(self._routes[name].wait_time(now), index, name) for index, name in enumerate(candidates)]
+            ready = [name for wait_seconds, _, name in waits if wait_seconds <= 0]
+            for name in ready:
+                state = self._routes[name]
+                if not state.bucket or state.bucket.take() == 0.0:
+                    return state
+            delay = min(max(min(waits)[0], 0.05), MODEL_ROUTE_COOLDOWN_SECONDS)
+            if unless_done is None:
+                time.sleep(delay)
+            else:
+                wait([unless_done], timeout=delay)
+
+    def _call(self, state: _RouteState, category: str, messages: list[dict], temperature: float, max_tokens: int,
+              stream: bool, on_partial) -> dict:
+        state.count("requests")
+        started = time.perf_counter()
+        if state.slots:
+            state.slots.acquire()
+        try:
+            result = self.send(state.client, category, messages, temperature, max_tokens, stream, on_partial,
+                               model=state.route.model)
+        except Exception as e:
+            self._penalize(state, e)
+            raise
+        finally:
+            if state.slots:
+                state.slots.release()
+        elapsed = time.perf_counter() - started
+        if "error" in result:
+            state.count("errors")
+            metrics.inc("model_requests_total", route=state.route.name, result="error")
+            return result
+        with state.lock:
+            state.latencies.append(elapsed)
+        state.count("ok")
+        metrics.inc("model_requests_total", route=state.route.name, result="ok")
+        metrics.observe("model_request_seconds", elapsed, route=state.route.name)
+        return result
+
+    def _penalize(self, state: _RouteState, error: Exception):
+        """Cools a route down after rate limiting or an outage; other errors only count."""
+        if isinstance(error, openai.RateLimitError):
+            result = "rate_limited"
+            state.count("rate_limited")
+        elif isinstance(error, (openai.APIConnectionError, openai.InternalServerError)):
+            result = "unavailable"
+            state.count("errors")
+        else:
+            state.count("errors")
+            metrics.inc("model_requests_total", route=state.route.name, result="error")
+            return
+        cooldown = MODEL_ROUTE_COOLDOWN_SECONDS
+        response = getattr(error, "response", None)
+        try:
+            cooldown = float(response.headers.get("retry-after")) if response is not None \
+                and response.headers.get("retry-after") else cooldown
+        except ValueError:
+            pass
+        with state.lock:
+            state.cooldown_until = max(state.cooldown_until, time.monotonic() + cooldown)
+        metrics.inc("model_requests_total", route=state.route.name, result=result)
+        logger.warning(f"  [Router] Route '{state.route.name}' {result.replace('_', ' ')}; "
+                       f"cooling down for {cooldown:.0f}s.")
+
+    def _record_hedge_loser(self, category: str, state: _RouteState, future: Future):
+        """Counts the cost of a request that lost a hedge race once it finishes."""
+        try:
+            result = future.result()
+        except Exception:
+            return
+        if "error" not in result:
+            record_completion(category, state.route.model, **usage_from_response(result.get("usage")))
+            metrics.inc("model_requests_total", route=state.route.name, result="hedge_lost")
+
+    def complete(self, category: str, messages: list[dict], temperature: float, max_tokens: int,
+                 stream: bool = False, on_partial=None) -> dict:
+        """
+        Sends one chat completion over the category's routes.
+
+        Returns:
+            dict: request_completion's 'text', 'finish_reason' and 'usage' plus the
+                  'route' and 'model' that answered, or just 'error' if every route failed.
+        """
+        remaining = self.routes_for(category)
+        if len(remaining) == 1:
+            # Nothing to hedge or fail over to: send it inline (exceptions reach the caller as before)
+            state = self._acquire_route(remaining)
+            result = self._call(state, category, messages, temperature, max_tokens, stream, on_partial)
+            return result if "error" in result else dict(result, route=state.route.name, model=state.route.model)
+        pending: dict[Future, _RouteState] = {}
+        started: dict[Future, float] = {}
+        hedges: set[Future] = set()
+        errors = []
+
+        def launch(unless_done: Future | None = None):
+            state = self._acquire_route(remaining, unless_done)
+            if state is None:
+                return None
+            remaining.remove(state.route.name)
+            # Copy the context so the request's logs and metrics keep the bound category
+            future = self._executor.submit(contextvars.copy_context().run, self._call, state, category, messages,
+                                           temperature, max_tokens, stream, on_partial)
+            pending[future] = state
+            started[future] = time.monotonic()
+            return state
+
+        first = launch()
+        while pending:
+            # Hedge while exactly one request is in flight and another route is left
+            timeout = None
+            if not stream and remaining and len(pending) == 1:
+                (running, running_state), = pending.items()
+                hedge_after = running_state.hedge_after()
+                if hedge_after > 0:
+                    timeout = max(0.0, hedge_after - (time.monotonic() - started[running]))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                backup = launch(unless_done=running)
+                if backup is None:
+                    continue  # The request finished while waiting for a route to hedge with
+                hedges.add(next(reversed(pending)))
+                backup.count("hedges")
+                metrics.inc("model_hedges_total", route=backup.route.name)
+                logger.warning(f"  [{category}] [Router] '{running_state.route.name}' slower than "
+                               f"{hedge_after:.1f}s; hedging with '{backup.route.name}'.")
+                continue
+            for future in done:
+                state = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"  [{category}] [Router] Route '{state.route.name}' failed: {e}")
+                    errors.append(f"{state.route.name}: {e}")
+                    continue
+                if "error" in result:
+                    errors.append(f"{state.route.name}: {result['error']}")
+                    continue
+                for other, other_state in pending.items():
+                    other.add_done_callback(lambda f, s=other_state: self._record_hedge_loser(category, s, f))
+                if future in hedges:
+                    state.count("hedges_won")
+                if state is not first or errors:
+                    logger.info(f"  [{category}] [Router] Answered by '{state.route.name}' ({state.route.model}).")
+                return dict(result, route=state.route.name, model=state.route.model)
+            if not pending and remaining:
+                logger.warning(f"  [{category}] [Router] Failing over to the next route...")
+                launch()
+        return {"error": f"Error: Every model route failed: {'; '.join(errors)}"}
+
+    def get_stats(self) -> dict[str, dict]:
+        stats = {}
+        for name, state in self._routes.items():
+            with state.lock:
+                stats[name] = dict(state.stats, model=state.route.model,
+                                   endpoint=state.route.base_url or "default")
+        return stats
+
+    def print_stats(self):
+        for name, stats in self.get_stats().items():
+            logger.info(f"  [Router] {name} ({stats['model']}): {stats['requests']} requests, {stats['ok']} ok, "
+                        f"{stats['errors']} errors, {stats['rate_limited']} rate limited, "
+                        f"{stats['hedges']} hedges ({stats['hedges_won']} won)")
+
+    def close(self):
+        """Stops the request workers; requests not yet started are cancelled."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
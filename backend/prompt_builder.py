@@ -0,0 +1,332 @@
+# backend/prompt_builder.py
+# Token-aware construction of the category summary prompt.
+#
+# The system message is a static instruction block, byte-identical for every
+# category and longer than the provider's minimum cacheable prefix, so prompt
+# caching can reuse it; the category instruction and the article context follow
+# in the user message. Articles are packed into a per-category token budget
+# instead of cutting every snippet at a fixed character count. Token counts come
+# from `tiktoken` when it is installed (optional) and from an offline estimate
+# otherwise.
+
+import math
+import os
+import re
+import threading
+
+from telemetry import get_logger
+
+logger = get_logger("prompt_builder")
+
+try:
+    import tiktoken  # Optional: exact token counts
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+# --- Configuration ---
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "1500"))
+SNIPPET_MAX_TOKENS = int(os.getenv("SNIPPET_MAX_TOKENS", "160"))
+SNIPPET_MIN_TOKENS = int(os.getenv("SNIPPET_MIN_TOKENS", "24"))
+# Cap for full-text excerpts added by the optional article fetcher (backend/article_fetcher.py)
+EXTRACT_MAX_TOKENS = int(os.getenv("EXTRACT_MAX_TOKENS", "320"))
+
+# The whole system message: identical for every category and every run, so keep
+# anything category-specific out of it. OpenAI only caches prompt prefixes of at
+# least 1024 tokens, which is why it carries the shared format rules, Sources spec
+# and example; keep it above that size when editing.
+STATIC_SYSTEM_PREFIX = (
+    "You are an AI assistant creating concise, factual news summaries formatted like newspaper articles, "
+    "based ONLY on objective news reporting found in the provided context.\n"
+    "Follow these instructions precisely:\n"
+    "1. Analyze the articles listed under CONTEXT in the user message. Each article is numbered and has a Link.\n"
+    "2. **CRITICAL FILTERING STEP:** Before summarizing, evaluate each article snippet in the CONTEXT. "
+    "**IGNORE and EXCLUDE** any articles that are primarily:\n"
+    "   - Opinion pieces, editorials, or personal blogs.\n"
+    "   - Analysis or commentary with a strong subjective viewpoint or advocacy.\n"
+    "   - Articles focused heavily on polling data, survey results, or complex methodology rather than events.\n"
+    "   - Subjective reviews or speculative content.\n"
+    "   Focus ONLY on articles that present objective, factual news reporting.\n"
+    "3. Based *only* on the factual information in the **filtered, objective articles**, follow the "
+    "CATEGORY INSTRUCTIONS given at the start of the user message.\n"
+    "4. IMPORTANT: Do NOT include the main category title (like '**Category Name**') at the beginning of your response.\n"
+    "5. Format each summary item like a short newspaper article:\n"
+    "   a. Start with a short, bold Article Header (2-6 words) on its own line. Example: **New Trade Tariffs Announced**\n"
+    "   b. Follow the header with a paragraph (2-5 sentences) summarizing the key factual information. "
+    "DO NOT use bullet points.\n"
+    "   c. Include footnote references like [¹], [²], etc. within the summary paragraph, referencing ONLY "
+    "the objective articles used.\n"
+    "6. **WRITING STYLE:**\n"
+    "   a. Maintain a neutral, objective tone.\n"
+    "   b. **AVOID partial quotes.** Do not pull short phrases in quotation marks (e.g., \"worst offenders\") "
+    "out of context. If quoting is necessary, use a more complete, self-contained statement or paraphrase instead.\n"
+    "   c. Ensure information is presented accurately and maintains the context provided in the source snippets. "
+    "Do not misrepresent or oversimplify.\n"
+    "7. Separate each article item (Header + Paragraph) with a single blank line.\n"
+    "8. At the very end, include a 'Sources:' section.\n"
+    "9. In the 'Sources:' section, list the footnote numbers corresponding ONLY to the objective articles "
+    "summarized. Use a short descriptive header (1-3 words) AND make that header a Markdown link to the "
+    "corresponding article's URL from the context.\n"
+    "10. Example format for sources: [¹]: [Short Header](URL_from_context)\n"
+    "11. Ensure neutrality and factual accuracy based *only* on the filtered, objective snippets.\n"
+    "12. If, after filtering, NO objective articles provide sufficient information for the category, state that "
+    "clearly (e.g., 'No objective news reports found for this category.'). Do NOT summarize subjective content.\n"
+    "\n"
+    "**Format Requirements (every category):**\n"
+    "- Format each summary like a short newspaper article: bold Header (2-6 words) on its own line, followed by "
+    "a paragraph (2-5 sentences).\n"
+    "- Do NOT use bullet points, numbered lists, tables or sub-headings inside an item.\n"
+    "- Cover each distinct story once. If several objective articles report the same event, write one item and "
+    "cite all of them in it.\n"
+    "- Put footnote references like [¹], [²], etc. directly after the sentence they support, inside the paragraph. "
+    "Use superscript digits inside square brackets; do not write [1], [^1] or bare superscripts.\n"
+    "- Separate each article item (Header + Paragraph) with a single blank line.\n"
+    "- Do NOT include the main category title, a greeting, an introduction or a closing remark.\n"
+    "\n"
+    "**Sources Section:**\n"
+    "- After the last item, write the heading **Sources:** on its own line.\n"
+    "- Follow it with one line per footnote cited in the text, in ascending order, exactly in the form "
+    "[¹]: [Short Header](URL). Nothing else goes on a source line.\n"
+    "- The Short Header is 1-3 words describing the article. The URL is the article's Link from CONTEXT, "
+    "copied unchanged: never shorten, rewrite or invent a URL.\n"
+    "- List only footnotes that are cited in the text, and cite only footnotes that are listed.\n"
+    "- Write nothing after the Sources section.\n"
+    "\n"
+    "**Example Format (content only; the stories and URLs are placeholders, never copy them):**\n"
+    "**Senate Passes Infrastructure Bill**\n"
+    "The Senate passed a bipartisan infrastructure bill allocating $1.2 trillion. Funds target roads, bridges, "
+    "and broadband expansion across the country.[¹]\n"
+    "\n"
+    "**Central Bank Holds Rates**\n"
+    "The central bank announced it will maintain current interest rates. The decision follows the latest "
+    "inflation and employment data, which policymakers described as mixed.[²][³]\n"
+    "\n"
+    "**Storm Causes Widespread Outages**\n"
+    "A winter storm left more than 200,000 homes without power across three states. Utility crews expect to "
+    "restore service to most customers within two days.[⁴]\n"
+    "\n"
+    "**Sources:**\n"
+    "[¹]: [Infrastructure Bill](http://example.com/infra-bill)\n"
+    "[²]: [Rate Decision](http://example.com/rates-decision)\n"
+    "[³]: [Policy Outlook](http://example.com/policy-outlook)\n"
+    "[⁴]: [Storm Outages](http://example.com/storm-outages)\n"
+    "\n"
+    "The user message gives the CATEGORY INSTRUCTIONS followed by the CONTEXT articles.\n"
+)
+
+USER_MESSAGE = (
+    "Generate the summary content in newspaper article format (Header + Paragraph, no bullets) based *only* on "
+    "the filtered, objective articles found in the provided context. Avoid partial quotes and maintain original "
+    "context. Ignore opinion, polls, subjective analysis, and methodology-focused articles. Ensure sources "
+    "reference only the objective articles used. Do not include the main category title in your response."
+)
+
+CONTEXT_HEADER = "Relevant articles from the last 24 hours:\n"
+
+
+# --- Token Counting ---
+_encoding = None
+_encoding_lock = threading.Lock()
+_ESTIMATE_PATTERN = re.compile(r"\s?[A-Za-z]+|\s?\d{1,3}|\s?[^\sA-Za-z\d]|\s+")
+
+
+def _get_encoding():
+    """Returns the tiktoken encoding, or None if tiktoken (or its data) is unavailable."""
+    global _encoding, tiktoken
+    if tiktoken is None:
+        return None
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.info(f"  [Tokens] tiktoken unavailable ({e}); using offline estimate.")
+                tiktoken = None
+                return None
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens in `text`.
+
+    Uses tiktoken's o200k_base encoding (gpt-4o family) when available, otherwise
+    a BPE-like estimate: words are split into ~4-character pieces, numbers into
+    3-digit groups and every punctuation mark counts as one token.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    total = 0
+    for piece in _ESTIMATE_PATTERN.findall(text):
+        stripped = piece.strip()
+        total += math.ceil(len(stripped) / 4) if stripped.isalpha() else 1
+    return total
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Shortens `text` to at most `max_tokens` tokens, ending on a word boundary with '...'."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        shortened = encoding.decode(encoding.encode(text)[:max_tokens - 1])
+    else:
+        # Binary search on the character length against the estimate
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(text[:middle]) <= max_tokens - 1:
+                low = middle
+            else:
+                high = middle - 1
+        shortened = text[:low]
+    if " " in shortened:
+        shortened = shortened.rsplit(" ", 1)[0]
+    return shortened.rstrip(" ,;:") + "..."
+
+
+# --- Context Packing ---
+def _article_header(idx: int, article: dict) -> str:
+    title = article.get('title', 'No Title')
+    source_name = (article.get('source') or {}).get('name', 'N/A')
+    return f"{idx}. Title: {title}\n   Link: {article.get('url')}\n   Source: {source_name}\n   Snippet: "
+
+
+def pack_article_context(category: str, news_articles: list[dict],
+                         token_budget: int = PROMPT_CONTEXT_TOKEN_BUDGET) -> dict:
+    """
+    Packs articles into the context block without exceeding `token_budget`.
+
+    Articles keep their original (1-based) numbers so footnotes line up with
+    `article_links`. Each snippet gets an even share of what is left of the
+    budget, between SNIPPET_MIN_TOKENS and SNIPPET_MAX_TOKENS (EXTRACT_MAX_TOKENS
+    for articles carrying a full-text 'extract'); articles that no longer fit
+    are dropped.
+
+    Returns:
+        dict: 'context' (str), 'article_links' (index -> URL of packed articles),
+              'context_tokens' and 'dropped' (number of articles left out).
+    """
+    usable = []
+    for idx, article in enumerate(news_articles, 1):
+        snippet = (article.get('extract') or article.get('description') or '').strip()
+        if not snippet or not article.get('url'):  # Skip if no usable snippet or link
+            logger.warning(f"  [{category}] Warning: Skipping article {idx} ('{article.get('title', 'No Title')}') "
+                           f"due to missing snippet or link.")
+            continue
+        usable.append((idx, article, snippet))
+
+    context = CONTEXT_HEADER
+    used_tokens = count_tokens(context)
+    article_links = {}
+    dropped = 0
+    for position, (idx, article, snippet) in enumerate(usable):
+        header = _article_header(idx, article)
+        header_tokens = count_tokens(header) + 1  # +1 for the trailing newline
+        remaining_articles = len(usable) - position
+        share = (token_budget - used_tokens) // remaining_articles - header_tokens
+        snippet_tokens = min(EXTRACT_MAX_TOKENS if article.get('extract') else SNIPPET_MAX_TOKENS, share)
+        if snippet_tokens < SNIPPET_MIN_TOKENS:
+            dropped += 1
+            continue
+        snippet = truncate_to_tokens(snippet, snippet_tokens)
+        entry = f"{header}{snippet}\n"
+        context += entry
+        used_tokens += count_tokens(entry)
+        article_links[idx] = article.get('url')
+
+    if dropped:
+        logger.info(f"  [{category}] Token budget {token_budget} reached; left out {dropped} article(s).")
+    return {"context": context, "article_links": article_links, "context_tokens": used_tokens, "dropped": dropped}
+
+
+def build_category_prompt(category: str, category_instruction: str, news_articles: list[dict],
+                          token_budget: int = PROMPT_CONTEXT_TOKEN_BUDGET) -> dict:
+    """
+    Builds the system prompt and user message for one category.
+
+    Returns:
+        dict: 'system_prompt', 'user_message', 'article_links', 'prompt_tokens'
+              (estimated, both messages), 'context_tokens', or just 'error'.
+    """
+    # --- 1. Pre-check for sufficient context ---
+    if not news_articles:
+        logger.warning(f"  [{category}] Warning: No articles provided from Serper. Skipping OpenAI generation.")
+        return {"error": "Error: Insufficient data to generate summary."}
+
+    # --- 2. Pack article context into the token budget ---
+    packed = pack_article_context(category, news_articles, token_budget)
+    if not packed["article_links"]:  # Check if we have any articles with links to reference
+        logger.error(f"  [{category}] Error: No valid articles with links remaining after filtering snippets. Cannot generate summary.")
+        return {"error": "Error: No valid source data with content to generate summary."}
+
+    # --- 3. Static system message (cacheable); everything category-specific goes in the user message ---
+    user_message = (
+        f"CATEGORY INSTRUCTIONS:\n{category_instruction.strip()}\n\n"
+        f"CONTEXT:\n-------\n{packed['context']}-------\n\n"
+        f"{USER_MESSAGE}"
+    )
+    return {
+        "system_prompt": STATIC_SYSTEM_PREFIX,
+        "user_message": user_message,
+        "article_links": packed["article_links"],
+        "prompt_tokens": count_tokens(STATIC_SYSTEM_PREFIX) + count_tokens(user_message),
+        "context_tokens": packed["context_tokens"],
+    }
+
+
+# --- Token Usage Accounting ---
+_token_usage: dict[str, dict] = {}
+_token_usage_lock = threading.Lock()
+
+
+def record_token_usage(category: str, estimated_prompt_tokens: int | None = None,
+                       prompt_tokens: int | None = None, completion_tokens: int | None = None,
+                       cached_prompt_tokens: int | None = None, source: str = "api"):
+    """Records per-category token counts (estimated and, when known, as billed)."""
+    with _token_usage_lock:
+        usage = _token_usage.setdefault(category, {})
+        for key, value in (("estimated_prompt_tokens", estimated_prompt_tokens), ("prompt_tokens", prompt_tokens),
+                           ("completion_tokens", completion_tokens), ("cached_prompt_tokens", cached_prompt_tokens)):
+            if value is not None:
+                usage[key] = value
+        usage["source"] = source
+
+
+def usage_from_response(usage) -> dict:
+    """Normalizes an OpenAI usage object (or dict) into plain token counts."""
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "cached_prompt_tokens": details.get("cached_tokens") if isinstance(details, dict) else None,
+    }
+
+
+def get_token_usage() -> dict[str, dict]:
+    with _token_usage_lock:
+        return {category: dict(usage) for category, usage in _token_usage.items()}
+
+
+def print_token_usage():
+    """Prints prompt/completion token counts per category and the run total."""
+    totals = {"prompt_tokens": 0, "completion_tokens": 0}
+    for category, usage in get_token_usage().items():
+        prompt = usage.get("prompt_tokens")
+        completion = usage.get("completion_tokens")
+        totals["prompt_tokens"] += prompt or 0
+        totals["completion_tokens"] += completion or 0
+        logger.info(
+            f"  [Tokens] {category}: prompt={prompt if prompt is not None else 'n/a'} "
+            f"(estimated {usage.get('estimated_prompt_tokens', 'n/a')}, cached {usage.get('cached_prompt_tokens') or 0}) "
+            f"completion={completion if completion is not None else 'n/a'} [{usage.get('source')}]"
+        )
+    logger.info(f"  [Tokens] Total: prompt={totals['prompt_tokens']} completion={totals['completion_tokens']}")
@@ -0,0 +1,307 @@
+# backend/prompt_registry.py
+# Registry of category prompt templates parsed from prompts/*.md.
+#
+# A category prompt file starts with a front matter block of `key: value` lines
+# between `---` markers, followed by the instruction text:
+#
+#    ---
+#    display_name: US News
+#    query: US news
+#    order: 2
+#    num_results: 7
+#    token_budget: 1500
+#    ---
+#    **US News Prompt**
+#    ...
+#
+# An optional `model` (a route name or model, see backend/model_router.py)
+# chooses the model the category is summarized with.
+#
+# Files without front matter (e.g. general-prompt.md, used by the search route)
+# are not categories and are ignored. Templates are parsed once, validated and
+# hashed; `refresh()` re-reads only files whose mtime/size changed, so a
+# long-running worker picks up prompt edits without restarting.
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+
+from prompt_builder import PROMPT_CONTEXT_TOKEN_BUDGET
+from telemetry import get_logger
+
+logger = get_logger("prompt_registry")
+
+DEFAULT_NUM_RESULTS = 7
+
+# Known metadata keys and their parsers; any other keys are kept as strings in
+# PromptTemplate.metadata for later stages to use.
+_METADATA_PARSERS = {
+    "display_name": str,
+    "query": str,
+    "order": int,
+    "num_results": int,
+    "token_budget": int,
+}
+
+
+class PromptRegistryError(Exception):
+    """Raised when prompt files are missing or invalid."""
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A validated category prompt and its metadata."""
+
+    slug: str                 # File name without .md, e.g. 'us-news'
+    display_name: str         # Category name shown to readers and stored in Supabase
+    query: str                # Serper search query
+    order: int                # Processing/display order (lower first)
+    num_results: int          # Articles to request from Serper
+    token_budget: int         # Token budget for the article context
+    instruction: str          # Prompt body sent to the model
+    content_hash: str         # SHA-256 over metadata + instruction
+    path: str
+    metadata: dict = field(default_factory=dict, compare=False)
+
+    def metadata_list(self, key: str) -> list[str]:
+        """Returns a comma-separated metadata value as a list (empty if absent)."""
+        value = self.metadata.get(key, "")
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def split_front_matter(text: str) -> tuple[dict[str, str] | None, str]:
+    """
+    Separates a `---` front matter block from the body.
+
+    Returns:
+        tuple: (metadata dict, or None if the file has no front matter; body text)
+    """
+    lines = text.lstrip("\ufeff").splitlines()
+    if not lines or lines[0].strip() != "---":
+        return None, text
+    metadata = {}
+    for number, line in enumerate(lines[1:], 2):
+        if line.strip() == "---":
+            return metadata, "\n".join(lines[number:])
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if ":" not in line:
+            raise PromptRegistryError(f"line {number}: expected 'key: value', got {line.strip()!r}")
+        key, value = line.split(":", 1)
+        metadata[key.strip().lower()] = value.strip()
+    raise PromptRegistryError("front matter is not closed with '---'")
+
+
+def parse_prompt_file(path: str) -> PromptTemplate | None:
+    """
+    Parses one prompt file.
+
+    Returns:
+        PromptTemplate | None: The template, or None if the file has no front matter.
+
+    Raises:
+        PromptRegistryError: If the file is a category prompt but is invalid.
+    """
+    filename = os.path.basename(path)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            text = file.read()
+    except OSError as e:
+        raise PromptRegistryError(f"{filename}: cannot read file: {e}") from e
+
+    try:
+        raw, body = split_front_matter(text)
+    except PromptRegistryError as e:
+        raise PromptRegistryError(f"{filename}: {e}") from e
+    if raw is None:
+        return None
+
+    values = {}
+    for key, parser in _METADATA_PARSERS.items():
+        if key in raw:
+            try:
+                values[key] = parser(raw[key])
+            except ValueError:
+                raise PromptRegistryError(f"{filename}: '{key}' must be {parser.__name__}, got {raw[key]!r}")
+
+    instruction = body.strip()
+    if not values.get("display_name"):
+        raise PromptRegistryError(f"{filename}: missing required 'display_name'")
+    if not instruction:
+        # Still a category, as with the old loader: generated from the static rules alone
+        logger.warning(f"  [Prompts] {filename}: prompt body is empty; using only the shared instructions")
+    for key in ("num_results", "token_budget"):
+        if key in values and values[key] <= 0:
+            raise PromptRegistryError(f"{filename}: '{key}' must be positive")
+
+    digest = hashlib.sha256()
+    for key in sorted(raw):
+        digest.update(f"{key}={raw[key]}\n".encode("utf-8"))
+    digest.update(b"\n")
+    digest.update(instruction.encode("utf-8"))
+
+    return PromptTemplate(
+        slug=filename[:-3],
+        display_name=values["display_name"],
+        query=values.get("query") or values["display_name"],
+        order=values.get("order", 1000),
+        num_results=values.get("num_results", DEFAULT_NUM_RESULTS),
+        token_budget=values.get("token_budget", PROMPT_CONTEXT_TOKEN_BUDGET),
+        instruction=instruction,
+        content_hash=digest.hexdigest(),
+        path=path,
+        metadata={key: value for key, value in raw.items() if key not in _METADATA_PARSERS},
+    )
+
+
+class PromptRegistry:
+    """
+    Holds the parsed category templates of one prompts directory.
+
+    Thread-safe: the scheduler can call `refresh()` from its watcher thread
+    while workers read `templates()`.
+    """
+
+    def __init__(self, prompts_dir: str):
+        self.prompts_dir = os.path.abspath(prompts_dir)
+        self._templates: dict[str, PromptTemplate] = {}    # slug -> template
+        self._signatures: dict[str, tuple[int, int]] = {}  # slug -> (mtime_ns, size)
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        try:
+            entries = os.scandir(self.prompts_dir)
+        except OSError as e:
+            raise PromptRegistryError(f"Cannot read prompts directory {self.prompts_dir}: {e}") from e
+        signatures = {}
+        with entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".md"):
+                    stat = entry.stat()
+                    signatures[entry.name[:-3]] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def load(self) -> list[PromptTemplate]:
+        """
+        Parses every prompt file, failing on any invalid category prompt.
+
+        Raises:
+            PromptRegistryError: If a file is invalid, display names collide or
+                                 no category prompts exist.
+        """
+        signatures = self._scan()
+        templates = {}
+        for slug in signatures:
+            template = parse_prompt_file(os.path.join(self.prompts_dir, f"{slug}.md"))
+            if template is not None:
+                templates[slug] = template
+        self._validate(templates)
+        with self._lock:
+            self._templates = templates
+            self._signatures = signatures
+        logger.info(f"  [Prompts] Loaded {len(templates)} category prompts from {self.prompts_dir}")
+        return self.templates()
+
+    @staticmethod
+    def _validate(templates: dict[str, PromptTemplate]):
+        if not templates:
+            raise PromptRegistryError("No category prompts (files with front matter) found")
+        seen = {}
+        for template in templates.values():
+            key = template.display_name.lower()
+            if key in seen:
+                raise PromptRegistryError(
+                    f"Duplicate display_name '{template.display_name}' in {seen[key]}.md and {template.slug}.md")
+            seen[key] = template.slug
+
+    def refresh(self) -> list[str]:
+        """
+        Re-parses files that were added, changed or removed since the last load.
+
+        An edit that makes a file invalid is reported and the previous version
+        of that template is kept, so a running worker never loses a category.
+
+        Returns:
+            list[str]: Slugs whose templates changed.
+        """
+        signatures = self._scan()
+        with self._lock:
+            previous = dict(self._signatures)
+            templates = dict(self._templates)
+        if signatures == previous:
+            return []
+
+        changed = []
+        for slug in set(previous) - set(signatures):
+            if templates.pop(slug, None) is not None:
+                changed.append(slug)
+        for slug, signature in signatures.items():
+            if previous.get(slug) == signature:
+                continue
+            try:
+                template = parse_prompt_file(os.path.join(self.prompts_dir, f"{slug}.md"))
+            except PromptRegistryError as e:
+                logger.warning(f"  [Prompts] Ignoring invalid edit, keeping previous version: {e}")
+                continue
+            old = templates.get(slug)
+            if template is None:
+                templates.pop(slug, None)
+            else:
+                templates[slug] = template
+            if (old.content_hash if old else None) != (template.content_hash if template else None):
+                changed.append(slug)
+
+        try:
+            self._validate(templates)
+        except PromptRegistryError as e:
+            logger.warning(f"  [Prompts] Ignoring prompt changes: {e}")
+            return []
+        with self._lock:
+            self._templates = templates
+            self._signatures = signatures
+        if changed:
+            logger.info(f"  [Prompts] Reloaded: {', '.join(sorted(changed))}")
+        return sorted(changed)
+
+    def templates(self) -> list[PromptTemplate]:
+        """Returns the templates in processing order."""
+        with self._lock:
+            return sorted(self._templates.values(), key=lambda t: (t.order, t.display_name))
+
+    def category_prompts(self) -> dict[str, PromptTemplate]:
+        """Returns display name -> template, in processing order."""
+        return {template.display_name: template for template in self.templates()}
+
+    def get(self, display_name: str) -> PromptTemplate | None:
+        return self.category_prompts().get(display_name)
+
+    # --- Watching ---
+    def watch(self, interval: float = 5.0, on_change=None):
+        """
+        Polls the directory every `interval` seconds on a daemon thread.
+
+        Args:
+            interval (float): Seconds between mtime checks.
+            on_change (callable | None): Called with the list of changed slugs.
+        """
+        if self._watcher is not None:
+            return
+
+        def poll():
+            while not self._stop_watching.wait(interval):
+                try:
+                    changed = self.refresh()
+                except PromptRegistryError as e:
+                    logger.error(f"  [Prompts] Watch error: {e}")
+                    continue
+                if changed and on_change:
+                    on_change(changed)
+
+        self._watcher = threading.Thread(target=poll, name="prompt-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
@@ -0,0 +1,437 @@
+# backend/query_service.py
+# Backend for the free-text search box (frontend/src/app/api/search/route.js).
+# Queries go through the same Serper and OpenAI path as the category pipeline
+# (`fetch_serper_articles`, `get_openai_summary_with_context` in backend/main.py),
+# with the shared caches, retries and metrics, plus:
+#
+# - normalization, so "  Latest AI News?" and "latest ai news" are one query
+#   (only for the cache and flight keys: Serper and the model get the query as typed);
+# - a TTL + LRU result cache, with near-match lookup over the recently answered
+#   queries (word-set Jaccard similarity, see backend/dedup.py), so popular and
+#   trending queries are answered from memory;
+# - single-flight: concurrent requests for the same query share one Serper +
+#   OpenAI round trip instead of each paying for it;
+# - a per-client token bucket, charged only for queries that are not cached,
+#   so one client cannot exhaust the API budget.
+#
+# The route forwards to this service when QUERY_SERVICE_URL is set.
+#
+# Usage:
+#    python backend/query_service.py --port 8090
+#    curl -X POST localhost:8090/search -d '{"query": "latest AI developments"}'
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+from dedup import jaccard, shingles
+from rate_limit import TokenBucket
+from telemetry import LOG_FORMAT, LOG_LEVEL, configure_logging, get_logger, metrics
+
+logger = get_logger("query_service")
+
+# --- Configuration ---
+QUERY_SERVICE_HOST = os.getenv("QUERY_SERVICE_HOST", "127.0.0.1")
+QUERY_SERVICE_PORT = int(os.getenv("QUERY_SERVICE_PORT", "8090"))
+QUERY_MAX_LENGTH = 500  # Same limit as the search box and the route
+QUERY_NUM_RESULTS = int(os.getenv("QUERY_NUM_RESULTS", "5"))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", str(15 * 60)))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+# Word-set Jaccard similarity at which a cached answer is reused for a different query
+QUERY_NEAR_MATCH_THRESHOLD = float(os.getenv("QUERY_NEAR_MATCH_THRESHOLD", "0.8"))
+QUERY_NEAR_MATCH_WINDOW = int(os.getenv("QUERY_NEAR_MATCH_WINDOW", "256"))  # Most recent entries compared
+# Per-client token bucket: sustained requests per minute and burst size
+QUERY_RATE_PER_MINUTE = float(os.getenv("QUERY_RATE_PER_MINUTE", "10"))
+QUERY_BURST = int(os.getenv("QUERY_BURST", "5"))
+# Proxies in front of the service that append to X-Forwarded-For (1: the Next.js route). The
+# client id is the address the outermost of them appended; 0 uses the peer address.
+QUERY_TRUSTED_PROXIES = int(os.getenv("QUERY_TRUSTED_PROXIES", "1"))
+QUERY_OPENAI_CONCURRENCY = int(os.getenv("QUERY_OPENAI_CONCURRENCY", "4"))
+GENERAL_PROMPT_PATH = os.path.join(main.PROMPTS_DIR, "general-prompt.md")
+SEARCH_LABEL = "search"  # Metrics/log label for every query (queries themselves are unbounded)
+
+_DISALLOWED_CHARACTERS = re.compile(r"[<>{}]")
+_NORMALIZE_PATTERN = re.compile(r"[^\w\s'-]+")
+
+metrics.describe("query_requests_total", "Search queries by outcome (hit, near_hit, miss, coalesced, "
+                                         "limited, invalid, error).")
+
+
+class QueryError(Exception):
+    """A request the service refuses; `status` is the HTTP status to answer with."""
+
+    def __init__(self, status: int, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query: NFKC, lowercase, punctuation dropped, whitespace collapsed."""
+    text = unicodedata.normalize("NFKC", query).lower()
+    return " ".join(_NORMALIZE_PATTERN.sub(" ", text).split())
+
+
+# --- Rate Limiting ---
+class ClientRateLimiter:
+    """One token bucket per client id; the least recently seen clients are forgotten first."""
+
+    def __init__(self, rate_per_minute: float = QUERY_RATE_PER_MINUTE, burst: int = QUERY_BURST,
+                 max_clients: int = 10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client_id: str) -> float:
+        """Returns 0.0 if `client_id` may proceed, else the seconds it should wait."""
+        with self._lock:
+            bucket = self._buckets.pop(client_id, None) or TokenBucket(self.rate, self.burst)
+            self._buckets[client_id] = bucket
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)  # A forgotten client starts with a full bucket
+            return bucket.take()
+
+
+# --- Result Cache ---
+@dataclass
+class _CachedAnswer:
+    query: str                      # Normalized query the answer was generated for
+    result: dict
+    expires_at: float
+    words: frozenset = field(default_factory=frozenset)
+
+
+class QueryCache:
+    """
+    In-memory TTL + LRU cache of answers keyed by normalized query.
+
+    Lookups fall back to the most similar of the `near_window` most recently
+    used entries when no exact entry exists.
+    """
+
+    def __init__(self, ttl_seconds: float = QUERY_CACHE_TTL, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 near_threshold: float = QUERY_NEAR_MATCH_THRESHOLD, near_window: int = QUERY_NEAR_MATCH_WINDOW):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.near_threshold = near_threshold
+        self.near_window = near_window
+        self._entries: OrderedDict[str, _CachedAnswer] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, query: str, record: bool = True) -> tuple[dict | None, str | None]:
+        """
+        Looks up a normalized query (`record=False` leaves the hit/miss stats alone).
+
+        Returns:
+            tuple: (result or None, the normalized query it was cached under)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(query)
+                self.stats["hits"] += record
+                return entry.result, entry.query
+            if entry is not None:
+                del self._entries[query]
+            match = self._near_match(query, now) if self.near_threshold < 1.0 else None
+            if match is not None:
+                self._entries.move_to_end(match.query)
+                self.stats["near_hits"] += record
+                return match.result, match.query
+            self.stats["misses"] += record
+            return None, None
+
+    def _near_match(self, query: str, now: float) -> _CachedAnswer | None:
+        words = shingles(query)
+        if not words:
+            return None
+        best, best_score = None, self.near_threshold
+        for index, entry in enumerate(reversed(self._entries.values())):
+            if index >= self.near_window:
+                break
+            if entry.expires_at <= now:
+                continue
+            score = jaccard(words, entry.words)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(self, query: str, result: dict):
+        with self._lock:
+            self._entries.pop(query, None)
+            self._entries[query] = _CachedAnswer(query, result, time.monotonic() + self.ttl_seconds, shingles(query))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers for the same key wait for its result."""
+
+    def __init__(self):
+        self._calls: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn) -> tuple[object, bool]:
+        """
+        Returns:
+            tuple: (fn's result, True if it was shared from another caller's call).
+                   An exception raised by fn is re-raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"], True
+        try:
+            call["result"] = fn()
+            return call["result"], False
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+# --- Service ---
+def load_general_prompt(path: str = GENERAL_PROMPT_PATH) -> str:
+    """The search instructions shared with the route's direct path (prompts/general-prompt.md)."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return file.read().strip()
+    except OSError as e:
+        logger.error(f"  [Search] Error reading general prompt {path}: {e}")
+        return "You are a helpful AI assistant providing concise, factual news summaries."
+
+
+class QueryService:
+    """Answers search queries from the cache or with one shared Serper + OpenAI round trip."""
+
+    def __init__(self, openai_client, cache: QueryCache | None = None, limiter: ClientRateLimiter | None = None,
+                 general_prompt: str | None = None, num_results: int = QUERY_NUM_RESULTS,
+                 openai_concurrency: int = QUERY_OPENAI_CONCURRENCY):
+        self.openai_client = openai_client
+        self.cache = cache or QueryCache()
+        self.limiter = limiter or ClientRateLimiter()
+        self.general_prompt = general_prompt if general_prompt is not None else load_general_prompt()
+        self.num_results = num_results
+        self.flights = SingleFlight()
+        self.openai_slots = threading.BoundedSemaphore(max(1, openai_concurrency))
+
+    def search(self, query: str, client_id: str = "anonymous") -> dict:
+        """
+        Answers a query.
+
+        Returns:
+            dict: 'summary', 'sources', 'query' (normalized), 'cached' (hit, near_hit,
+                  coalesced or false) and 'generated_at'.
+
+        Raises:
+            QueryError: For invalid queries (400), rate-limited clients (429) and
+                        failed generations (502).
+        """
+        query = (query or "").strip()
+        if not query:
+            raise self._reject("invalid", QueryError(400, "Query parameter is required."))
+        if len(query) > QUERY_MAX_LENGTH:
+            raise self._reject("invalid", QueryError(
+                400, f"Query exceeds maximum length of {QUERY_MAX_LENGTH} characters."))
+        if _DISALLOWED_CHARACTERS.search(query):
+            raise self._reject("invalid", QueryError(400, "Query contains potentially disallowed characters."))
+        normalized = normalize_query(query)
+        if not normalized:
+            raise self._reject("invalid", QueryError(400, "Query parameter is required."))
+
+        # Cached answers cost nothing, so they are served without charging the client's bucket
+        result, matched = self.cache.get(normalized)
+        if result is not None:
+            outcome = "hit" if matched == normalized else "near_hit"
+            metrics.inc("query_requests_total", result=outcome)
+            logger.info(f"  [Search] Cache {outcome.replace('_', ' ')} for '{normalized}'"
+                        + (f" (answered as '{matched}')" if outcome == "near_hit" else ""))
+            return dict(result, cached=outcome)
+
+        retry_after = self.limiter.check(client_id)
+        if retry_after:
+            raise self._reject("limited", QueryError(429, "Too many searches; please wait a moment.", retry_after))
+
+        # The normalized form only keys the cache and the flight; Serper and the model get the query as typed
+        text = " ".join(query.split())
+        result, shared = self.flights.do(normalized, lambda: self._answer(normalized, text))
+        if "error" in result:
+            metrics.inc("query_requests_total", result="error")
+            raise QueryError(502, result["error"])
+        metrics.inc("query_requests_total", result="coalesced" if shared else "miss")
+        return dict(result, cached="coalesced" if shared else False)
+
+    def _reject(self, outcome: str, error: QueryError) -> QueryError:
+        metrics.inc("query_requests_total", result=outcome)
+        return error
+
+    def _answer(self, normalized: str, text: str) -> dict:
+        """Fetches articles and generates the answer for a query (one caller per normalized query)."""
+        result, _ = self.cache.get(normalized, record=False)  # Answered while this caller waited for the flight?
+        if result is not None:
+            return result
+        with metrics.stage("serper_fetch", SEARCH_LABEL):
+            articles = main.fetch_serper_articles(text, num_results=self.num_results)
+        instruction = f"{self.general_prompt}\n\nUSER QUERY: {text}"
+        if articles:
+            with self.openai_slots:
+                summary = main.get_openai_summary_with_context(self.openai_client, SEARCH_LABEL, instruction,
+                                                               articles)
+        else:
+            summary = main.NO_ARTICLES_MESSAGE
+        if summary.startswith("Error"):
+            return {"error": summary}
+        result = {
+            "query": normalized,
+            "summary": summary,
+            "sources": [],  # Embedded in the summary's Sources section, as on the route's direct path
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.cache.put(normalized, result)
+        return result
+
+
+# --- HTTP Server ---
+def client_id_for(forwarded_for: str, peer_address: str, trusted_proxies: int = QUERY_TRUSTED_PROXIES) -> str:
+    """
+    The rate-limit client id of a request.
+
+    Only the last `trusted_proxies` X-Forwarded-For entries were appended by our own
+    proxies; anything before them is whatever the caller sent, so using it would
+    let a client pick a fresh id (and a fresh burst) per request.
+    """
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    if trusted_proxies <= 0 or len(hops) < trusted_proxies:
+        return peer_address
+    return hops[-trusted_proxies]
+
+
+class QueryServer:
+    """
+    Serves `QueryService` over HTTP on a daemon thread.
+
+    POST /search takes {"query": "..."} and answers {"summary", "sources", "cached", ...}
+    or {"message"} with status 400/429/502. GET /health reports cache stats and
+    GET /metrics the OpenMetrics text. The client id for rate limiting comes from
+    `client_id_for` (the X-Forwarded-For hop appended by the Next.js route), so
+    only expose the service to that proxy.
+    """
+
+    def __init__(self, service: QueryService, host: str = QUERY_SERVICE_HOST, port: int = QUERY_SERVICE_PORT,
+                 trusted_proxies: int = QUERY_TRUSTED_PROXIES):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json",
+                      headers: dict | None = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, payload: dict, status: int = 200, headers: dict | None = None):
+                self._send(status, json.dumps(payload).encode("utf-8"), headers=headers)
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/health":
+                    self._send_json({"status": "ok", "cached_queries": len(service.cache), **service.cache.stats})
+                elif path == "/metrics":
+                    self._send(200, metrics.to_openmetrics().encode("utf-8"),
+                               "application/openmetrics-text; version=1.0.0; charset=utf-8")
+                else:
+                    self._send_json({"message": "Not found."}, 404)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+                if self.path.split("?")[0] != "/search":
+                    self._send_json({"message": "Not found."}, 404)
+                    return
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    self._send_json({"message": "Invalid JSON body."}, 400)
+                    return
+                client_id = client_id_for(self.headers.get("X-Forwarded-For", ""), self.client_address[0],
+                                          trusted_proxies)
+                try:
+                    self._send_json(service.search(str(body.get("query") or ""), client_id))
+                except QueryError as e:
+                    headers = {"Retry-After": str(max(1, round(e.retry_after)))} if e.retry_after else None
+                    self._send_json({"message": str(e)}, e.status, headers)
+                except Exception as e:
+                    logger.error(f"  [Search] Unexpected error: {e}")
+                    self._send_json({"message": "An unexpected error occurred on the server."}, 500)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def start(self) -> "QueryServer":
+        threading.Thread(target=self.server.serve_forever, name="query-server", daemon=True).start()
+        logger.info(f"  [Search] Query service listening on http://{self.server.server_address[0]}:{self.port}/search")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the cached, rate-limited search query backend.")
+    parser.add_argument("--host", default=QUERY_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=QUERY_SERVICE_PORT)
+    parser.add_argument("--cache-ttl", type=int, default=QUERY_CACHE_TTL, help="Seconds an answer is reused.")
+    parser.add_argument("--rate-per-minute", type=float, default=QUERY_RATE_PER_MINUTE,
+                        help="Sustained searches per client per minute (default: %(default)s).")
+    parser.add_argument("--burst", type=int, default=QUERY_BURST, help="Per-client burst size (default: %(default)s).")
+    parser.add_argument("--trusted-proxies", type=int, default=QUERY_TRUSTED_PROXIES,
+                        help="Proxies in front of the service that append to X-Forwarded-For; the client id "
+                             "is the address the outermost one appended, 0 uses the peer address "
+                             "(default: %(default)s, the Next.js route).")
+    parser.add_argument("--log-format", choices=["text", "json"], default=LOG_FORMAT)
+    parser.add_argument("--log-level", default=LOG_LEVEL)
+    cli_args = parser.parse_args()
+    configure_logging(cli_args.log_format, cli_args.log_level)
+    query_server = QueryServer(QueryService(main.initialize_openai_client(), QueryCache(cli_args.cache_ttl),
+                                            ClientRateLimiter(cli_args.rate_per_minute, cli_args.burst)),
+                               cli_args.host, cli_args.port, cli_args.trusted_proxies).start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        query_server.stop()
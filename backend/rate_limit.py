@@ -0,0 +1,41 @@
+# backend/rate_limit.py
+# Token bucket shared by the per-client limits of the search query service
+# (backend/query_service.py) and the per-route request limits of the model
+# router (backend/model_router.py).
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `capacity` tokens, refilled at `rate` tokens per second.
+
+    Thread-safe.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 1e-9)
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float | None = None) -> float:
+        """Takes one token. Returns 0.0 if allowed, else the seconds until one is available."""
+        with self._lock:
+            self._refill(time.monotonic() if now is None else now)
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 - self.tokens) / self.rate
+
+    def wait_time(self, now: float | None = None) -> float:
+        """Seconds until a token is available, without taking one."""
+        with self._lock:
+            self._refill(time.monotonic() if now is None else now)
+            return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
@@ -0,0 +1,366 @@
+# backend/scheduler.py
+# Resident scheduler for `python backend/main.py --daemon`. Instead of rebuilding
+# every category once a day, each category is refreshed on its own schedule,
+# declared in its prompt front matter:
+#
+#    refresh_interval: 30m            # every 30 minutes (s/m/h/d suffixes, or seconds)
+#    cron: */30 13-21 * * 1-5         # or a 5-field cron expression, evaluated in UTC
+#
+# Categories without either use SCHEDULER_DEFAULT_INTERVAL. Every due time gets
+# a random delay of up to SCHEDULER_JITTER_SECONDS so categories (and several
+# daemons) don't fire in lockstep. A category runs at most once at a time: inside
+# the process via the in-flight set, across processes via an exclusive lock file
+# per category in backend/.locks. Last-run times are kept in a small state file so
+# a restarted daemon doesn't regenerate every category immediately.
+
+import json
+import os
+import random
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process single-flight
+    fcntl = None
+
+from prompt_registry import PromptRegistry, PromptTemplate
+from telemetry import get_logger
+
+logger = get_logger("scheduler")
+
+# --- Configuration ---
+SCHEDULER_DEFAULT_INTERVAL = os.getenv("SCHEDULER_DEFAULT_INTERVAL", "24h")
+SCHEDULER_JITTER_SECONDS = float(os.getenv("SCHEDULER_JITTER_SECONDS", "30"))
+SCHEDULER_MAX_WORKERS = int(os.getenv("SCHEDULER_MAX_WORKERS", "4"))
+SCHEDULER_PROMPT_POLL_SECONDS = float(os.getenv("SCHEDULER_PROMPT_POLL_SECONDS", "10"))
+SCHEDULER_LOCK_DIR = os.getenv("SCHEDULER_LOCK_DIR", os.path.join(os.path.dirname(__file__), ".locks"))
+
+_INTERVAL_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+class ScheduleError(ValueError):
+    """Raised for an invalid refresh_interval or cron expression."""
+
+
+def parse_interval(value: str) -> float:
+    """Parses '90s', '30m', '2h', '1d' or a plain number of seconds."""
+    text = str(value).strip().lower()
+    try:
+        if text and text[-1] in _INTERVAL_UNITS:
+            seconds = float(text[:-1]) * _INTERVAL_UNITS[text[-1]]
+        else:
+            seconds = float(text)
+    except ValueError:
+        raise ScheduleError(f"invalid interval {value!r} (use e.g. 90s, 30m, 2h, 1d)")
+    if seconds <= 0:
+        raise ScheduleError(f"interval must be positive, got {value!r}")
+    return seconds
+
+
+# --- Cron ---
+class CronSchedule:
+    """
+    Minimal 5-field cron expression (minute hour day-of-month month day-of-week).
+
+    Supports `*`, numbers, ranges (`1-5`), steps (`*/15`, `8-18/2`) and lists
+    (`0,30`). Day-of-week is 0-6 with 0 = Sunday (7 is accepted as Sunday). As in
+    standard cron, when both day fields are restricted a day matching either runs.
+    """
+
+    _FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ScheduleError(f"cron expression needs 5 fields, got {expression!r}")
+        values = [self._parse_field(part, name, low, high) for part, (name, low, high) in zip(parts, self._FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {day % 7 for day in weekdays}
+        self.day_restricted = parts[2] != "*"
+        self.weekday_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(text: str, name: str, low: int, high: int) -> set[int]:
+        values = set()
+        for item in text.split(","):
+            step = 1
+            if "/" in item:
+                item, step_text = item.split("/", 1)
+                if not step_text.isdigit() or int(step_text) == 0:
+                    raise ScheduleError(f"invalid step in cron {name} field: {text!r}")
+                step = int(step_text)
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start_text, end_text = item.split("-", 1)
+                if not (start_text.isdigit() and end_text.isdigit()):
+                    raise ScheduleError(f"invalid range in cron {name} field: {text!r}")
+                start, end = int(start_text), int(end_text)
+            elif item.isdigit():
+                start = int(item)
+                end = high if step > 1 else start
+            else:
+                raise ScheduleError(f"invalid cron {name} field: {text!r}")
+            if start < low or end > high or start > end:
+                raise ScheduleError(f"cron {name} field out of range {low}-{high}: {text!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays  # Python: Monday=0; cron: Sunday=0
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """Returns the first matching minute strictly after `after` (UTC)."""
+        moment = after.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=5 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ScheduleError(f"cron expression {self.expression!r} never matches")
+
+
+class CategorySchedule:
+    """When one category is due: a fixed interval or a cron expression."""
+
+    def __init__(self, interval: float | None = None, cron: CronSchedule | None = None):
+        self.interval = interval
+        self.cron = cron
+
+    @classmethod
+    def for_template(cls, template: PromptTemplate,
+                     default_interval: str = SCHEDULER_DEFAULT_INTERVAL) -> "CategorySchedule":
+        """Builds the schedule from a template's `cron` or `refresh_interval` metadata."""
+        if template.metadata.get("cron"):
+            return cls(cron=CronSchedule(template.metadata["cron"]))
+        return cls(interval=parse_interval(template.metadata.get("refresh_interval") or default_interval))
+
+    def next_run(self, last_run: float | None, now: float) -> float:
+        """Returns the epoch time the category is next due (`now` if it never ran)."""
+        if self.cron:
+            after = datetime.fromtimestamp(last_run if last_run is not None else now, tz=timezone.utc)
+            return self.cron.next_after(after).timestamp()
+        if last_run is None:
+            return now
+        return last_run + self.interval
+
+    def period(self, now: float) -> float:
+        """Approximate seconds between runs (for cron: the gap between the next two fire times)."""
+        if self.interval:
+            return self.interval
+        first = self.cron.next_after(datetime.fromtimestamp(now, tz=timezone.utc))
+        return (self.cron.next_after(first) - first).total_seconds()
+
+    def describe(self) -> str:
+        return f"cron '{self.cron.expression}'" if self.cron else f"every {self.interval:g}s"
+
+
+# --- Single-flight locks ---
+class CategoryLock:
+    """Non-blocking exclusive lock file for one category (shared across processes)."""
+
+    def __init__(self, lock_dir: str, slug: str):
+        self.path = os.path.join(lock_dir, f"{slug}.lock")
+        self._file = None
+
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a+")
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(f"{os.getpid()}\n")
+        self._file.flush()
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+# --- Scheduler ---
+class CategoryScheduler:
+    """
+    Runs `run_category(template, period_seconds)` for each registry template on
+    its own schedule until `stop()` is called (or SIGINT/SIGTERM is received).
+
+    `period_seconds` lets the callback size cache windows to the refresh rate.
+    Runs that are in flight when stopping are allowed to finish.
+    """
+
+    def __init__(self, registry: PromptRegistry, run_category, max_workers: int = SCHEDULER_MAX_WORKERS,
+                 jitter_seconds: float = SCHEDULER_JITTER_SECONDS, lock_dir: str = SCHEDULER_LOCK_DIR,
+                 default_interval: str = SCHEDULER_DEFAULT_INTERVAL):
+        self.registry = registry
+        self.run_category = run_category
+        self.max_workers = max(1, max_workers)
+        self.jitter_seconds = max(0.0, jitter_seconds)
+        self.lock_dir = lock_dir
+        self.default_interval = default_interval
+        self.state_path = os.path.join(lock_dir, "scheduler_state.json")
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._schedules: dict[str, CategorySchedule] = {}  # slug -> schedule
+        self._due: dict[str, float] = {}                   # slug -> epoch due time (with jitter)
+        self._running: set[str] = set()
+        self._last_run = self._load_state()
+
+    # --- State ---
+    def _load_state(self) -> dict[str, float]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                return {slug: float(value) for slug, value in json.load(state_file).get("last_run", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save_state(self):
+        os.makedirs(self.lock_dir, exist_ok=True)
+        temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with self._lock:
+            state = {"last_run": dict(self._last_run)}
+        with open(temp_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    # --- Scheduling ---
+    def _jitter(self) -> float:
+        return random.uniform(0, self.jitter_seconds) if self.jitter_seconds else 0.0
+
+    def _schedule(self, template: PromptTemplate, now: float, run_now: bool = False):
+        try:
+            schedule = CategorySchedule.for_template(template, self.default_interval)
+        except ScheduleError as e:
+            logger.info(f"  [Scheduler] {template.slug}.md: {e}; using default interval {self.default_interval}.")
+            schedule = CategorySchedule(interval=parse_interval(self.default_interval))
+        last_run = None if run_now else self._last_run.get(template.slug)
+        due = schedule.next_run(last_run, now) + self._jitter()
+        with self._lock:
+            self._schedules[template.slug] = schedule
+            self._due[template.slug] = due
+        logger.info(f"  [Scheduler] {template.display_name}: {schedule.describe()}, next run "
+                    f"{datetime.fromtimestamp(due, tz=timezone.utc).isoformat(timespec='seconds')}")
+
+    def reschedule(self, changed_slugs: list[str]):
+        """Applies prompt changes: new or edited categories run soon, removed ones are dropped."""
+        now = time.time()
+        current = {template.slug: template for template in self.registry.templates()}
+        with self._lock:
+            for slug in list(self._schedules):
+                if slug not in current:
+                    self._schedules.pop(slug, None)
+                    self._due.pop(slug, None)
+                    logger.info(f"  [Scheduler] Removed category '{slug}'.")
+        for slug in changed_slugs:
+            if slug in current:
+                self._schedule(current[slug], now, run_now=True)
+        self._wake.set()
+
+    def _claim_due(self, now: float) -> list[PromptTemplate]:
+        """Returns due templates (in prompt order) and marks them as running."""
+        due = []
+        with self._lock:
+            for template in self.registry.templates():
+                slug = template.slug
+                if slug in self._running or self._due.get(slug, float("inf")) > now:
+                    continue
+                if len(self._running) >= self.max_workers:
+                    break
+                self._running.add(slug)
+                due.append(template)
+        return due
+
+    def _seconds_until_next(self, now: float) -> float:
+        with self._lock:
+            pending = [due for slug, due in self._due.items() if slug not in self._running]
+        return max(0.0, min(pending) - now) if pending else 60.0
+
+    def _execute(self, template: PromptTemplate):
+        slug = template.slug
+        lock = CategoryLock(self.lock_dir, slug)
+        started = time.time()
+        try:
+            if not lock.acquire():
+                logger.warning(f"  [Scheduler] {template.display_name} is already running in another process; skipping.")
+                return
+            with self._lock:
+                schedule = self._schedules.get(slug)
+            period = schedule.period(started) if schedule else parse_interval(self.default_interval)
+            logger.info(f"\n  [Scheduler] Refreshing {template.display_name}...")
+            try:
+                self.run_category(template, period)
+            except Exception as e:
+                logger.error(f"  [Scheduler] {template.display_name} failed: {e}")
+            logger.info(f"  [Scheduler] {template.display_name} finished in {time.time() - started:.1f}s.")
+            with self._lock:
+                self._last_run[slug] = started
+            self._save_state()
+        finally:
+            lock.release()
+            with self._lock:
+                self._running.discard(slug)
+                schedule = self._schedules.get(slug)
+                if schedule is not None:
+                    self._due[slug] = schedule.next_run(self._last_run.get(slug, started), time.time()) + self._jitter()
+            self._wake.set()
+
+    # --- Lifecycle ---
+    def install_signal_handlers(self):
+        """Stops the loop gracefully on SIGINT/SIGTERM (main thread only)."""
+        def handle(signum, frame):
+            logger.info(f"\n  [Scheduler] Received {signal.Signals(signum).name}; finishing in-flight categories...")
+            self.stop()
+
+        signal.signal(signal.SIGINT, handle)
+        signal.signal(signal.SIGTERM, handle)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def run_forever(self, prompt_poll_seconds: float = SCHEDULER_PROMPT_POLL_SECONDS):
+        """Schedules every category, then dispatches due runs until stopped."""
+        now = time.time()
+        for template in self.registry.templates():
+            self._schedule(template, now)
+        self.registry.watch(prompt_poll_seconds, on_change=self.reschedule)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scheduled") as executor:
+            while not self._stop.is_set():
+                # Clear before reading the schedule: a wake() from here on makes the wait return at once
+                self._wake.clear()
+                now = time.time()
+                for template in self._claim_due(now):
+                    executor.submit(self._execute, template)
+                self._wake.wait(self._seconds_until_next(time.time()))
+            logger.info("  [Scheduler] Waiting for in-flight categories to finish...")
+        self.registry.stop_watching()
+        logger.info("  [Scheduler] Stopped.")
@@ -0,0 +1,206 @@
+# backend/streaming.py
+# Helpers for streaming OpenAI chat completions: consuming the token stream while
+# measuring time-to-first-token and throughput, and a small local Server-Sent
+# Events endpoint that pushes partial summaries to readers as they are generated.
+
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telemetry import get_logger
+
+logger = get_logger("streaming")
+
+# --- Configuration ---
+# Minimum seconds between partial-summary pushes for one category
+STREAM_PARTIAL_INTERVAL_SECONDS = float(os.getenv("STREAM_PARTIAL_INTERVAL_SECONDS", "0.5"))
+
+# Per-category stream metrics for the current process
+_stream_metrics: dict[str, dict] = {}
+_stream_metrics_lock = threading.Lock()
+
+
+def consume_chat_stream(stream, category: str, on_partial=None,
+                        partial_interval: float = STREAM_PARTIAL_INTERVAL_SECONDS) -> dict:
+    """
+    Reads a streamed chat completion to the end.
+
+    Args:
+        stream: Iterator of chat.completion.chunk objects (created with stream=True).
+        category (str): Category name, used for metrics and partial pushes.
+        on_partial (callable | None): Called as on_partial(category, text_so_far)
+                                      at most every `partial_interval` seconds.
+        partial_interval (float): Throttle for `on_partial`.
+
+    Returns:
+        dict: 'text', 'finish_reason', 'usage' (dict or None) and 'metrics'
+              ('ttft_seconds', 'total_seconds', 'completion_tokens', 'tokens_per_second').
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    last_partial_at = 0.0
+    parts = []
+    chunk_count = 0
+    finish_reason = None
+    usage = None
+
+    for chunk in stream:
+        # With include_usage the final chunk carries usage and no choices
+        if getattr(chunk, "usage", None):
+            usage = {
+                "prompt_tokens": chunk.usage.prompt_tokens,
+                "completion_tokens": chunk.usage.completion_tokens,
+                "total_tokens": chunk.usage.total_tokens,
+            }
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+        delta = getattr(choice.delta, "content", None)
+        if not delta:
+            continue
+        now = time.perf_counter()
+        if first_token_at is None:
+            first_token_at = now
+        parts.append(delta)
+        chunk_count += 1
+        if on_partial and now - last_partial_at >= partial_interval:
+            last_partial_at = now
+            on_partial(category, "".join(parts))
+
+    total = time.perf_counter() - started
+    completion_tokens = usage["completion_tokens"] if usage else chunk_count  # ~1 token per chunk
+    generation_time = total - (first_token_at - started) if first_token_at else 0.0
+    metrics = {
+        "ttft_seconds": (first_token_at - started) if first_token_at else None,
+        "total_seconds": total,
+        "completion_tokens": completion_tokens,
+        "tokens_per_second": (completion_tokens / generation_time) if generation_time > 0 else None,
+        "finish_reason": finish_reason,
+    }
+    with _stream_metrics_lock:
+        _stream_metrics[category] = metrics
+    return {"text": "".join(parts), "finish_reason": finish_reason, "usage": usage, "metrics": metrics}
+
+
+def get_stream_metrics() -> dict[str, dict]:
+    """Returns the recorded per-category stream metrics."""
+    with _stream_metrics_lock:
+        return {category: dict(metrics) for category, metrics in _stream_metrics.items()}
+
+
+def print_stream_metrics():
+    """Prints time-to-first-token and tokens/sec for every streamed category."""
+    for category, metrics in get_stream_metrics().items():
+        ttft = metrics["ttft_seconds"]
+        rate = metrics["tokens_per_second"]
+        logger.info(
+            f"  [Stream] {category}: ttft={'n/a' if ttft is None else f'{ttft:.2f}s'} "
+            f"total={metrics['total_seconds']:.2f}s tokens={metrics['completion_tokens']} "
+            f"rate={'n/a' if rate is None else f'{rate:.1f} tok/s'} finish={metrics['finish_reason']}"
+        )
+
+
+# --- Local SSE Endpoint ---
+class SummaryEventBroadcaster:
+    """
+    Serves partial and final summaries as Server-Sent Events on localhost.
+
+    GET /events streams `partial`, `done` and `error` events (JSON data with
+    'category' and 'summary'); newly connected readers first receive the latest
+    state of every category. GET /snapshot returns that state as JSON.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+        self._subscribers: list[queue.Queue] = []
+        self._state: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        broadcaster = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass  # Keep the pipeline output readable
+
+            def do_GET(self):
+                if self.path.startswith("/snapshot"):
+                    body = json.dumps(broadcaster.snapshot()).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if not self.path.startswith("/events"):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                subscriber = broadcaster._subscribe()
+                try:
+                    while True:
+                        event = subscriber.get()
+                        if event is None:
+                            break
+                        self.wfile.write(event)
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    broadcaster._unsubscribe(subscriber)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_port
+        self._thread = threading.Thread(target=self.server.serve_forever, name="sse", daemon=True)
+
+    @staticmethod
+    def _encode(event: str, payload: dict) -> bytes:
+        return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+    def _subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue()
+        with self._lock:
+            for state in self._state.values():
+                subscriber.put(self._encode(state["event"], state))
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def _unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def start(self) -> "SummaryEventBroadcaster":
+        self._thread.start()
+        logger.info(f"  [SSE] Streaming partial summaries at http://{self.server.server_address[0]}:{self.port}/events")
+        return self
+
+    def publish(self, event: str, category: str, summary: str):
+        """Sends an event to every connected reader and records it as the category's state."""
+        payload = {"event": event, "category": category, "summary": summary, "timestamp": time.time()}
+        encoded = self._encode(event, payload)
+        with self._lock:
+            self._state[category] = payload
+            for subscriber in self._subscribers:
+                subscriber.put(encoded)
+
+    def publish_partial(self, category: str, summary: str):
+        self.publish("partial", category, summary)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {category: dict(state) for category, state in self._state.items()}
+
+    def stop(self):
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(None)
+        self.server.shutdown()
+        self.server.server_close()
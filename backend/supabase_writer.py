@@ -0,0 +1,375 @@
+# backend/supabase_writer.py
+# Write-behind buffer for the daily_summaries table. A run collects its summaries
+# here and flushes them in one bulk upsert keyed on (generation_date, category),
+# so reruns inside the same generation window overwrite rather than duplicate.
+# Flushes that fail are spilled to a local JSONL journal and replayed next run;
+# journaled rows never replace a newer summary (see `replay_journal`).
+# Every successful write also refreshes latest_summaries, which holds exactly one
+# row per category so the frontend never has to scan the full history.
+# Categories skipped by incremental regeneration (backend/incremental.py) only
+# get their latest_summaries.checked_at bumped.
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from supabase import Client
+
+from telemetry import get_logger
+
+logger = get_logger("supabase_writer")
+
+# --- Configuration ---
+SUMMARIES_TABLE = "daily_summaries"
+LATEST_SUMMARIES_TABLE = "latest_summaries"
+# Width of a generation window. Rows from every run inside one window share the
+# same generation_date, which is what makes reruns idempotent (default: one day).
+GENERATION_INTERVAL_MINUTES = int(os.getenv("GENERATION_INTERVAL_MINUTES", str(24 * 60)))
+# Incremental regeneration columns (backend/migrations/003_summary_fingerprints.sql),
+# copied to latest_summaries when a row carries them
+FINGERPRINT_COLUMNS = ("fingerprint", "source_urls")
+JOURNAL_PATH = os.getenv(
+    "SUPABASE_JOURNAL_PATH",
+    os.path.join(os.path.dirname(__file__), ".journal", "pending_summaries.jsonl"),
+)
+
+
+def generation_timestamp(now: datetime | None = None,
+                         interval_minutes: int = GENERATION_INTERVAL_MINUTES) -> str:
+    """
+    Returns the ISO timestamp identifying the generation window containing `now`.
+
+    The window start is computed in UTC so every writer agrees on it.
+    """
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.astimezone(timezone.utc)
+    interval_seconds = max(1, interval_minutes) * 60
+    window_start = int(now.timestamp() // interval_seconds) * interval_seconds
+    return datetime.fromtimestamp(window_start, tz=timezone.utc).isoformat()
+
+
+def describe_supabase_error(response) -> str:
+    """Extracts the most useful error message from a supabase-py response."""
+    error_message = "Unknown error"  # Default error message
+    if hasattr(response, 'error') and response.error:
+        error_message = str(response.error)
+    elif hasattr(response, 'message') and response.message:
+        error_message = str(response.message)
+    elif hasattr(response, 'details') and response.details:
+        error_message = str(response.details)
+    return error_message
+
+
+def upsert_latest_summaries(client: Client, saved_rows: list[dict],
+                            table_name: str = LATEST_SUMMARIES_TABLE,
+                            stored_dates: dict[str, str] | None = None) -> bool:
+    """
+    Replaces the latest_summaries row of each category in `saved_rows`.
+
+    Args:
+        client (Client): Initialized Supabase client.
+        saved_rows (list[dict]): Rows as returned by the daily_summaries upsert
+                                 (including their `id`).
+        table_name (str): Target table.
+        stored_dates (dict[str, str] | None): Category -> generation_date already in
+                                              the table; older rows are left out.
+
+    Returns:
+        bool: True if Supabase acknowledged the rows.
+    """
+    latest = {}
+    for row in saved_rows:
+        if stored_dates and _is_older(row.get("generation_date"), stored_dates.get(row["category"])):
+            continue
+        # If a batch holds several windows for one category, keep the newest
+        current = latest.get(row["category"])
+        if current is None or str(row.get("generation_date")) >= str(current["generation_date"]):
+            latest[row["category"]] = {
+                "category": row["category"],
+                "id": row.get("id"),
+                "generation_date": row.get("generation_date"),
+                "summary": row.get("summary"),
+                "sources": row.get("sources", "[]"),
+                "created_at": row.get("created_at") or datetime.now(timezone.utc).isoformat(),
+            }
+            if "fingerprint" in row:
+                latest[row["category"]].update({column: row.get(column) for column in FINGERPRINT_COLUMNS})
+                latest[row["category"]]["checked_at"] = datetime.now(timezone.utc).isoformat()
+    if not latest:
+        return True
+    try:
+        response = client.table(table_name).upsert(list(latest.values()), on_conflict="category").execute()
+    except Exception as e:
+        logger.error(f"  [Supabase] Error refreshing '{table_name}' for {len(latest)} categories: {e}")
+        return False
+    if response.data:
+        return True
+    logger.error(f"  [Supabase] Error refreshing '{table_name}': {describe_supabase_error(response)}")
+    logger.error(f"    Please ensure the '{table_name}' table from backend/migrations/ has been created.")
+    return False
+
+
+def upsert_summary_rows(client: Client, rows: list[dict], table_name: str = SUMMARIES_TABLE,
+                        stored_dates: dict[str, str] | None = None) -> bool:
+    """
+    Upserts summary rows in a single request, then refreshes latest_summaries.
+
+    Args:
+        client (Client): Initialized Supabase client.
+        rows (list[dict]): Rows with generation_date, category, summary and sources.
+        table_name (str): Target table.
+        stored_dates (dict[str, str] | None): See `upsert_latest_summaries`.
+
+    Returns:
+        bool: True if Supabase acknowledged the rows in both tables.
+    """
+    if not rows:
+        return True
+    try:
+        response = (
+            client.table(table_name)
+            .upsert(rows, on_conflict="generation_date,category")
+            .execute()
+        )
+    except Exception as e:
+        logger.error(f"  [Supabase] Error during bulk upsert of {len(rows)} rows into '{table_name}': {e}")
+        return False
+
+    # Check response structure (supabase-py v2)
+    if response.data:
+        return upsert_latest_summaries(client, response.data, stored_dates=stored_dates)
+    logger.error(f"  [Supabase] Error upserting {len(rows)} rows into '{table_name}': {describe_supabase_error(response)}")
+    logger.error(f"    Response status: {getattr(response, 'status_code', 'N/A')}")
+    logger.error(f"    Please ensure the table '{table_name}' exists, has the correct schema/permissions and the")
+    logger.error("    unique (generation_date, category) index from backend/migrations/ has been applied.")
+    return False
+
+
+def touch_latest_summaries(client: Client, categories: list[str], checked_at: str | None = None,
+                           table_name: str = LATEST_SUMMARIES_TABLE) -> bool:
+    """
+    Marks unchanged categories as checked without rewriting their summaries.
+
+    Only `checked_at` is sent, so the upsert leaves every other column of the
+    existing latest_summaries rows as it is.
+
+    Returns:
+        bool: True if Supabase acknowledged the rows.
+    """
+    if not categories:
+        return True
+    checked_at = checked_at or datetime.now(timezone.utc).isoformat()
+    rows = [{"category": category, "checked_at": checked_at} for category in categories]
+    try:
+        response = client.table(table_name).upsert(rows, on_conflict="category").execute()
+    except Exception as e:
+        logger.error(f"  [Supabase] Error updating checked_at of {len(rows)} categories in '{table_name}': {e}")
+        return False
+    if response.data:
+        return True
+    logger.error(f"  [Supabase] Error updating checked_at in '{table_name}': {describe_supabase_error(response)}")
+    return False
+
+
+# --- Journal ---
+_journal_lock = threading.Lock()  # Daemon workers flush (and may spill) concurrently
+
+
+def _parse_timestamp(value) -> datetime | None:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _is_older(generation_date, other_generation_date) -> bool:
+    """True if both timestamps parse and the first window starts before the second."""
+    first, second = _parse_timestamp(generation_date), _parse_timestamp(other_generation_date)
+    return first is not None and second is not None and first < second
+
+
+def _read_journal(journal_path: str) -> list[dict]:
+    rows = []
+    with open(journal_path, "r", encoding="utf-8") as journal:
+        for line_number, line in enumerate(journal, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.error(f"  [Supabase] Skipping corrupt journal line {line_number} in {journal_path}")
+    return rows
+
+
+def append_to_journal(rows: list[dict], journal_path: str = JOURNAL_PATH):
+    """Appends rows that could not be written so the next run can replay them."""
+    os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+    with _journal_lock, open(journal_path, "a", encoding="utf-8") as journal:
+        for row in rows:
+            journal.write(json.dumps(row, ensure_ascii=False) + "\n")
+    logger.warning(f"  [Supabase] Spilled {len(rows)} rows to journal: {journal_path}")
+
+
+def discard_superseded_journal_rows(saved_rows: list[dict], journal_path: str = JOURNAL_PATH) -> int:
+    """
+    Drops journaled rows that a successful write has made obsolete.
+
+    A journaled row is obsolete once a row for the same category and the same or
+    a later generation window has been written; replaying it would put the
+    older summary back.
+
+    Returns:
+        int: Number of rows dropped.
+    """
+    newest = {}
+    for row in saved_rows:
+        current = newest.get(row["category"])
+        if current is None or _is_older(current, row["generation_date"]):
+            newest[row["category"]] = row["generation_date"]
+    with _journal_lock:
+        if not newest or not os.path.exists(journal_path):
+            return 0
+        rows = _read_journal(journal_path)
+        kept = [row for row in rows if row.get("category") not in newest
+                or _is_older(newest[row["category"]], row.get("generation_date"))]
+        if len(kept) == len(rows):
+            return 0
+        if kept:
+            temporary = f"{journal_path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as journal:
+                for row in kept:
+                    journal.write(json.dumps(row, ensure_ascii=False) + "\n")
+            os.replace(temporary, journal_path)
+        else:
+            os.remove(journal_path)
+    logger.info(f"  [Supabase] Dropped {len(rows) - len(kept)} journaled rows superseded by newer summaries.")
+    return len(rows) - len(kept)
+
+
+def stored_generation_dates(client: Client, table_name: str = LATEST_SUMMARIES_TABLE) -> dict[str, str] | None:
+    """Category -> generation_date of its latest_summaries row, or None if the table cannot be read."""
+    try:
+        response = client.table(table_name).select("category, generation_date").execute()
+    except Exception as e:
+        logger.error(f"  [Supabase] Error reading '{table_name}': {e}")
+        return None
+    return {row["category"]: row.get("generation_date") for row in response.data or []}
+
+
+def replay_journal(client: Client | None, journal_path: str = JOURNAL_PATH) -> int:
+    """
+    Replays rows spilled by earlier failed flushes.
+
+    Later rows for the same (generation_date, category) win. Every row goes to
+    the history table, but a row from a generation window older than its
+    category's latest_summaries row does not replace it, so a stale journal
+    never hides a newer summary. The journal is only removed once Supabase has
+    accepted every row.
+
+    Returns:
+        int: Number of rows replayed (0 if there was nothing to do or it failed).
+    """
+    if not client or not os.path.exists(journal_path):
+        return 0
+
+    pending = {}
+    for row in _read_journal(journal_path):
+        pending[(row.get("generation_date"), row.get("category"))] = row
+
+    stored = stored_generation_dates(client)
+    if stored is None:
+        logger.error("  [Supabase] Cannot check journaled rows against stored summaries; rows kept for the next run.")
+        return 0
+    rows = list(pending.values())
+    logger.info(f"  [Supabase] Replaying {len(rows)} journaled rows from {journal_path}...")
+    if not upsert_summary_rows(client, rows, stored_dates=stored):
+        logger.error("  [Supabase] Journal replay failed; rows kept for the next run.")
+        return 0
+    with _journal_lock:
+        os.remove(journal_path)
+    logger.info(f"  [Supabase] Journal replay complete ({len(rows)} rows).")
+    return len(rows)
+
+
+# --- Write-Behind Buffer ---
+class SummaryWriteBuffer:
+    """
+    Collects one row per category for the current run and flushes them together.
+
+    All rows share the run's generation timestamp. Adding a category twice
+    replaces the earlier row. Safe to fill from the pipeline's worker threads.
+    """
+
+    def __init__(self, generation_date: str | None = None, table_name: str = SUMMARIES_TABLE,
+                 journal_path: str = JOURNAL_PATH):
+        self.generation_date = generation_date or generation_timestamp()
+        self.table_name = table_name
+        self.journal_path = journal_path
+        self._rows: dict[str, dict] = {}
+        self._unchanged: set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, category: str, summary: str, sources: str = "[]", columns: dict | None = None):
+        """Queues a summary for the next flush; `columns` adds extra columns (e.g. its fingerprint)."""
+        row = {
+            "generation_date": self.generation_date,
+            "category": category,
+            "summary": summary,  # Contains summary text with footnotes
+            "sources": sources,
+        }
+        row.update(columns or {})
+        with self._lock:
+            self._rows[category] = row
+            self._unchanged.discard(category)
+
+    def mark_unchanged(self, category: str):
+        """Queues a checked_at update for a category whose stored summary is still current."""
+        with self._lock:
+            if category not in self._rows:
+                self._unchanged.add(category)
+
+    def pending_rows(self) -> list[dict]:
+        with self._lock:
+            return list(self._rows.values())
+
+    def flush(self, client: Client | None) -> bool:
+        """
+        Writes all queued rows in one bulk upsert.
+
+        On failure the rows are spilled to the journal. The buffer is emptied
+        either way.
+
+        Returns:
+            bool: True if the rows reached Supabase.
+        """
+        with self._lock:
+            rows = list(self._rows.values())
+            unchanged = sorted(self._unchanged)
+            self._rows.clear()
+            self._unchanged.clear()
+        if not rows and not unchanged:
+            return True
+        if not client:
+            logger.warning(f"Supabase client not initialized. Skipping database save of {len(rows)} summaries.")
+            return False
+
+        if unchanged:
+            # Best effort: a missed checked_at update is harmless and not journaled
+            logger.info(f"  [Supabase] Marking {len(unchanged)} unchanged categories as checked...")
+            touch_latest_summaries(client, unchanged)
+        if not rows:
+            return True
+        logger.info(f"  [Supabase] Flushing {len(rows)} summaries (generation_date={self.generation_date}) "
+                    f"to '{self.table_name}' in one upsert...")
+        if upsert_summary_rows(client, rows, self.table_name):
+            logger.info(f"    Successfully saved {len(rows)} summaries.")
+            discard_superseded_journal_rows(rows, self.journal_path)
+            return True
+        append_to_journal(rows, self.journal_path)
+        return False
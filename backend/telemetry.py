@@ -0,0 +1,441 @@
+# backend/telemetry.py
+# Structured logging and run metrics for the summary pipeline.
+#
+# Logging: modules log through `get_logger(name)`. The default "text" format
+# prints messages exactly as before; `--log-format json` (or LOG_FORMAT=json)
+# emits one JSON object per line with the level, logger, the category being
+# processed and any `extra=` fields. Full prompt/response dumps are only logged
+# with `--verbose-prompts` (LOG_PROMPTS=true).
+#
+# Metrics: `metrics` is the process-wide registry of counters and latency
+# histograms. `stage(name, category)` times one pipeline stage (prompt_load,
+# serper_fetch, article_fetch, prompt_build, openai_call, supabase_write);
+# HTTP sessions, caches and token accounting add bytes, retries, cache hits,
+# tokens and estimated cost. At the end of a run the registry is written as a
+# JSON run summary and as an OpenMetrics/Prometheus text file, and the daemon can
+# serve the same text on `--metrics-port` for scraping.
+
+import contextlib
+import contextvars
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # 'text' or 'json'
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_PROMPTS = os.getenv("LOG_PROMPTS", "false").lower() in ("1", "true", "yes")
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(os.path.dirname(__file__), ".metrics"))
+METRICS_PREFIX = "jtf"
+
+# Estimated USD per 1M tokens (input, cached input, output) for cost reporting.
+# Unknown models fall back to OPENAI_PRICE_* (default: gpt-4o list prices).
+MODEL_PRICES_PER_MTOK = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+DEFAULT_PRICES_PER_MTOK = (
+    float(os.getenv("OPENAI_PRICE_INPUT_PER_MTOK", "2.50")),
+    float(os.getenv("OPENAI_PRICE_CACHED_INPUT_PER_MTOK", "1.25")),
+    float(os.getenv("OPENAI_PRICE_OUTPUT_PER_MTOK", "10.00")),
+)
+BATCH_DISCOUNT = 0.5  # Batch API completions are billed at half price
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+HISTOGRAM_SAMPLES = 4096  # Observations kept per series for p50/p95
+
+_current_category: contextvars.ContextVar[str] = contextvars.ContextVar("category", default="")
+
+
+# --- Logging ---
+_RESERVED_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class TextFormatter(logging.Formatter):
+    """Plain console output: the message only, as the pipeline always printed it."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, category, msg and any extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage().strip(),
+        }
+        category = getattr(record, "category", None) or _current_category.get()
+        if category:
+            entry["category"] = category
+        for key, value in vars(record).items():
+            if key not in _RESERVED_RECORD_FIELDS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns the pipeline logger for a module (all share the 'jtf' handler)."""
+    return logging.getLogger(f"{METRICS_PREFIX}.{name}")
+
+
+def configure_logging(log_format: str = LOG_FORMAT, level: str = LOG_LEVEL, verbose_prompts: bool = LOG_PROMPTS):
+    """
+    Installs the console handler for every pipeline logger.
+
+    Args:
+        log_format (str): 'text' (human-readable, the default) or 'json' (one object per line).
+        level (str): Minimum level, e.g. 'INFO' or 'DEBUG'.
+        verbose_prompts (bool): Also log full prompts and raw completions (logger 'jtf.prompts').
+    """
+    root = logging.getLogger(METRICS_PREFIX)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    root.propagate = False
+    # Prompt dumps are large; they are only written when explicitly requested
+    get_logger("prompts").setLevel(logging.DEBUG if verbose_prompts else logging.WARNING)
+
+
+# Usable before configure_logging() runs (e.g. when modules are imported by scripts)
+if not logging.getLogger(METRICS_PREFIX).handlers:
+    configure_logging()
+
+
+@contextlib.contextmanager
+def bind_category(category: str):
+    """Tags log records and metrics emitted in this context with `category`."""
+    token = _current_category.set(category)
+    try:
+        yield
+    finally:
+        _current_category.reset(token)
+
+
+def current_category() -> str:
+    return _current_category.get()
+
+
+# --- Metrics ---
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    """
+    Cumulative latency histogram (Prometheus-style buckets) plus sum/count/max,
+    and the most recent HISTOGRAM_SAMPLES observations for exact percentiles.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples: deque[float] = deque(maxlen=HISTOGRAM_SAMPLES)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Nearest-rank percentile (0 < q <= 1) of the retained samples."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms keyed by name and labels.
+
+    Counters are monotonic for the life of the process (the daemon keeps
+    accumulating), which is what a Prometheus scraper expects.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._help: dict[str, str] = {}
+        self.started_at = time.time()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not value:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._histograms.setdefault(name, {}).setdefault(key, Histogram()).observe(value)
+
+    @contextlib.contextmanager
+    def stage(self, stage: str, category: str | None = None):
+        """Times a pipeline stage into `stage_seconds{stage, category}` (errors are counted too)."""
+        category = current_category() if category is None else category
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("stage_seconds", elapsed, stage=stage, category=category)
+            if status == "error":
+                self.inc("stage_errors_total", stage=stage, category=category)
+
+    def counter_value(self, name: str, **labels) -> float:
+        """Sum of a counter over every series matching `labels`."""
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(value for key, value in self._counters.get(name, {}).items() if wanted <= set(key))
+
+    def quantiles(self, name: str, by: str, qs: tuple[float, ...] = (0.5, 0.95)) -> dict[str, dict]:
+        """
+        Percentiles of a histogram with its series merged per value of label `by`
+        (e.g. stage latency across all categories).
+
+        Returns:
+            dict: label value -> {'count', 'sum', 'p50', 'p95', ...}
+        """
+        merged: dict[str, list[float]] = {}
+        totals: dict[str, list] = {}
+        with self._lock:
+            for key, histogram in self._histograms.get(name, {}).items():
+                group = dict(key).get(by, "")
+                merged.setdefault(group, []).extend(histogram.samples)
+                total = totals.setdefault(group, [0, 0.0])
+                total[0] += histogram.count
+                total[1] += histogram.sum
+        result = {}
+        for group, samples in merged.items():
+            samples.sort()
+            entry = {"count": totals[group][0], "sum": round(totals[group][1], 6)}
+            for q in qs:
+                entry[f"p{round(q * 100)}"] = (samples[max(0, math.ceil(q * len(samples)) - 1)]
+                                               if samples else None)
+            result[group] = entry
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+        self.started_at = time.time()
+
+    # --- Export ---
+    def snapshot(self) -> dict:
+        """Returns every series as plain data: {'counters': {...}, 'histograms': {...}}."""
+        with self._lock:
+            counters = {name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                        for name, series in sorted(self._counters.items())}
+            histograms = {name: [{"labels": dict(key), "count": histogram.count, "sum": round(histogram.sum, 6),
+                                  "max": round(histogram.max, 6), "p50": histogram.quantile(0.5),
+                                  "p95": histogram.quantile(0.95)}
+                                 for key, histogram in sorted(series.items())]
+                          for name, series in sorted(self._histograms.items())}
+        return {"counters": counters, "histograms": histograms}
+
+    def category_summary(self) -> dict[str, dict]:
+        """
+        Regroups the series carrying a `category` label per category.
+
+        Returns:
+            dict: category -> {'stages': {stage: seconds}, and one entry per counter
+                  (e.g. 'tokens_total', 'http_bytes_received_total'), summed over its other labels}.
+        """
+        summary: dict[str, dict] = {}
+        snapshot = self.snapshot()
+        for series in snapshot["histograms"].get("stage_seconds", []):
+            category = series["labels"].get("category") or "(run)"
+            stages = summary.setdefault(category, {}).setdefault("stages", {})
+            stages[series["labels"]["stage"]] = round(stages.get(series["labels"]["stage"], 0) + series["sum"], 6)
+        for name, all_series in snapshot["counters"].items():
+            for series in all_series:
+                if "category" not in series["labels"]:
+                    continue
+                category = series["labels"]["category"] or "(run)"
+                labels = {key: value for key, value in series["labels"].items() if key != "category"}
+                entry = summary.setdefault(category, {}).setdefault(name, {})
+                label = ",".join(f"{key}={value}" for key, value in sorted(labels.items())) or "total"
+                entry[label] = entry.get(label, 0) + series["value"]
+        return summary
+
+    def to_openmetrics(self) -> str:
+        """Renders the registry in the OpenMetrics text format (also valid Prometheus text)."""
+        def render_labels(labels: dict) -> str:
+            if not labels:
+                return ""
+            escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                       for key, value in sorted(labels.items()))
+            return "{" + ",".join(escaped) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                family = f"{METRICS_PREFIX}_{name[:-len('_total')] if name.endswith('_total') else name}"
+                lines.append(f"# TYPE {family} counter")
+                if name in self._help:
+                    lines.append(f"# HELP {family} {self._help[name]}")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{family}_total{render_labels(dict(key))} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                family = f"{METRICS_PREFIX}_{name}"
+                lines.append(f"# TYPE {family} histogram")
+                if name in self._help:
+                    lines.append(f"# HELP {family} {self._help[name]}")
+                for key, histogram in sorted(series.items()):
+                    labels = dict(key)
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                        lines.append(f"{family}_bucket{render_labels({**labels, 'le': f'{bound:g}'})} {count}")
+                    lines.append(f"{family}_bucket{render_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+                    lines.append(f"{family}_count{render_labels(labels)} {histogram.count}")
+                    lines.append(f"{family}_sum{render_labels(labels)} {histogram.sum:.6f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("stage_seconds", "Wall time of one pipeline stage.")
+metrics.describe("stage_errors_total", "Pipeline stages that raised.")
+metrics.describe("http_requests_total", "Logical HTTP requests per service.")
+metrics.describe("http_retries_total", "HTTP retry attempts per service.")
+metrics.describe("http_bytes_received_total", "Response bytes received per service.")
+metrics.describe("cache_lookups_total", "Local cache lookups by result (hit, miss, expired).")
+metrics.describe("tokens_total", "OpenAI tokens by kind (prompt, cached_prompt, completion).")
+metrics.describe("cost_usd_total", "Estimated OpenAI cost in USD.")
+metrics.describe("summaries_total", "Category results by status (ok, error, no_articles, unchanged).")
+metrics.describe("summary_validations_total", "Summary validation results (passed, repaired, failed).")
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0,
+                  batch: bool = False) -> float:
+    """Estimated USD for one completion (MODEL_PRICES_PER_MTOK, falling back to OPENAI_PRICE_*)."""
+    price_input, price_cached, price_output = next(
+        (prices for name, prices in sorted(MODEL_PRICES_PER_MTOK.items(), key=lambda item: -len(item[0]))
+         if model.startswith(name)), DEFAULT_PRICES_PER_MTOK)
+    cached = min(cached_prompt_tokens or 0, prompt_tokens or 0)
+    cost = ((prompt_tokens or 0) - cached) * price_input + cached * price_cached + (completion_tokens or 0) * price_output
+    return cost / 1_000_000 * (BATCH_DISCOUNT if batch else 1.0)
+
+
+def record_completion(category: str, model: str, prompt_tokens: int | None, completion_tokens: int | None,
+                      cached_prompt_tokens: int | None = None, batch: bool = False):
+    """Adds one completion's billed tokens and estimated cost to the metrics."""
+    metrics.inc("tokens_total", prompt_tokens or 0, category=category, kind="prompt")
+    metrics.inc("tokens_total", cached_prompt_tokens or 0, category=category, kind="cached_prompt")
+    metrics.inc("tokens_total", completion_tokens or 0, category=category, kind="completion")
+    cost = estimate_cost(model, prompt_tokens or 0, completion_tokens or 0, cached_prompt_tokens or 0, batch)
+    metrics.inc("cost_usd_total", round(cost, 8), category=category, model=model)
+
+
+# --- Run Summary / Export ---
+def _write_atomic(path: str, text: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+def build_run_summary(extra: dict | None = None) -> dict:
+    """
+    Assembles the run summary: per-category stage timings, tokens, cost, bytes,
+    retries and cache lookups, plus the raw metric series and `extra` sections.
+    """
+    categories = metrics.category_summary()
+    return {
+        "started_at": datetime.fromtimestamp(metrics.started_at, timezone.utc).isoformat(timespec="seconds"),
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "wall_seconds": round(time.time() - metrics.started_at, 3),
+        "estimated_cost_usd": round(metrics.counter_value("cost_usd_total"), 6),
+        "tokens": {kind: int(metrics.counter_value("tokens_total", kind=kind))
+                   for kind in ("prompt", "cached_prompt", "completion")},
+        "categories": categories,
+        **(extra or {}),
+        "metrics": metrics.snapshot(),
+    }
+
+
+def write_run_summary(path: str, extra: dict | None = None) -> dict:
+    """Writes the run summary JSON to `path` and returns it."""
+    summary = build_run_summary(extra)
+    _write_atomic(path, json.dumps(summary, indent=2, default=str) + "\n")
+    return summary
+
+
+def write_openmetrics(path: str):
+    """Writes the registry as an OpenMetrics text file (e.g. for node_exporter's textfile collector)."""
+    _write_atomic(path, metrics.to_openmetrics())
+
+
+class MetricsServer:
+    """Serves `metrics.to_openmetrics()` at http://host:port/metrics on a daemon thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9464):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_openmetrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def start(self) -> "MetricsServer":
+        threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        get_logger("telemetry").info(
+            f"  [Metrics] Serving OpenMetrics at http://{self.server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,181 @@
+# backend/validator.py
+# Single-pass validation and normalization of generated summaries, without
+# calling the model. A summary is checked against the context it was generated
+# from (`article_links`, footnote index -> URL, see backend/prompt_builder.py):
+#
+# - it must end with a 'Sources:' section of `[¹]: [Header](URL)` lines;
+# - every footnote cited in the text needs a source line;
+# - every source URL must be one of the context articles.
+#
+# Harmless deviations are fixed in place (a leading category title, URLs that
+# differ from the context URL only in scheme/www/trailing slash, source lines
+# nothing cites). Anything else is reported as a problem, so the caller can send
+# just that category back to the model with `build_repair_messages`.
+# `extract_sources` turns the Sources section into the `sources` column JSON.
+
+import os
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from telemetry import get_logger
+
+logger = get_logger("validator")
+
+# --- Configuration ---
+VALIDATION_ENABLED = os.getenv("SUMMARY_VALIDATION", "true").lower() in ("1", "true", "yes")
+VALIDATION_MAX_REPAIRS = int(os.getenv("SUMMARY_VALIDATION_MAX_REPAIRS", "1"))
+
+SUPERSCRIPT_DIGITS = "⁰¹²³⁴⁵⁶⁷⁸⁹"
+_FROM_SUPERSCRIPT = str.maketrans(SUPERSCRIPT_DIGITS, "0123456789")
+_NUMBER = r"\^?([0-9⁰¹²³⁴⁵⁶⁷⁸⁹]+)\^?"
+_CITATION_PATTERN = re.compile(rf"\[{_NUMBER}\](?!\s*:)")
+_SOURCES_HEADING_PATTERN = re.compile(r"^[ \t]*(?:\*\*|__)?Sources:?(?:\*\*|__)?:?[ \t]*$", re.IGNORECASE | re.MULTILINE)
+_SOURCE_LINE_PATTERN = re.compile(rf"^\s*(?:[-*]\s*)?\[{_NUMBER}\]:?\s*\[(?P<header>[^\]]+)\]\((?P<url>[^)\s]+)\)\s*$")
+# Summaries that legitimately cite nothing (see rule 12 of the static prompt)
+_NO_COVERAGE_PATTERN = re.compile(r"no (?:objective |relevant )?news (?:reports|articles)? ?(?:were )?found|"
+                                  r"limited information available", re.IGNORECASE)
+
+REPAIR_INSTRUCTION = (
+    "Your summary above failed these checks:\n{problems}\n\n"
+    "Rewrite it so that it passes, keeping the same stories and all formatting rules. Cite ONLY the numbered "
+    "CONTEXT articles. The only valid sources are:\n{links}\n\n"
+    "End with a 'Sources:' heading on its own line followed by one line per cited footnote, exactly in the form "
+    "[¹]: [Short Header](URL). Return only the corrected summary."
+)
+
+
+def superscript(number: int) -> str:
+    return str(number).translate(str.maketrans("0123456789", SUPERSCRIPT_DIGITS))
+
+
+def _footnote_number(marker: str) -> int:
+    return int(marker.translate(_FROM_SUPERSCRIPT))
+
+
+def _comparable_url(url: str) -> str:
+    """URL reduced to what identifies the page: no scheme, 'www.', fragment or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{host}{parts.path.rstrip('/')}{query}"
+
+
+@dataclass
+class ValidationResult:
+    """Outcome of `validate_summary`: the normalized text, its sources and what is still wrong."""
+
+    summary: str
+    sources: list[dict] = field(default_factory=list)   # [{'name', 'url', 'footnote'}]
+    problems: list[str] = field(default_factory=list)
+    fixes: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def split_sources_section(summary: str) -> tuple[str, str, str | None]:
+    """Splits a summary into (body, heading, sources section or None) at its last 'Sources:' heading."""
+    headings = list(_SOURCES_HEADING_PATTERN.finditer(summary))
+    if not headings:
+        return summary, "", None
+    heading = headings[-1]
+    return summary[:heading.start()], heading.group().strip(), summary[heading.end():]
+
+
+def parse_source_lines(section: str) -> tuple[list[tuple[int, str, str, str]], list[str]]:
+    """
+    Parses a Sources section.
+
+    Returns:
+        tuple: ([(footnote, header, url, line), ...], [lines that are not valid source lines])
+    """
+    parsed, malformed = [], []
+    for line in section.splitlines():
+        if not line.strip():
+            continue
+        match = _SOURCE_LINE_PATTERN.match(line)
+        if match:
+            parsed.append((_footnote_number(match.group(1)), match.group("header").strip(), match.group("url"), line))
+        else:
+            malformed.append(line.strip())
+    return parsed, malformed
+
+
+def extract_sources(summary: str) -> list[dict]:
+    """The `sources` column entries ({'name', 'url', 'footnote'}) listed in a summary's Sources section."""
+    _, _, section = split_sources_section(summary)
+    if section is None:
+        return []
+    parsed, _ = parse_source_lines(section)
+    return [{"name": header, "url": url, "footnote": number} for number, header, url, _ in parsed]
+
+
+def validate_summary(summary: str, article_links: dict[int, str], category: str | None = None) -> ValidationResult:
+    """
+    Checks a summary's footnotes and links against its context and normalizes it.
+
+    Args:
+        summary (str): Generated summary text.
+        article_links (dict[int, str]): Footnote index -> URL of the context articles.
+        category (str | None): Category name; a leading '**Category**' title is removed.
+
+    Returns:
+        ValidationResult: `summary` is the normalized text; `problems` is empty if it passed.
+    """
+    result = ValidationResult(summary.strip())
+    text = result.summary
+    if category:
+        title = re.match(rf"^\s*(?:\*\*|#+\s*){re.escape(category)}(?:\*\*)?\s*\n", text, re.IGNORECASE)
+        if title:
+            text = text[title.end():].lstrip()
+            result.fixes.append("removed category title")
+
+    body, heading, section = split_sources_section(text)
+    cited = {_footnote_number(marker) for marker in _CITATION_PATTERN.findall(body)}
+    if section is None:
+        if cited or not _NO_COVERAGE_PATTERN.search(body):
+            result.problems.append("The 'Sources:' section is missing (or the output was cut off before it).")
+        result.summary = text
+        return result
+
+    parsed, malformed = parse_source_lines(section)
+    for line in malformed:
+        result.problems.append(f"Malformed source line (expected [¹]: [Header](URL)): {line[:120]}")
+    context_urls = {_comparable_url(url): url for url in article_links.values()}
+    listed = set()
+    kept_lines = []
+    for number, header, url, line in parsed:
+        if number not in cited:
+            result.fixes.append(f"dropped uncited source [{number}]")
+            continue
+        listed.add(number)
+        if url not in article_links.values():
+            exact = context_urls.get(_comparable_url(url))
+            if exact is None:
+                result.problems.append(f"Source [{superscript(number)}] links to a URL that is not in the "
+                                       f"context: {url}")
+            else:
+                line = line.replace(f"({url})", f"({exact})")
+                result.fixes.append(f"normalized URL of source [{number}]")
+        kept_lines.append(line.strip())
+    for number in sorted(cited - listed):
+        result.problems.append(f"Footnote [{superscript(number)}] is cited in the text but has no source line.")
+    if not cited and not _NO_COVERAGE_PATTERN.search(body):
+        result.problems.append("The summary cites no footnotes.")
+
+    result.summary = f"{body.rstrip()}\n\n{heading}\n" + "\n".join(kept_lines) if kept_lines else body.rstrip()
+    result.sources = extract_sources(result.summary)
+    return result
+
+
+def build_repair_messages(messages: list[dict], summary: str, validation: ValidationResult,
+                          article_links: dict[int, str]) -> list[dict]:
+    """The original conversation plus the failed summary and a targeted request to fix its problems."""
+    problems = "\n".join(f"- {problem}" for problem in validation.problems)
+    links = "\n".join(f"[{superscript(index)}]: {url}" for index, url in sorted(article_links.items()))
+    return messages + [
+        {"role": "assistant", "content": summary},
+        {"role": "user", "content": REPAIR_INSTRUCTION.format(problems=problems, links=links)},
+    ]
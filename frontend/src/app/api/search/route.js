@@ -8,6 +8,12 @@ const MAX_QUERY_LENGTH = 500;
 const OPENAI_API_KEY = process.env.OPENAI_API_KEY;
 const SERPER_API_KEY = process.env.SERPER_API_KEY;
 const MODEL_NAME = process.env.OPENAI_MODEL || "gpt-4o"; // Consistent with backend
+// Optional cached, rate-limited query backend (backend/query_service.py), e.g. http://127.0.0.1:8090
+const QUERY_SERVICE_URL = process.env.QUERY_SERVICE_URL;
+const QUERY_SERVICE_TIMEOUT_MS = 60000;
+// Reverse proxies in front of Next.js that append the client address to X-Forwarded-For
+// (1 for Vercel or a single nginx). Entries before theirs are set by the caller and ignored.
+const TRUSTED_PROXY_COUNT = parseInt(process.env.TRUSTED_PROXY_COUNT || '1', 10);
 
 // Path to the general prompt file (relative to the project root)
 const GENERAL_PROMPT_FILE_PATH = path.join(process.cwd(), 'prompts', 'general-prompt.md');
@@ -116,14 +122,14 @@ async function generateSummaryForQuery(userQuery, generalPrompt, serperContext)
     `CONTEXT:\\n${contextStr}\\n` +
     `--- End Context ---\\n\\n` +
     `Based *only* on the provided context above (if any), generate a newspaper-style summary addressing the user\'s query. ` +
-    `Follow the newspaper format exactly: start with a bold header, use footnote references \`[^1^]\`, \`[^2^]\`, etc. within paragraphs. ` +
+    `Follow the newspaper format exactly: start with a bold header, use footnote references \`[¹]\`, \`[²]\`, etc. within paragraphs. ` +
     `End with a 'Sources:' section. This section MUST start with the heading 'Sources:' on its own line. ` +
     `Each source cited in the text MUST be listed on a **separate new line** immediately following the 'Sources:' heading. ` +
-    `Each source line MUST follow the exact format: \`[^NUMBER^]: [Short Description](URL)\`. ` +
+    `Each source line MUST follow the exact format: \`[¹]: [Short Description](URL)\` (footnote number in superscript digits). ` +
     `Example of the required Sources section format:\\n` +
     `Sources:\\n` +
-    `[^1^]: [Article Title 1](https://example.com/1)\\n` +
-    `[^2^]: [Article Title 2](https://example.com/2)\\n` +
+    `[¹]: [Article Title 1](https://example.com/1)\\n` +
+    `[²]: [Article Title 2](https://example.com/2)\\n` +
     `Ensure the output adheres strictly to this formatting. Do NOT deviate from the specified Sources format. ` +
     `If the context does not contain relevant information, use the format for insufficient information. ` +
     `Present ONLY factual information from the context provided.`
@@ -160,6 +166,31 @@ async function generateSummaryForQuery(userQuery, generalPrompt, serperContext)
   }
 }
 
+// The caller's address as recorded by our own proxies, so a client cannot choose its rate-limit id
+function clientAddress(request) {
+  const hops = (request.headers.get('x-forwarded-for') || '')
+    .split(',')
+    .map(hop => hop.trim())
+    .filter(Boolean);
+  if (TRUSTED_PROXY_COUNT <= 0 || hops.length < TRUSTED_PROXY_COUNT) {
+    return 'anonymous'; // No trustworthy address: every such caller shares one bucket
+  }
+  return hops[hops.length - TRUSTED_PROXY_COUNT];
+}
+
+async function searchViaQueryService(query, request) {
+  // Pass only the derived address (never the caller's header) so the service can rate-limit per client
+  const response = await fetch(`${QUERY_SERVICE_URL.replace(/\/$/, '')}/search`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'X-Forwarded-For': clientAddress(request) },
+    body: JSON.stringify({ query }),
+    signal: AbortSignal.timeout(QUERY_SERVICE_TIMEOUT_MS),
+  });
+  const data = await response.json();
+  const headers = response.headers.get('retry-after') ? { 'Retry-After': response.headers.get('retry-after') } : undefined;
+  return NextResponse.json(data, { status: response.status, headers });
+}
+
 // --- API Route Handler --- 
 
 export async function POST(request) {
@@ -179,6 +210,16 @@ export async function POST(request) {
          return NextResponse.json({ message: 'Query contains potentially disallowed characters.' }, { status: 400 });
     }
 
+    // --- Query Service (cache, single-flight, rate limits) ---
+    if (QUERY_SERVICE_URL) {
+      try {
+        return await searchViaQueryService(query, request);
+      } catch (error) {
+        // Service unreachable: answer directly rather than failing the search
+        console.error("[API Route - Query Service] Error reaching query service; falling back to direct search:", error);
+      }
+    }
+
     // --- Core Logic ---
     // 1. Fetch Context with Serper
     const serperResults = await fetchSerperResults(query);
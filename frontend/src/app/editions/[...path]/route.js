@@ -0,0 +1,83 @@
+import fs from 'fs/promises';
+import path from 'path';
+import crypto from 'crypto';
+
+// Serves the editions the backend publishes at runtime (backend/edition.py).
+// They cannot live in public/: Next.js only serves files that existed there at
+// build time. Point EDITION_DIR at the backend's output directory.
+const EDITION_DIR = process.env.EDITION_DIR || path.join(process.cwd(), '..', 'backend', '.editions');
+
+// latest.json (revalidated every time) or v/<edition id>.json (immutable)
+const MANIFEST_PATH = 'latest.json';
+const EDITION_PATH_PATTERN = /^v\/[0-9a-f]{16}\.json$/;
+
+export const dynamic = 'force-dynamic'; // Read the directory on every request
+
+// Precompressed copies written next to each edition, best first
+const ENCODINGS = [
+  { name: 'br', suffix: '.br' },
+  { name: 'gzip', suffix: '.gz' },
+];
+
+async function readIfExists(filePath) {
+  try {
+    return await fs.readFile(filePath);
+  } catch (err) {
+    if (err.code === 'ENOENT') {
+      return null;
+    }
+    throw err;
+  }
+}
+
+function acceptedEncodings(request) {
+  return (request.headers.get('accept-encoding') || '')
+    .split(',')
+    .map(part => part.split(';')[0].trim().toLowerCase());
+}
+
+export async function GET(request, { params }) {
+  const relativePath = ((await params).path || []).join('/');
+  const isManifest = relativePath === MANIFEST_PATH;
+  if (!isManifest && !EDITION_PATH_PATTERN.test(relativePath)) {
+    return new Response('Not found', { status: 404 });
+  }
+  const filePath = path.join(EDITION_DIR, relativePath);
+
+  try {
+    const body = await readIfExists(filePath);
+    if (body === null) {
+      return new Response('Not found', { status: 404 });
+    }
+    // Edition ids are content hashes; the manifest is hashed here (it is a few hundred bytes)
+    const etag = isManifest
+      ? `"${crypto.createHash('sha256').update(body).digest('hex').slice(0, 32)}"`
+      : `"${path.basename(relativePath, '.json')}"`;
+    const headers = {
+      'Content-Type': 'application/json; charset=utf-8',
+      'Cache-Control': isManifest ? 'public, max-age=0, must-revalidate' : 'public, max-age=31536000, immutable',
+      'ETag': etag,
+      'Vary': 'Accept-Encoding',
+    };
+    if (request.headers.get('if-none-match') === etag) {
+      return new Response(null, { status: 304, headers });
+    }
+
+    if (!isManifest) {
+      const accepted = acceptedEncodings(request);
+      for (const encoding of ENCODINGS) {
+        if (!accepted.includes(encoding.name)) {
+          continue;
+        }
+        const compressed = await readIfExists(filePath + encoding.suffix);
+        if (compressed !== null) {
+          return new Response(compressed, { headers: { ...headers, 'Content-Encoding': encoding.name } });
+        }
+      }
+    }
+    return new Response(body, { headers });
+  } catch (err) {
+    console.error(`[Editions] Error reading ${filePath}:`, err);
+    return new Response('Edition unavailable', { status: 500 });
+  }
+}
@@ -2,6 +2,7 @@
 
 import React, { useState, useEffect } from 'react';
 import { supabase } from '../utils/supabaseClient'; // Import Supabase client
+import { loadEdition } from '../utils/edition'; // Pre-rendered edition (see backend/edition.py)
 import SearchBox from '../components/SearchBox';
 import CategorySection from '../components/CategorySection';
 import styles from './page.module.css'; // Import the CSS Module
@@ -39,6 +40,35 @@ export default function Home() {
       console.log("fetchAndOrganizeSummaries function started...");
       // --- DEBUG LOGGING --- 
 
+      // Prefer the pre-rendered edition: one cached file, already ordered and laid out
+      const edition = await loadEdition();
+      if (edition) {
+        const findStaticCategory = (category) => staticCategories.find(staticCat =>
+          staticCat.toLowerCase() === category.toLowerCase()
+        );
+        const editionSummaries = {};
+        edition.categories.forEach(entry => {
+          const originalCategoryName = findStaticCategory(entry.category);
+          if (originalCategoryName) {
+            editionSummaries[originalCategoryName] = [{
+              id: entry.content_hash,
+              summary: entry.summary,
+              html: entry.html,
+              sources: JSON.stringify(entry.sources),
+            }];
+          }
+        });
+        const editionColumn = (name) => (edition.columns?.[name] || []).map(findStaticCategory).filter(Boolean);
+        setSummaries(editionSummaries);
+        setColumnCategories({
+          left: editionColumn('left'),
+          middle: editionColumn('middle'),
+          right: editionColumn('right')
+        });
+        setIsLoading(false);
+        return;
+      }
+
       if (!supabase) {
         // --- DEBUG LOGGING ---
         console.error("fetchAndOrganizeSummaries: Supabase client is null!");
@@ -51,19 +81,18 @@ export default function Home() {
       setError(null);
 
       try {
-        // Removed date filtering logic
         console.log(`Fetching latest summaries for each category...`);
 
-        // Fetch latest summaries, ordered by creation time descending
-        // Consider adding a .limit() here if performance is a concern (e.g., .limit(100))
+        // latest_summaries holds exactly one row per category (maintained by the
+        // backend on every save), so this reads ~9 rows regardless of history size.
         const { data, error: dbError } = await supabase
-          .from('daily_summaries')
-          .select('id, category, summary, sources, created_at') // Select created_at for ordering
-          // Removed .gte filter for generation_date
-          .order('created_at', { ascending: false }); // Order by created_at to get latest first
+          .from('latest_summaries')
+          .select('id, category, summary, sources, created_at')
+          .order('created_at', { ascending: false })
+          .limit(staticCategories.length * 2); // Guard against unexpected extra categories
 
         // --- DEBUG LOGGING START ---
-        console.log("Raw data fetched from Supabase (ordered by created_at desc):", data);
+        console.log("Raw data fetched from Supabase (latest_summaries):", data);
         if (dbError) {
           console.error("Supabase DB Error during fetch:", dbError);
         }
@@ -73,7 +102,7 @@ export default function Home() {
           throw dbError;
         }
 
-        // 1. Get the latest summary for each unique category
+        // 1. Get the latest summary for each unique category (case-insensitive safety net)
         const latestSummariesMap = new Map();
         data.forEach(summary => {
           const category = summary.category;
@@ -27,6 +27,7 @@ function CategorySection({ categoryName, summaries, isLoading, id }) {
               <SummaryItem 
                 key={item.id} // Use a unique key, assuming 'id' from Supabase
                 summary={item.summary} 
+                html={item.html} // Pre-rendered by the backend when loaded from the edition
                 sourceLinks={sourcesJsonString} // Re-enabled: Pass the JSON string
               />
             );
@@ -69,15 +69,15 @@ function SearchBox() {
     // 1. Process headers with ** to make them bold
     let processedText = text.replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>');
 
-    // 2. Process inline footnote references like [^1^] or [1]
+    // 2. Process inline footnote references like [¹], [^1^] or [1]
     // Makes them superscript
-    processedText = processedText.replace(/\[\^?(\d+)\^?\]/g, 
+    processedText = processedText.replace(/\[\^?([\d⁰¹²³⁴⁵⁶⁷⁸⁹]+)\^?\]/g, 
       '<sup class="footnote-ref">$1</sup>');
 
     // 3. Process the source list lines.
-    // Handles both [^1^]: [Desc](URL) and 1: [Desc](URL) formats.
+    // Handles [¹]: [Desc](URL), [^1^]: [Desc](URL) and 1: [Desc](URL) formats.
     // Modified to show Description (URL) as link text.
-    processedText = processedText.replace(/^\s*\[?\^?(\d+)\^?\]?:\s*\[(.*?)\]\((https?:\/\/[^()]+)\)/gm, 
+    processedText = processedText.replace(/^\s*\[?\^?([\d⁰¹²³⁴⁵⁶⁷⁸⁹]+)\^?\]?:\s*\[(.*?)\]\((https?:\/\/[^()]+)\)/gm, 
       '<sup class="footnote-source-num">$1</sup>: <a href="$3" target="_blank" rel="noopener noreferrer">$2 ($3)</a>');
 
     // 4. Process any remaining standard markdown links [text](url) that weren't part of a source line
@@ -86,7 +86,7 @@ function SearchBox() {
 
     // 5. Fallback for malformed source lines that might just have number: and no link (to prevent rendering raw markdown)
     // This will just render the number as superscript followed by colon.
-    processedText = processedText.replace(/^\s*\[?\^?(\d+)\^?\]?:/gm, 
+    processedText = processedText.replace(/^\s*\[?\^?([\d⁰¹²³⁴⁵⁶⁷⁸⁹]+)\^?\]?:/gm, 
       '<sup class="footnote-source-num">$1</sup>:');
 
     return processedText;
@@ -2,8 +2,10 @@ import React from 'react';
 import ReactMarkdown from 'react-markdown'; // Import ReactMarkdown
 import styles from './SummaryItem.module.css'; // Import the CSS Module
 
-// Component displays summary text (which includes Markdown footnotes)
-function SummaryItem({ summary }) { // Removed sourceLinks prop
+// Component displays summary text (which includes Markdown footnotes).
+// `html` is the summary pre-rendered by the backend (backend/edition.py); when it
+// is present the Markdown is not parsed in the browser.
+function SummaryItem({ summary, html }) { // Removed sourceLinks prop
   // Basic check for essential props
   if (!summary) {
     console.warn('SummaryItem missing summary');
@@ -13,6 +15,15 @@ function SummaryItem({ summary }) { // Removed sourceLinks prop
   // The source links are now embedded within the summary Markdown,
   // so we don't need to parse the separate sourceLinks prop anymore.
 
+  if (html) {
+    // Generated and escaped by the backend; links already open in a new tab
+    return (
+      <div className={styles.itemContainer}>
+        <div className={`${styles.summaryText} text-serif`} dangerouslySetInnerHTML={{ __html: html }} />
+      </div>
+    );
+  }
+
   return (
     // Use styles from the CSS module
     <div className={styles.itemContainer}>
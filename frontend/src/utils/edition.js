@@ -0,0 +1,27 @@
+// Loads the static edition published by the backend at the end of each run
+// (backend/edition.py, served by src/app/editions/[...path]/route.js).
+// latest.json is revalidated on every load; the edition it points to is immutable.
+export const EDITION_MANIFEST_URL = '/editions/latest.json';
+
+// Returns the current edition, or null so the caller falls back to Supabase
+export const loadEdition = async (fetchImpl = fetch) => {
+  try {
+    const manifestResponse = await fetchImpl(EDITION_MANIFEST_URL, { cache: 'no-cache' });
+    if (!manifestResponse.ok) {
+      return null;
+    }
+    const manifest = await manifestResponse.json();
+    if (!manifest?.path) {
+      return null;
+    }
+    const editionResponse = await fetchImpl(manifest.path, { cache: 'force-cache' });
+    if (!editionResponse.ok) {
+      return null;
+    }
+    const edition = await editionResponse.json();
+    return edition?.categories?.length ? edition : null;
+  } catch (err) {
+    console.warn("Edition not available; loading summaries from Supabase instead:", err);
+    return null;
+  }
+};